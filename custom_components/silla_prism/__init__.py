@@ -2,42 +2,96 @@
 
 from __future__ import annotations
 
+from functools import partial
 import logging
+from pathlib import Path
 
+from homeassistant.components import mqtt
+from homeassistant.components.frontend import add_extra_js_url
+from homeassistant.components.http import StaticPathConfig
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers import config_validation as cv
 from homeassistant.helpers.device_registry import DeviceInfo
+from homeassistant.helpers.typing import ConfigType
+
+from . import services, websocket
 
 from .const import (
+    CARD_FILENAME,
+    CARD_URL,
+    CONF_BALANCE_PRIORITY,
+    CONF_EXPIRE_MULTIPLE,
+    CONF_FLUSH_WINDOW,
+    CONF_GRID_IMPORT_LIMIT,
     CONF_MAX_CURRENT,
     CONF_PORTS,
     CONF_POWERWALL,
+    CONF_ROLLING_STATS,
+    CONF_SCHEDULE,
     CONF_SERIAL,
+    CONF_SITE_AGGREGATES,
+    CONF_SITE_CURRENT_LIMIT,
+    CONF_TARIFFS,
     CONF_TOPIC,
     CONF_VSENSORS,
+    DEFAULT_BALANCE_PRIORITY,
+    DEFAULT_EXPIRE_MULTIPLE,
+    DEFAULT_FLUSH_WINDOW,
+    DEFAULT_GRID_IMPORT_LIMIT,
     DEFAULT_MAX_CURRENT,
     DEFAULT_PORTS,
     DEFAULT_POWERWALL,
+    DEFAULT_ROLLING_STATS,
+    DEFAULT_SCHEDULE,
     DEFAULT_SERIAL,
+    DEFAULT_SITE_AGGREGATES,
+    DEFAULT_SITE_CURRENT_LIMIT,
+    DEFAULT_TARIFFS,
     DEFAULT_VSENSORS,
     DOMAIN,
 )
+from .curves import SessionCurveRecorder, async_remove_curves
+from .dispatcher import PrismDispatcher
 from .domain_data import DomainData
 from .entry_data import RuntimeEntryData
+from .filters import create_filter
+from .overload import PrismOverloadProtection
+from .scheduler import PrismScheduler, parse_schedule
+from .schema import GROUP_POWERWALL, TOPIC_INDEX
+from .tariff import TariffSchedule, parse_tariffs
 
 _LOGGER = logging.getLogger(__name__)
 CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+CONTROLLER_OVERLOAD = "overload"
+CONTROLLER_BALANCER = "balancer"
+CONTROLLER_SCHEDULER = "scheduler"
 PLATFORMS = [
     Platform.BINARY_SENSOR,
     Platform.BUTTON,
+    Platform.EVENT,
     Platform.NUMBER,
     Platform.SELECT,
     Platform.SENSOR,
 ]
 
 
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Set up the services, the websocket API and the charger card."""
+    websocket.async_setup(hass)
+    services.async_setup(hass)
+    await hass.http.async_register_static_paths(
+        [
+            StaticPathConfig(
+                CARD_URL, str(Path(__file__).parent / "frontend" / CARD_FILENAME), False
+            )
+        ]
+    )
+    add_extra_js_url(hass, CARD_URL)
+    return True
+
+
 def _get_device_identifier(port: int, serial: str) -> str:
     if serial == "" and port == 0:
         return "SillaPrism001"
@@ -62,6 +116,8 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     _vsensors = entry.data.get(CONF_VSENSORS, DEFAULT_VSENSORS)
     _powerwall = entry.data.get(CONF_POWERWALL, DEFAULT_POWERWALL)
     _maxcurr = entry.data.get(CONF_MAX_CURRENT, DEFAULT_MAX_CURRENT)
+    _flush_window = entry.options.get(CONF_FLUSH_WINDOW, DEFAULT_FLUSH_WINDOW)
+    _expire_multiple = entry.options.get(CONF_EXPIRE_MULTIPLE, DEFAULT_EXPIRE_MULTIPLE)
     domain_data = DomainData.get(hass)
 
     _devices_info = []
@@ -96,18 +152,189 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         powerwall=_powerwall,
         maxcurr=_maxcurr,
         devices=_devices_info,
+        dispatcher=PrismDispatcher(
+            hass, entry.entry_id, _topic, _flush_window / 1000, _expire_multiple
+        ),
+        rolling_stats=entry.options.get(CONF_ROLLING_STATS, DEFAULT_ROLLING_STATS),
+        site_aggregates=entry.options.get(
+            CONF_SITE_AGGREGATES, DEFAULT_SITE_AGGREGATES
+        ),
+        tariffs=_get_tariffs(entry),
     )
     domain_data.set_entry_data(entry, entry_data)
+    await _async_register_telemetry(entry_data)
+    entry_data.curves = SessionCurveRecorder(
+        hass, entry.entry_id, entry_data.dispatcher, _ports
+    )
+    entry.async_on_unload(await entry_data.curves.async_start())
+    entry.async_on_unload(
+        domain_data.get_site_aggregator().async_add_entry(
+            entry.entry_id, entry_data.dispatcher
+        )
+    )
+    await _async_update_controllers(hass, entry, entry_data)
+    entry.async_on_unload(
+        mqtt.async_subscribe_connection_status(
+            hass, entry_data.dispatcher.async_connection_changed
+        )
+    )
+    entry.async_on_unload(entry.add_update_listener(_async_update_listener))
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    websocket.async_entries_changed(hass)
     return True
 
 
+async def _async_register_telemetry(entry_data: RuntimeEntryData) -> None:
+    """Register the decoded topics of the schema on the telemetry bus."""
+    for handlers in TOPIC_INDEX.values():
+        for handler in handlers:
+            if handler.group == GROUP_POWERWALL and not entry_data.powerwall:
+                continue
+            for topic, port in handler.topics(entry_data.ports):
+                await entry_data.dispatcher.async_register_telemetry(
+                    topic,
+                    port,
+                    handler.key,
+                    handler.options,
+                    handler.transitions,
+                    create_filter(handler.sample_filter)
+                    if handler.sample_filter is not None
+                    else None,
+                )
+
+
+async def _async_update_controllers(
+    hass: HomeAssistant, entry: ConfigEntry, entry_data: RuntimeEntryData
+) -> None:
+    """Start, update or stop the controllers to follow the options.
+
+    The controllers are the overload protection, the load balancer and the
+    scheduler. The running protection and balancer take the new limits in place and keep
+    the state of the ports, the scheduler is only restarted when its schedule
+    changes, since a start publishes the current slot.
+    """
+    _import_limit = entry.options.get(CONF_GRID_IMPORT_LIMIT, DEFAULT_GRID_IMPORT_LIMIT)
+    if _import_limit <= 0:
+        entry_data.async_stop_controller(CONTROLLER_OVERLOAD)
+        entry_data.overload = None
+    elif entry_data.overload is not None:
+        entry_data.overload.async_set_import_limit(_import_limit)
+    else:
+        entry_data.overload = PrismOverloadProtection(
+            hass,
+            entry_data.dispatcher,
+            entry_data.ports,
+            _import_limit,
+            partial(
+                DomainData.get(hass).get_load_balancer(hass).async_set_ceiling,
+                entry.entry_id,
+            ),
+        )
+        entry_data.controller_stops[CONTROLLER_OVERLOAD] = (
+            await entry_data.overload.async_start()
+        )
+
+    _site_limit = entry.options.get(CONF_SITE_CURRENT_LIMIT, DEFAULT_SITE_CURRENT_LIMIT)
+    _priority = entry.options.get(CONF_BALANCE_PRIORITY, DEFAULT_BALANCE_PRIORITY)
+    if _site_limit <= 0:
+        entry_data.async_stop_controller(CONTROLLER_BALANCER)
+    elif CONTROLLER_BALANCER in entry_data.controller_stops:
+        DomainData.get(hass).get_load_balancer(hass).async_update_entry(
+            entry.entry_id, entry_data.maxcurr, _site_limit, _priority
+        )
+    else:
+        entry_data.controller_stops[CONTROLLER_BALANCER] = (
+            DomainData.get(hass)
+            .get_load_balancer(hass)
+            .async_add_entry(
+                entry.entry_id,
+                entry_data.dispatcher,
+                entry_data.ports,
+                entry_data.maxcurr,
+                _site_limit,
+                _priority,
+            )
+        )
+
+    _schedule = entry.options.get(CONF_SCHEDULE, DEFAULT_SCHEDULE)
+    if _schedule == entry_data.schedule:
+        return
+    entry_data.schedule = _schedule
+    entry_data.async_stop_controller(CONTROLLER_SCHEDULER)
+    entry_data.scheduler = None
+    try:
+        _rules = parse_schedule(_schedule, entry_data.ports)
+    except ValueError as err:
+        _LOGGER.error("Ignoring the schedule of %s: %s", entry.title, err)
+        _rules = []
+    if _rules:
+        entry_data.scheduler = PrismScheduler(hass, entry_data.dispatcher, _rules)
+        entry_data.controller_stops[CONTROLLER_SCHEDULER] = (
+            entry_data.scheduler.async_start()
+        )
+
+
+def _get_tariffs(entry: ConfigEntry) -> TariffSchedule | None:
+    """Return the tariff schedule of the options, None when there is none."""
+    try:
+        return parse_tariffs(entry.options.get(CONF_TARIFFS, DEFAULT_TARIFFS))
+    except ValueError as err:
+        _LOGGER.error("Ignoring the tariffs of %s: %s", entry.title, err)
+        return None
+
+
+def _requires_reload(entry: ConfigEntry, entry_data: RuntimeEntryData) -> bool:
+    """Return True when the new configuration changes the set of entities."""
+    return (
+        entry.data.get(CONF_PORTS, DEFAULT_PORTS) != entry_data.ports
+        or entry.data.get(CONF_SERIAL, DEFAULT_SERIAL) != entry_data.serial
+        or entry.data.get(CONF_VSENSORS, DEFAULT_VSENSORS) != entry_data.vsensors
+        or entry.data.get(CONF_POWERWALL, DEFAULT_POWERWALL) != entry_data.powerwall
+        or entry.options.get(CONF_ROLLING_STATS, DEFAULT_ROLLING_STATS)
+        != entry_data.rolling_stats
+        or entry.options.get(CONF_SITE_AGGREGATES, DEFAULT_SITE_AGGREGATES)
+        != entry_data.site_aggregates
+        or (_get_tariffs(entry) is None) != (entry_data.tariffs is None)
+    )
+
+
+async def _async_update_listener(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Apply the new configuration, reload the entry only when really needed."""
+    entry_data: RuntimeEntryData = DomainData.get(hass).get_entry_data(entry)
+    if _requires_reload(entry, entry_data):
+        _LOGGER.debug("Reloading entry %s, the entities changed", entry.entry_id)
+        await hass.config_entries.async_reload(entry.entry_id)
+        return
+
+    _topic = entry.data[CONF_TOPIC]
+    if _topic != entry_data.topic:
+        entry_data.topic = _topic
+        await entry_data.dispatcher.async_set_topic(_topic)
+    _maxcurr = entry.data.get(CONF_MAX_CURRENT, DEFAULT_MAX_CURRENT)
+    if _maxcurr != entry_data.maxcurr:
+        entry_data.async_set_max_current(_maxcurr)
+    # The cost sensors price the next samples with the new schedule
+    entry_data.tariffs = _get_tariffs(entry)
+    entry_data.dispatcher.async_configure(
+        entry.options.get(CONF_FLUSH_WINDOW, DEFAULT_FLUSH_WINDOW) / 1000,
+        entry.options.get(CONF_EXPIRE_MULTIPLE, DEFAULT_EXPIRE_MULTIPLE),
+    )
+    await _async_update_controllers(hass, entry, entry_data)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     _LOGGER.debug("async_unload_entry")
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
     if unload_ok:
-        # TODO Remove entry from domain data???
-        pass
+        entry_data = DomainData.get(hass).pop_entry_data(entry)
+        entry_data.async_stop_controllers()
+        entry_data.dispatcher.async_shutdown()
+        websocket.async_entries_changed(hass)
 
     return unload_ok
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove the data saved by a deleted config entry."""
+    await async_remove_curves(hass, entry.entry_id)
@@ -0,0 +1,316 @@
+"""Offline analysis of the Prism telemetry recorded by Home Assistant.
+
+The numeric Prism sensors are loaded from the recorder SQLite database, either
+from the states table (full resolution, usually only the last days) or from
+the long term statistics (hourly means, kept forever), into NumPy arrays. The
+energy, the charging time and the voltage quality are computed per port and
+per month, and the grid and solar balance per device and per month, with
+vectorized operations only.
+
+The module depends only on the standard library, NumPy and the recorded
+module, so it can run in the Home Assistant executor or as a separate process:
+
+    python analysis.py --config /config --source statistics
+"""
+
+import argparse
+from collections.abc import Iterable
+from contextlib import closing
+import json
+from pathlib import Path
+import sqlite3
+import sys
+from typing import Any
+
+import numpy as np
+
+try:
+    from .recorded import (
+        DECODER_NUMBER,
+        RECORDER_DB,
+        SOURCE_STATES,
+        SOURCE_STATISTICS,
+        STATISTICS_PERIOD,
+        connect,
+        discover_series,
+    )
+except ImportError:
+    # Run as a script, outside of the package
+    from recorded import (  # type: ignore[no-redef]
+        DECODER_NUMBER,
+        RECORDER_DB,
+        SOURCE_STATES,
+        SOURCE_STATISTICS,
+        STATISTICS_PERIOD,
+        connect,
+        discover_series,
+    )
+
+FETCH_SIZE = 65536
+
+# Output power in W above which a port is considered charging
+CHARGING_POWER = 100
+# EN 50160 voltage band
+NOMINAL_VOLTAGE = 230
+VOLTAGE_TOLERANCE = 0.1
+
+_STATE_QUERY = """
+SELECT states.last_updated_ts,
+       CASE WHEN states.state IN ('', 'unknown', 'unavailable') THEN NULL
+            ELSE CAST(states.state AS REAL) END
+FROM states JOIN states_meta ON states.metadata_id = states_meta.metadata_id
+WHERE states_meta.entity_id = ? AND states.last_updated_ts >= ?
+    AND states.last_updated_ts < ?
+ORDER BY states.last_updated_ts
+"""
+_STATISTICS_QUERY = """
+SELECT statistics.start_ts, statistics.mean
+FROM statistics JOIN statistics_meta
+    ON statistics.metadata_id = statistics_meta.id
+WHERE statistics_meta.statistic_id = ? AND statistics.start_ts >= ?
+    AND statistics.start_ts < ?
+ORDER BY statistics.start_ts
+"""
+
+
+def load_series(
+    connection: sqlite3.Connection,
+    entity_id: str,
+    source: str,
+    start: float = 0,
+    end: float = float("inf"),
+) -> tuple[np.ndarray, np.ndarray]:
+    """Load the timestamps and the values of a sensor, NaN when unavailable."""
+    query = _STATE_QUERY if source == SOURCE_STATES else _STATISTICS_QUERY
+    cursor = connection.execute(query, (entity_id, start, min(end, 1e12)))
+    chunks = []
+    while rows := cursor.fetchmany(FETCH_SIZE):
+        chunks.append(np.array(rows, dtype=float).reshape(-1, 2))
+    data = np.concatenate(chunks) if chunks else np.empty((0, 2))
+    times, values = data[:, 0], data[:, 1]
+    if source == SOURCE_STATISTICS and len(times):
+        # Every statistic holds for one period, missing periods are gaps
+        gaps = np.flatnonzero(np.diff(times) > STATISTICS_PERIOD) + 1
+        gap_times = np.append(times[gaps - 1], times[-1]) + STATISTICS_PERIOD
+        times = np.insert(times, np.append(gaps, len(times)), gap_times)
+        values = np.insert(values, np.append(gaps, len(values)), np.nan)
+    return times, values
+
+
+def integral_at(times: np.ndarray, values: np.ndarray, edges: np.ndarray) -> np.ndarray:
+    """Return the integral of a sampled signal from its start up to each edge.
+
+    The signal holds every value until the next sample, as the recorded
+    states do, the unavailable (NaN) intervals count as zero and the signal
+    ends at its last sample.
+    """
+    if len(times) == 0:
+        return np.zeros(len(edges))
+    held = np.nan_to_num(values[:-1])
+    cumulative = np.concatenate(([0.0], np.cumsum(held * np.diff(times))))
+    clipped = np.clip(edges, times[0], times[-1])
+    index = np.searchsorted(times, clipped, side="right") - 1
+    tail = np.nan_to_num(values[index]) * (clipped - times[index])
+    return cumulative[index] + np.where(index < len(times) - 1, tail, 0.0)
+
+
+def bucket_integrals(
+    times: np.ndarray, values: np.ndarray, edges: np.ndarray
+) -> np.ndarray:
+    """Return the integral of a sampled signal in every bucket between edges."""
+    return np.diff(integral_at(times, values, edges))
+
+
+def resample(
+    times: np.ndarray, values: np.ndarray, step: float
+) -> tuple[np.ndarray, np.ndarray]:
+    """Resample a signal to its time weighted mean over fixed steps."""
+    if len(times) == 0:
+        return np.empty(0), np.empty(0)
+    edges = np.arange(times[0], times[-1] + step, step)
+    valid = np.where(np.isnan(values), np.nan, 1.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = bucket_integrals(times, values, edges) / bucket_integrals(
+            times, valid, edges
+        )
+    return edges[:-1], means
+
+
+def bucket_extremes(
+    times: np.ndarray, values: np.ndarray, edges: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """Return the minimum and the maximum sample of every bucket."""
+    minimum = np.full(len(edges) - 1, np.nan)
+    maximum = np.full(len(edges) - 1, np.nan)
+    valid = ~np.isnan(values)
+    times, values = times[valid], values[valid]
+    if len(values) == 0:
+        return minimum, maximum
+    starts = np.searchsorted(times, edges[:-1])
+    ends = np.searchsorted(times, edges[1:])
+    filled = starts < ends
+    minimum[filled] = np.minimum.reduceat(values, starts[filled])
+    maximum[filled] = np.maximum.reduceat(values, starts[filled])
+    # reduceat runs to the next start, trim the buckets to their own end
+    for index in np.flatnonzero(filled & (ends < np.append(starts[1:], len(values)))):
+        minimum[index] = values[starts[index] : ends[index]].min()
+        maximum[index] = values[starts[index] : ends[index]].max()
+    return minimum, maximum
+
+
+def month_edges(start: float, end: float) -> np.ndarray:
+    """Return the UTC month boundaries covering the interval, as timestamps."""
+    first = np.datetime64(int(start), "s").astype("datetime64[M]")
+    last = np.datetime64(int(end), "s").astype("datetime64[M]")
+    months = np.arange(first, last + 2, dtype="datetime64[M]")
+    return months.astype("datetime64[s]").astype(float)
+
+
+def _month_names(edges: np.ndarray) -> list[str]:
+    """Return the YYYY-MM names of the buckets between edges."""
+    months = edges[:-1].astype("datetime64[s]").astype("datetime64[M]")
+    return [str(month) for month in months]
+
+
+def _round(values: np.ndarray, digits: int) -> list[float | None]:
+    """Return the values as a JSON friendly list."""
+    return [
+        None if np.isnan(value) else round(float(value), digits) for value in values
+    ]
+
+
+def _port_summary(
+    power: tuple[np.ndarray, np.ndarray] | None,
+    voltage: tuple[np.ndarray, np.ndarray] | None,
+    edges: np.ndarray,
+) -> dict[str, list[float | None]]:
+    """Return the monthly charging and voltage summary of a port."""
+    summary: dict[str, list[float | None]] = {}
+    if power is not None:
+        times, values = power
+        energy = bucket_integrals(times, values, edges) / 3.6e6
+        charging = np.where(
+            np.isnan(values), np.nan, (values > CHARGING_POWER).astype(float)
+        )
+        seconds = bucket_integrals(times, charging, edges)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean_power = energy * 3.6e6 / seconds
+        summary["energy_kwh"] = _round(energy, 3)
+        summary["charging_hours"] = _round(seconds / 3600, 2)
+        summary["mean_charging_power_w"] = _round(mean_power, 0)
+        summary["peak_power_w"] = _round(bucket_extremes(times, values, edges)[1], 0)
+    if voltage is not None:
+        times, values = voltage
+        valid = np.where(np.isnan(values), np.nan, 1.0)
+        band = NOMINAL_VOLTAGE * VOLTAGE_TOLERANCE
+        outside = np.where(
+            np.isnan(values),
+            np.nan,
+            (np.abs(values - NOMINAL_VOLTAGE) > band).astype(float),
+        )
+        valid_seconds = bucket_integrals(times, valid, edges)
+        minimum, maximum = bucket_extremes(times, values, edges)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            summary["voltage_mean_v"] = _round(
+                bucket_integrals(times, values, edges) / valid_seconds, 1
+            )
+            summary["voltage_out_of_band_pct"] = _round(
+                100 * bucket_integrals(times, outside, edges) / valid_seconds, 3
+            )
+        summary["voltage_min_v"] = _round(minimum, 1)
+        summary["voltage_max_v"] = _round(maximum, 1)
+    return summary
+
+
+def _site_summary(
+    series: dict[str, tuple[np.ndarray, np.ndarray]], edges: np.ndarray
+) -> dict[str, list[float | None]]:
+    """Return the monthly grid and solar balance of a device."""
+    summary: dict[str, list[float | None]] = {}
+    export = None
+    if (grid := series.get("input_grid_power")) is not None:
+        times, values = grid
+        summary["grid_import_kwh"] = _round(
+            bucket_integrals(times, np.maximum(values, 0), edges) / 3.6e6, 3
+        )
+        export = bucket_integrals(times, np.maximum(-values, 0), edges) / 3.6e6
+        summary["grid_export_kwh"] = _round(export, 3)
+    if (house := series.get("powerwall_house")) is not None:
+        summary["house_kwh"] = _round(bucket_integrals(*house, edges) / 3.6e6, 3)
+    if (solar := series.get("powerwall_solar")) is not None:
+        production = bucket_integrals(*solar, edges) / 3.6e6
+        summary["solar_kwh"] = _round(production, 3)
+        if export is not None:
+            with np.errstate(invalid="ignore", divide="ignore"):
+                ratio = 100 * (production - export) / production
+            summary["self_consumption_pct"] = _round(np.clip(ratio, 0, 100), 1)
+    return summary
+
+
+def analyze(
+    config_dir: Path,
+    source: str = SOURCE_STATISTICS,
+    start: float = 0,
+    end: float = float("inf"),
+    database: Path | None = None,
+) -> dict[str, Any]:
+    """Return the monthly summaries of every recorded Prism device and port."""
+    database = database or config_dir / RECORDER_DB
+    series = discover_series(config_dir)
+    loaded: dict[tuple[str, int], dict[str, tuple[np.ndarray, np.ndarray]]] = {}
+    with closing(connect(database)) as connection:
+        for item in series:
+            if item.decoder != DECODER_NUMBER:
+                continue
+            times, values = load_series(connection, item.entity_id, source, start, end)
+            if len(times):
+                loaded.setdefault((item.serial, item.port), {})[item.key] = (
+                    times,
+                    values,
+                )
+    if not loaded:
+        return {"source": source, "months": [], "devices": {}}
+
+    first = min(t[0] for data in loaded.values() for t, _ in data.values())
+    last = max(t[-1] for data in loaded.values() for t, _ in data.values())
+    edges = month_edges(first, last)
+    devices: dict[str, dict[str, Any]] = {}
+    for (serial, port), data in sorted(loaded.items()):
+        device = devices.setdefault(serial or "default", {"site": {}, "ports": {}})
+        if port == 0:
+            device["site"] = _site_summary(data, edges)
+        else:
+            device["ports"][str(port)] = _port_summary(
+                data.get("output_power"), data.get("power_grid_voltage"), edges
+            )
+    return {"source": source, "months": _month_names(edges), "devices": devices}
+
+
+def _parse_time(value: str) -> float:
+    """Parse an ISO date of the command line."""
+    return float(np.datetime64(value, "s").astype(float))
+
+
+def main(argv: Iterable[str] | None = None) -> int:
+    """Run the analysis from the command line and print the JSON summary."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--config", type=Path, default=Path(), help="HA config dir")
+    parser.add_argument("--database", type=Path, help="recorder SQLite database")
+    parser.add_argument(
+        "--source",
+        choices=(SOURCE_STATES, SOURCE_STATISTICS),
+        default=SOURCE_STATISTICS,
+    )
+    parser.add_argument("--start", type=_parse_time, default=0, help="YYYY-MM-DD")
+    parser.add_argument(
+        "--end", type=_parse_time, default=float("inf"), help="YYYY-MM-DD"
+    )
+    args = parser.parse_args(argv)
+    report = analyze(args.config, args.source, args.start, args.end, args.database)
+    json.dump(report, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
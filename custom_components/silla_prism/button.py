@@ -3,7 +3,6 @@
 from collections.abc import Coroutine
 from typing import Any
 
-from homeassistant.components import mqtt
 from homeassistant.components.button import (
     ButtonDeviceClass,
     ButtonEntity,
@@ -14,9 +13,12 @@ from homeassistant.core import HomeAssistant
 from homeassistant.helpers.device_registry import DeviceInfo
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
+from .client import command_topic
+from .const import BUTTON_DOMAIN
 from .domain_data import DomainData
 from .entity import _get_unique_id
 from .entry_data import RuntimeEntryData
+from .schema import GROUP_PORT, compile_descriptions
 
 
 async def async_setup_entry(
@@ -56,7 +58,7 @@ class PrismCommand(ButtonEntity):
     ) -> None:
         """Init Prism select."""
         super().__init__()
-        self._base_topic = entry_data.topic
+        self._entry_data = entry_data
         self._port = port
         self._attr_device_info = self._get_device(entry_data, port)
         self.entity_description = description
@@ -64,6 +66,9 @@ class PrismCommand(ButtonEntity):
 
     async def async_added_to_hass(self) -> Coroutine[Any, Any, None]:
         """Subscribe to mqtt."""
+        self._entry_data.async_register_entity_id(
+            self._port, self.entity_description.translation_key, self.entity_id
+        )
         return super().async_added_to_hass()
 
     async def async_will_remove_from_hass(self) -> Coroutine[Any, Any, None]:
@@ -72,8 +77,7 @@ class PrismCommand(ButtonEntity):
 
     async def async_press(self) -> None:
         """Press the button."""
-        await mqtt.async_publish(
-            self.hass,
+        await self._entry_data.dispatcher.async_publish(
             self._get_topic(),
             self.entity_description.parameter,
         )
@@ -86,27 +90,13 @@ class PrismCommand(ButtonEntity):
         return entry_data.devices[port]
 
     def _get_topic(self) -> str:
-        """Get the topic."""
-        return (
-            f"{self._base_topic}{self._port}/command/{self.entity_description.command}"
-        )
+        """Get the topic, relative to the entry topic."""
+        return command_topic(self._port, self.entity_description.command)
 
 
-BUTTONS: tuple[PrismCommandEntityDescription, ...] = (
-    PrismCommandEntityDescription(
-        key="set_mode_traps_auth",
-        has_entity_name=True,
-        translation_key="set_mode_traps_auth",
-        command="set_mode_traps",
-        device_class=ButtonDeviceClass.IDENTIFY,
-        parameter="-auth",
-    ),
-    PrismCommandEntityDescription(
-        key="set_mode_traps_noauth",
-        has_entity_name=True,
-        translation_key="set_mode_traps_noauth",
-        command="set_mode_traps",
-        device_class=ButtonDeviceClass.IDENTIFY,
-        parameter="+auth",
-    ),
+BUTTONS = compile_descriptions(
+    BUTTON_DOMAIN,
+    PrismCommandEntityDescription,
+    GROUP_PORT,
+    device_class=ButtonDeviceClass,
 )
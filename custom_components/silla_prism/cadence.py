@@ -0,0 +1,80 @@
+"""Publish cadence learned from the inter-arrival time of a Prism topic."""
+
+from dataclasses import dataclass
+from typing import Any
+
+# Gains of the interval and jitter averages, as in the TCP retransmission timer
+INTERVAL_GAIN = 1 / 8
+JITTER_GAIN = 1 / 4
+JITTER_FACTOR = 4
+# Intervals needed before the learned cadence replaces the static expire_after
+MIN_SAMPLES = 8
+# Topics with a larger jitter are published on change and keep the static value
+MAX_JITTER_RATIO = 0.5
+# Minimum seconds before a learned value is stale
+MIN_EXPIRE = 10
+
+
+@dataclass(slots=True)
+class TopicCadence:
+    """Smoothed inter-arrival time and jitter of the messages of a topic."""
+
+    last: float | None = None
+    interval: float = 0.0
+    jitter: float = 0.0
+    samples: int = 0
+    resync: bool = False
+
+    def update(self, now: float) -> None:
+        """Update the cadence with the arrival time of a message."""
+        if self.last is not None and not self.resync:
+            elapsed = now - self.last
+            if self.samples == 0:
+                self.interval = elapsed
+                self.jitter = elapsed / 2
+            else:
+                deviation = abs(elapsed - self.interval)
+                self.jitter += JITTER_GAIN * (deviation - self.jitter)
+                self.interval += INTERVAL_GAIN * (elapsed - self.interval)
+            self.samples += 1
+        self.last = now
+        self.resync = False
+
+    def restart(self, now: float) -> None:
+        """Restart the cadence after a broker outage, the gap is not learned."""
+        if self.last is not None:
+            self.last = now
+            self.resync = True
+
+    @property
+    def regular(self) -> bool:
+        """Return True when the topic is published at a steady cadence."""
+        return (
+            self.samples >= MIN_SAMPLES
+            and self.jitter <= self.interval * MAX_JITTER_RATIO
+        )
+
+    def learned_timeout(self, multiple: float) -> float | None:
+        """Return the stale timeout learned from the cadence, if regular."""
+        if not self.regular:
+            return None
+        return max(MIN_EXPIRE, multiple * self.interval + JITTER_FACTOR * self.jitter)
+
+    def timeout(self, multiple: float, expire_after: float) -> float:
+        """Return the seconds after the last message when the value is stale.
+
+        The learned timeout never exceeds expire_after, which is also used
+        until the cadence of the topic is known to be regular.
+        """
+        learned = self.learned_timeout(multiple)
+        return expire_after if learned is None else min(expire_after, learned)
+
+    def as_dict(self, multiple: float) -> dict[str, Any]:
+        """Return the cadence for the diagnostics."""
+        learned = self.learned_timeout(multiple)
+        return {
+            "interval": round(self.interval, 3),
+            "jitter": round(self.jitter, 3),
+            "samples": self.samples,
+            "timeout": None if learned is None else round(learned, 3),
+        }
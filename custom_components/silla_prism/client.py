@@ -0,0 +1,279 @@
+"""Headless asyncio client of the Prism MQTT protocol.
+
+The protocol knowledge, i.e. the topic layout, the payload decoding, the
+option indexes of the modes and the command payloads, lives here without any
+Home Assistant dependency: the entities and the controllers use the same
+functions. PrismClient talks to the broker through a PrismTransport, an
+adapter of any MQTT library or the in-process FakeBroker, so the protocol can
+be reused by scripts and benchmarked outside Home Assistant. The module only
+uses the standard library and can be imported on its own, e.g.
+
+    sys.path.append("custom_components/silla_prism")
+    from client import FakeBroker, PrismClient
+"""
+
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass, field
+import json
+from pathlib import Path
+from typing import Any, Protocol
+
+SCHEMA_PATH = Path(__file__).parent / "topics.json"
+
+GROUP_BASE = "base"
+GROUP_PORT = "port"
+GROUP_POWERWALL = "powerwall"
+
+DECODER_NUMBER = "number"
+DECODER_ENUM = "enum"
+
+# Mode reported while the port limits its current by itself, shown as paused
+AUTOLIMIT_MODE = 7
+PAUSED_MODE = "paused"
+
+
+def load_schema() -> dict[str, list[dict[str, Any]]]:
+    """Load the topic schema."""
+    return json.loads(SCHEMA_PATH.read_text(encoding="utf-8"))
+
+
+SCHEMA = load_schema()
+
+
+def decode_payload(payload: str, options: Sequence[str] | None) -> float | str | None:
+    """Decode a Prism payload, the enum values are 1-based option indexes."""
+    try:
+        if options is not None:
+            index = int(payload) - 1
+            return options[index] if 0 <= index < len(options) else None
+        return float(payload)
+    except ValueError:
+        return None
+
+
+def decode_mode(payload: str, options: Sequence[str]) -> str | None:
+    """Decode the mode of a port as one of the settable options.
+
+    Raises ValueError when the payload is not a number, returns None for the
+    modes that cannot be set.
+    """
+    mode = int(payload)
+    if mode == AUTOLIMIT_MODE:
+        return PAUSED_MODE
+    return options[mode - 1] if 0 < mode <= len(options) else None
+
+
+def encode_option(options: Sequence[str], option: str) -> int:
+    """Return the payload of an option, its 1-based index."""
+    return options.index(option) + 1
+
+
+def command_topic(port: int, command: str) -> str:
+    """Return the command topic of a port, relative to the device topic."""
+    return f"{port}/command/{command}"
+
+
+MessageCallback = Callable[[str, str], None]
+
+
+class PrismTransport(Protocol):
+    """The MQTT connection used by a PrismClient."""
+
+    async def subscribe(
+        self, topic: str, callback: MessageCallback
+    ) -> Callable[[], None]:
+        """Subscribe to a topic filter, returns the unsubscribe callback."""
+
+    async def publish(self, topic: str, payload: str) -> None:
+        """Publish a payload."""
+
+
+def topic_matches(topic_filter: str, topic: str) -> bool:
+    """Return True when a topic matches an MQTT filter with + and # wildcards."""
+    levels = topic.split("/")
+    for index, level in enumerate(topic_filter.split("/")):
+        if level == "#":
+            return True
+        if index >= len(levels) or level not in ("+", levels[index]):
+            return False
+    return len(levels) == len(topic_filter.split("/"))
+
+
+class FakeBroker:
+    """In-process transport, the messages are delivered synchronously.
+
+    Several clients can share the broker. The messages published by the
+    clients are kept in published, the messages of the devices are injected
+    with deliver.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the broker."""
+        self._subscriptions: list[tuple[str, MessageCallback]] = []
+        self.published: list[tuple[str, str]] = []
+
+    async def subscribe(
+        self, topic: str, callback: MessageCallback
+    ) -> Callable[[], None]:
+        """Subscribe to a topic filter, returns the unsubscribe callback."""
+        subscription = (topic, callback)
+        self._subscriptions.append(subscription)
+        return lambda: self._subscriptions.remove(subscription)
+
+    async def publish(self, topic: str, payload: str) -> None:
+        """Publish a payload of a client."""
+        self.published.append((topic, payload))
+        self.deliver(topic, payload)
+
+    def deliver(self, topic: str, payload: str) -> None:
+        """Deliver a message to the matching subscriptions."""
+        for topic_filter, callback in list(self._subscriptions):
+            if topic_matches(topic_filter, topic):
+                callback(topic, payload)
+
+
+@dataclass(slots=True, frozen=True)
+class _TopicDecoder:
+    """A decoded value of a topic."""
+
+    port: int
+    key: str
+    options: tuple[str, ...] | None
+    mode: bool
+
+    def decode(self, payload: str) -> float | str | None:
+        """Decode a payload of the topic."""
+        if not self.mode:
+            return decode_payload(payload, self.options)
+        try:
+            return decode_mode(payload, self.options or ())
+        except ValueError:
+            return None
+
+
+@dataclass(slots=True)
+class PrismState:
+    """The last decoded value of every key of a Prism, by port.
+
+    The device values (grid power, core temperature, Powerwall) are on port 0.
+    """
+
+    values: dict[int, dict[str, float | str | None]] = field(default_factory=dict)
+
+    def get(self, port: int, key: str) -> float | str | None:
+        """Return the last value of a key, None when it is unknown."""
+        return self.values.get(port, {}).get(key)
+
+
+StateListener = Callable[[int, str, float | str | None], None]
+
+
+class PrismClient:
+    """Decoded state and commands of a Prism device.
+
+    The client subscribes once to all the topics of the device and keeps the
+    last decoded value of every sensor, number and mode of the schema in its
+    state. The listeners get every decoded value, changed or not.
+    """
+
+    def __init__(
+        self,
+        transport: PrismTransport,
+        topic: str,
+        ports: int = 1,
+        powerwall: bool = False,
+    ) -> None:
+        """Initialize the client of the device publishing under topic."""
+        self._transport = transport
+        self._topic = topic
+        self._ports = ports
+        self.state = PrismState()
+        self._listeners: list[StateListener] = []
+        self._unsubscribe: Callable[[], None] | None = None
+        self._decoders: dict[str, list[_TopicDecoder]] = {}
+        self._commands: dict[str, tuple[str, Any]] = {}
+        for platform, rows in SCHEMA.items():
+            for row in rows:
+                if row["group"] == GROUP_POWERWALL and not powerwall:
+                    continue
+                self._add_row(platform, row)
+
+    def _add_row(self, platform: str, row: dict[str, Any]) -> None:
+        """Add the decoder and the command of a row of the schema."""
+        key = row["translation_key"]
+        if platform == "button":
+            self._commands[key] = (row["command"], row["parameter"])
+            return
+        if "topic_out" in row:
+            self._commands[key] = (row["topic_out"].rpartition("/")[2], None)
+        if platform not in ("select", "number") and "decoder" not in row:
+            return
+        options = row.get("options") if row.get("decoder") != DECODER_NUMBER else None
+        if row["group"] == GROUP_PORT:
+            instances = [
+                (row["topic"].format(port), port) for port in range(1, self._ports + 1)
+            ]
+        else:
+            instances = [(row["topic"], 0)]
+        for topic, port in instances:
+            self._decoders.setdefault(topic, []).append(
+                _TopicDecoder(
+                    port,
+                    key,
+                    tuple(options) if options is not None else None,
+                    platform == "select",
+                )
+            )
+
+    async def start(self) -> None:
+        """Subscribe to the topics of the device."""
+        if self._unsubscribe is None:
+            self._unsubscribe = await self._transport.subscribe(
+                f"{self._topic}#", self._message_received
+            )
+
+    async def stop(self) -> None:
+        """Unsubscribe from the topics of the device."""
+        if self._unsubscribe is not None:
+            self._unsubscribe()
+            self._unsubscribe = None
+
+    def add_listener(self, listener: StateListener) -> Callable[[], None]:
+        """Listen to the decoded values, returns the remove callback."""
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener)
+
+    def _message_received(self, topic: str, payload: str) -> None:
+        """Decode a message of the device into the state."""
+        decoders = self._decoders.get(topic.removeprefix(self._topic))
+        if decoders is None:
+            return
+        for decoder in decoders:
+            value = decoder.decode(payload)
+            self.state.values.setdefault(decoder.port, {})[decoder.key] = value
+            for listener in self._listeners:
+                listener(decoder.port, decoder.key, value)
+
+    async def set_mode(self, port: int, mode: str) -> None:
+        """Set the mode of a port, one of the options of the mode select."""
+        options = next(
+            decoder.options
+            for decoder in self._decoders[f"{port}/mode"]
+            if decoder.mode
+        )
+        await self.command(port, "set_port_mode", encode_option(options or (), mode))
+
+    async def command(self, port: int, key: str, value: Any = None) -> None:
+        """Send the command of a number, select or button of the schema.
+
+        The buttons send their fixed parameter, the other commands the value.
+        """
+        if not 1 <= port <= self._ports:
+            raise ValueError(f"Invalid port: {port}")
+        command, parameter = self._commands[key]
+        payload = parameter if parameter is not None else value
+        if isinstance(payload, float):
+            payload = int(payload)
+        await self._transport.publish(
+            self._topic + command_topic(port, command), str(payload)
+        )
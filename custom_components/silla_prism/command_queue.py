@@ -0,0 +1,177 @@
+"""Outgoing command queue of a Prism config entry."""
+
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from enum import IntEnum
+import logging
+from typing import Any
+
+from homeassistant.components import mqtt
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+
+_LOGGER = logging.getLogger(__name__)
+
+QUEUE_SIZE = 32
+
+
+class CommandLane(IntEnum):
+    """Priority lanes of the commands, lower values are sent first."""
+
+    SAFETY = 0
+    CONTROL = 1
+    MODE = 2
+
+
+@dataclass(slots=True, frozen=True)
+class CommandPolicy:
+    """How a Prism command is queued and published."""
+
+    lane: CommandLane
+    qos: int = 1
+    retain: bool = False
+
+
+@dataclass(slots=True, frozen=True)
+class PrismCommand:
+    """A command waiting to be published."""
+
+    topic: str
+    payload: mqtt.PublishPayloadType
+    policy: CommandPolicy
+    # Called once the command is handed to the MQTT client
+    sent: CALLBACK_TYPE | None = None
+
+
+DEFAULT_POLICY = CommandPolicy(CommandLane.CONTROL)
+COMMAND_POLICIES: dict[str, CommandPolicy] = {
+    "set_current_limit": CommandPolicy(CommandLane.SAFETY),
+    "set_current_user": CommandPolicy(CommandLane.CONTROL),
+    "set_mode": CommandPolicy(CommandLane.MODE),
+    "set_mode_traps": CommandPolicy(CommandLane.MODE),
+}
+
+
+def get_policy(topic: str) -> CommandPolicy:
+    """Return the policy of a command topic, e.g. 1/command/set_mode."""
+    return COMMAND_POLICIES.get(topic.rpartition("/")[2], DEFAULT_POLICY)
+
+
+class PrismCommandQueue:
+    """Bounded queue of the commands, drained in priority order.
+
+    While the broker is connected and nothing is waiting the commands are
+    published at once. During an outage they are kept, a new command for a
+    topic supersedes the one already waiting and, when the queue is full, the
+    oldest command of the lowest priority lane is dropped. The queue is
+    drained when the broker connects again.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        send: Callable[[PrismCommand], Awaitable[None]],
+        size: int = QUEUE_SIZE,
+    ) -> None:
+        """Initialize the queue, send publishes a command."""
+        self._hass = hass
+        self._send = send
+        self._size = size
+        self._lanes: tuple[dict[str, PrismCommand], ...] = tuple(
+            {} for _ in CommandLane
+        )
+        self._connected = mqtt.is_connected(hass)
+        self._draining = False
+        self.published = 0
+        self.collapsed = 0
+        self.dropped = 0
+        self.failed = 0
+
+    @property
+    def depth(self) -> int:
+        """Return the number of waiting commands."""
+        return sum(len(commands) for commands in self._lanes)
+
+    async def async_publish(self, command: PrismCommand) -> None:
+        """Queue a command and publish it when the broker is connected."""
+        for commands in self._lanes:
+            if commands.pop(command.topic, None) is not None:
+                self.collapsed += 1
+                break
+        else:
+            if self.depth >= self._size and not self._async_drop(command):
+                return
+        self._lanes[command.policy.lane][command.topic] = command
+        if self._connected:
+            await self._async_drain()
+
+    @callback
+    def async_connection_changed(self, connected: bool) -> None:
+        """Drain the waiting commands when the broker connects."""
+        self._connected = connected
+        if connected and self.depth:
+            self._hass.async_create_task(self._async_drain())
+
+    @callback
+    def as_dict(self) -> dict[str, Any]:
+        """Return the queue counters for the diagnostics."""
+        return {
+            "depth": self.depth,
+            "lanes": {
+                lane.name.lower(): len(commands)
+                for lane, commands in zip(CommandLane, self._lanes, strict=True)
+            },
+            "published": self.published,
+            "collapsed": self.collapsed,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+    @callback
+    def _async_drop(self, command: PrismCommand) -> bool:
+        """Make room for a command, returns False when the command is dropped."""
+        for lane in reversed(CommandLane):
+            if lane < command.policy.lane:
+                break
+            if commands := self._lanes[lane]:
+                dropped = commands.pop(next(iter(commands)))
+                self._async_log_drop(dropped)
+                return True
+        self._async_log_drop(command)
+        return False
+
+    @callback
+    def _async_log_drop(self, command: PrismCommand) -> None:
+        """Count a dropped command."""
+        self.dropped += 1
+        _LOGGER.warning(
+            "Command queue full, dropped %s: %s", command.topic, command.payload
+        )
+
+    @callback
+    def _async_pop(self) -> PrismCommand | None:
+        """Return the oldest command of the highest priority lane."""
+        for commands in self._lanes:
+            if commands:
+                return commands.pop(next(iter(commands)))
+        return None
+
+    async def _async_drain(self) -> None:
+        """Publish the waiting commands in priority order."""
+        if self._draining:
+            return
+        self._draining = True
+        try:
+            while self._connected and (command := self._async_pop()) is not None:
+                try:
+                    await self._send(command)
+                except HomeAssistantError as err:
+                    self.failed += 1
+                    _LOGGER.warning("Failed to publish %s: %s", command.topic, err)
+                    # Keep it unless a newer command for the topic is waiting
+                    if all(command.topic not in commands for commands in self._lanes):
+                        self._lanes[command.policy.lane][command.topic] = command
+                    break
+                self.published += 1
+        finally:
+            self._draining = False
@@ -1,6 +1,8 @@
 """Silla Prism for Home Assistant."""
 
 import asyncio
+from collections.abc import Iterable
+from contextlib import suppress
 import logging
 import re
 from typing import Any
@@ -10,29 +12,57 @@ import voluptuous as vol
 from homeassistant.components import mqtt
 from homeassistant.config_entries import (
     SOURCE_RECONFIGURE,
+    ConfigEntry,
     ConfigFlow,
     ConfigFlowResult,
+    OptionsFlow,
 )
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.selector import TextSelector, TextSelectorConfig
 
 from .const import (
+    CONF_BALANCE_PRIORITY,
+    CONF_EXPIRE_MULTIPLE,
+    CONF_FLUSH_WINDOW,
+    CONF_GRID_IMPORT_LIMIT,
     CONF_MAX_CURRENT,
     CONF_PORTS,
     CONF_POWERWALL,
+    CONF_ROLLING_STATS,
+    CONF_SCHEDULE,
     CONF_SERIAL,
+    CONF_SITE_AGGREGATES,
+    CONF_SITE_CURRENT_LIMIT,
+    CONF_TARIFFS,
     CONF_TOPIC,
     CONF_VSENSORS,
+    DEFAULT_BALANCE_PRIORITY,
+    DEFAULT_EXPIRE_MULTIPLE,
+    DEFAULT_FLUSH_WINDOW,
+    DEFAULT_GRID_IMPORT_LIMIT,
     DEFAULT_MAX_CURRENT,
     DEFAULT_PORTS,
     DEFAULT_POWERWALL,
+    DEFAULT_ROLLING_STATS,
+    DEFAULT_SCHEDULE,
     DEFAULT_SERIAL,
+    DEFAULT_SITE_AGGREGATES,
+    DEFAULT_SITE_CURRENT_LIMIT,
+    DEFAULT_TARIFFS,
     DEFAULT_TOPIC,
     DEFAULT_VSENSORS,
     DOMAIN,
 )
+from .scheduler import parse_schedule
+from .tariff import parse_tariffs
 
 _LOGGER = logging.getLogger(__name__)
 
+# Topics published periodically by a Prism, relative to its topic
+PROBE_TOPICS = ("0/info/temperature/core", "energy_data/power_grid", "hello")
+PROBE_TIMEOUT = 5
+
 SILLA_PRISM_SCHEMA = vol.Schema(
     {
         vol.Required(CONF_TOPIC, default=DEFAULT_TOPIC): cv.string,
@@ -44,6 +74,79 @@ SILLA_PRISM_SCHEMA = vol.Schema(
     }
 )
 
+SILLA_PRISM_OPTIONS_SCHEMA = vol.Schema(
+    {
+        vol.Optional(CONF_FLUSH_WINDOW, default=DEFAULT_FLUSH_WINDOW): vol.All(
+            vol.Coerce(int), vol.Range(min=0, max=1000)
+        ),
+        vol.Optional(CONF_ROLLING_STATS, default=DEFAULT_ROLLING_STATS): cv.boolean,
+        vol.Optional(
+            CONF_SITE_AGGREGATES, default=DEFAULT_SITE_AGGREGATES
+        ): cv.boolean,
+        vol.Optional(
+            CONF_SITE_CURRENT_LIMIT, default=DEFAULT_SITE_CURRENT_LIMIT
+        ): cv.positive_int,
+        vol.Optional(
+            CONF_BALANCE_PRIORITY, default=DEFAULT_BALANCE_PRIORITY
+        ): vol.Coerce(int),
+        vol.Optional(
+            CONF_GRID_IMPORT_LIMIT, default=DEFAULT_GRID_IMPORT_LIMIT
+        ): cv.positive_int,
+        vol.Optional(CONF_EXPIRE_MULTIPLE, default=DEFAULT_EXPIRE_MULTIPLE): vol.All(
+            vol.Coerce(float), vol.Range(min=2, max=20)
+        ),
+        vol.Optional(CONF_TARIFFS, default=DEFAULT_TARIFFS): TextSelector(
+            TextSelectorConfig(multiline=True)
+        ),
+        vol.Optional(CONF_SCHEDULE, default=DEFAULT_SCHEDULE): TextSelector(
+            TextSelectorConfig(multiline=True)
+        ),
+    }
+)
+
+
+async def async_probe_devices(
+    hass: HomeAssistant, topics: Iterable[str], timeout: float = PROBE_TIMEOUT
+) -> dict[str, str | None]:
+    """Wait for a message of every device, returns the error of every topic.
+
+    The probe topics of all the devices are subscribed concurrently and share
+    the wait, so it is bounded by the timeout and not by the number of devices.
+    """
+    errors: dict[str, str | None] = dict.fromkeys(topics, "Timeout expired")
+    if not errors:
+        return errors
+    pending = set(errors)
+    done = asyncio.Event()
+
+    @callback
+    def message_received(msg: mqtt.ReceiveMessage) -> None:
+        """Handle new messages on MQTT."""
+        for probe in PROBE_TOPICS:
+            topic = msg.topic[: -len(probe)]
+            if msg.topic.endswith(probe) and topic in pending:
+                _LOGGER.debug("Device found on topic: %s", topic)
+                pending.discard(topic)
+                errors[topic] = None
+                if not pending:
+                    done.set()
+
+    _LOGGER.debug("Subscribing probe topics of: %s", ", ".join(errors))
+    unsubscribes = await asyncio.gather(
+        *(
+            mqtt.async_subscribe(hass, topic + probe, message_received)
+            for topic in errors
+            for probe in PROBE_TOPICS
+        )
+    )
+    try:
+        with suppress(TimeoutError):
+            await asyncio.wait_for(done.wait(), timeout)
+    finally:
+        for unsubscribe in unsubscribes:
+            unsubscribe()
+    return errors
+
 
 class SillaPrismConfigFlow(ConfigFlow, domain=DOMAIN):
     """Handle a Silla Prism config flow."""
@@ -60,38 +163,17 @@ class SillaPrismConfigFlow(ConfigFlow, domain=DOMAIN):
         self._serial: str = DEFAULT_SERIAL
         self._max_current: int = DEFAULT_MAX_CURRENT
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry: ConfigEntry) -> OptionsFlow:
+        """Get the options flow for this handler."""
+        return SillaPrismOptionsFlow(config_entry)
+
     async def fetch_device_info(self) -> str | None:
         """Fetech information from MQTT."""
         assert self._topic is not None
-        error = None
-        event = asyncio.Event()
-
-        async def message_received(msg):
-            """Handle new messages on MQTT."""
-            _LOGGER.debug("New intent: %s", msg.payload)
-            event.set()
-
-        topic1 = self._topic + "0/info/temperature/core"
-        _LOGGER.debug("Subscribing test topic1: %s", topic1)
-        unsub_topic1 = await mqtt.async_subscribe(self.hass, topic1, message_received)
-
-        topic2 = self._topic + "energy_data/power_grid"
-        _LOGGER.debug("Subscribing test topic2: %s", topic2)
-        unsub_topic2 = await mqtt.async_subscribe(self.hass, topic2, message_received)
-
-        topic3 = self._topic + "hello"
-        _LOGGER.debug("Subscribing test topic3: %s", topic3)
-        unsub_topic3 = await mqtt.async_subscribe(self.hass, topic3, message_received)
-
-        try:
-            await asyncio.wait_for(event.wait(), 5)
-        except TimeoutError:
-            error = "Timeout expired"
-
-        unsub_topic1()
-        unsub_topic2()
-        unsub_topic3()
-        return error
+        errors = await async_probe_devices(self.hass, [self._topic])
+        return errors[self._topic]
 
     async def _async_validate_device(
         self, user_input: dict[str, Any] | None = None
@@ -210,7 +292,8 @@ class SillaPrismConfigFlow(ConfigFlow, domain=DOMAIN):
             CONF_POWERWALL: entry.data.get(CONF_POWERWALL, DEFAULT_POWERWALL),
             CONF_MAX_CURRENT: self._max_current,
         }
-        return self.async_update_reload_and_abort(
+        # The update listener applies the change without reloading the entry
+        return self.async_update_and_abort(
             self._get_reconfigure_entry(),
             data_updates=config_data,
         )
@@ -221,3 +304,50 @@ class SillaPrismConfigFlow(ConfigFlow, domain=DOMAIN):
         """Handle a flow initialized by the user."""
         _LOGGER.info("Async_step_user %s", DOMAIN)
         return await self._async_step_user_base(user_input=user_input)
+
+    async def async_step_import(self, import_data: dict[str, Any]) -> ConfigFlowResult:
+        """Create the entry of a charger already probed by the import service."""
+        self._async_abort_entries_match({CONF_TOPIC: import_data[CONF_TOPIC]})
+        self._topic = import_data[CONF_TOPIC]
+        self._ports = import_data[CONF_PORTS]
+        self._serial = re.sub(r"[^a-zA-Z0-9]", "", import_data[CONF_SERIAL])
+        self._vsensors = import_data[CONF_VSENSORS]
+        self._powerwall = import_data[CONF_POWERWALL]
+        self._max_current = max(min(import_data[CONF_MAX_CURRENT], 32), 6)
+        return await self._async_create_entry()
+
+
+class SillaPrismOptionsFlow(OptionsFlow):
+    """Handle the Silla Prism options."""
+
+    def __init__(self, config_entry: ConfigEntry) -> None:
+        """Initialize options flow."""
+        self._entry = config_entry
+
+    async def async_step_init(
+        self, user_input: dict[str, Any] | None = None
+    ) -> ConfigFlowResult:
+        """Manage the options."""
+        errors: dict[str, str] = {}
+        if user_input is not None:
+            try:
+                parse_tariffs(user_input.get(CONF_TARIFFS, DEFAULT_TARIFFS))
+            except ValueError:
+                errors[CONF_TARIFFS] = "invalid_tariffs"
+            try:
+                parse_schedule(
+                    user_input.get(CONF_SCHEDULE, DEFAULT_SCHEDULE),
+                    self._entry.data.get(CONF_PORTS, DEFAULT_PORTS),
+                )
+            except ValueError:
+                errors[CONF_SCHEDULE] = "invalid_schedule"
+            if not errors:
+                return self.async_create_entry(data=user_input)
+
+        return self.async_show_form(
+            step_id="init",
+            data_schema=self.add_suggested_values_to_schema(
+                SILLA_PRISM_OPTIONS_SCHEMA, user_input or self._entry.options
+            ),
+            errors=errors,
+        )
@@ -6,6 +6,7 @@ BINARY_SENSOR_DOMAIN = "binary_sensor"
 NUMBER_DOMAIN = "number"
 SELECT_DOMAIN = "select"
 BUTTON_DOMAIN = "button"
+EVENT_DOMAIN = "event"
 CONF_TOPIC = "topic"
 CONF_VSENSORS = "vsensors"
 CONF_POWERWALL = "powerwall"
@@ -19,5 +20,27 @@ DEFAULT_PORTS = 1
 DEFAULT_SERIAL = ""
 DEFAULT_MAX_CURRENT = 16
 
+CONF_FLUSH_WINDOW = "flush_window"
+CONF_ROLLING_STATS = "rolling_stats"
+CONF_SITE_CURRENT_LIMIT = "site_current_limit"
+CONF_BALANCE_PRIORITY = "balance_priority"
+CONF_GRID_IMPORT_LIMIT = "grid_import_limit"
+CONF_EXPIRE_MULTIPLE = "expire_multiple"
+CONF_TARIFFS = "tariffs"
+CONF_SCHEDULE = "schedule"
+CONF_SITE_AGGREGATES = "site_aggregates"
+DEFAULT_FLUSH_WINDOW = 0
+DEFAULT_ROLLING_STATS = False
+DEFAULT_SITE_CURRENT_LIMIT = 0
+DEFAULT_BALANCE_PRIORITY = 0
+DEFAULT_GRID_IMPORT_LIMIT = 0
+DEFAULT_EXPIRE_MULTIPLE = 3
+DEFAULT_TARIFFS = ""
+DEFAULT_SCHEDULE = ""
+DEFAULT_SITE_AGGREGATES = False
+
+CARD_FILENAME = "prism-charger-card.js"
+CARD_URL = f"/{DOMAIN}/{CARD_FILENAME}"
+
 CONF_ALLOW_SERVICE_CALLS = "allow_service_calls"
 DEFAULT_NEW_CONFIG_ALLOW_ALLOW_SERVICE_CALLS = False
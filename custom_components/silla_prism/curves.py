@@ -0,0 +1,293 @@
+"""Compact power and current curves of the Prism charging sessions.
+
+A curve is a stream of points, each encoded as two zigzag varints: the
+seconds since the previous point and the change of the quantized value. A
+point is only added when the quantized value changes, so a steady charge
+costs nothing. The encoded bytes of a curve are bounded: when they are full
+the curve keeps every other point and doubles its minimum interval, so a
+session of any length fits in MAX_CURVE_BYTES per curve.
+"""
+
+from base64 import b64decode, b64encode
+from collections import deque
+from dataclasses import dataclass, field
+import logging
+from typing import Any
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN
+from .dispatcher import PrismDispatcher
+from .telemetry import PrismSample
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+# Seconds the store waits before writing the finished sessions
+SAVE_DELAY = 30
+
+STATE_KEY = "current_state"
+IDLE_STATE = "idle"
+ENERGY_KEY = "session_output_energy"
+# Quantum of the curves in the unit of their topic, 10 W and 100 mA
+CURVE_KEYS = {"output_power": 10.0, "output_current": 100.0}
+MAX_CURVE_BYTES = 2048
+# Finished sessions kept per port
+MAX_SESSIONS = 10
+
+
+def _encode_varint(value: int, out: bytearray) -> None:
+    """Append a signed integer as a zigzag varint."""
+    value = value * 2 if value >= 0 else -value * 2 - 1
+    while value > 0x7F:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _decode_varints(data: bytes) -> list[int]:
+    """Decode a sequence of zigzag varints."""
+    values = []
+    value = shift = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        shift += 7
+        if byte & 0x80:
+            continue
+        values.append(value >> 1 if not value & 1 else -(value >> 1) - 1)
+        value = shift = 0
+    return values
+
+
+def _get_store(hass: HomeAssistant, entry_id: str) -> Store[dict[str, Any]]:
+    """Return the store of the session curves of a config entry."""
+    return Store(hass, STORAGE_VERSION, f"{DOMAIN}.curves.{entry_id}")
+
+
+async def async_remove_curves(hass: HomeAssistant, entry_id: str) -> None:
+    """Remove the saved session curves of a deleted config entry."""
+    await _get_store(hass, entry_id).async_remove()
+
+
+class SessionCurve:
+    """The delta encoded curve of one topic during a session.
+
+    The points are the session seconds and the quantized level. A new change
+    closer than the minimum interval to the last point replaces it, so the
+    last level of the curve is always the last reported one.
+    """
+
+    __slots__ = (
+        "_level",
+        "_offset",
+        "_previous",
+        "_time",
+        "data",
+        "interval",
+        "quantum",
+    )
+
+    def __init__(self, quantum: float, data: bytes = b"", interval: int = 1) -> None:
+        """Initialize the curve, or resume it from its encoded bytes."""
+        self.quantum = quantum
+        self.interval = interval
+        self.data = bytearray()
+        # Seconds and level of the point before the last one, and the offset
+        # of the last one while it can be replaced
+        self._previous = (0, 0)
+        self._time = self._level = 0
+        self._offset: int | None = None
+        self._encode(self._points(data))
+
+    def add(self, seconds: int, value: float) -> None:
+        """Add the value of a topic at the session seconds."""
+        level = round(value / self.quantum)
+        if self.data and level == self._level:
+            return
+        if self._offset is not None and seconds - self._time < self.interval:
+            # Replace the last point, keeping its time
+            del self.data[self._offset :]
+            if level == self._previous[1]:
+                # Back to the previous level, the point is dropped
+                self._time, self._level = self._previous
+                self._offset = None
+                return
+            seconds = self._time
+        else:
+            self._previous = (self._time, self._level)
+            self._offset = len(self.data)
+        _encode_varint(seconds - self._previous[0], self.data)
+        _encode_varint(level - self._previous[1], self.data)
+        self._time, self._level = seconds, level
+        if len(self.data) > MAX_CURVE_BYTES:
+            self.interval *= 2
+            points = self._points(self.data)
+            self._encode([*points[:-1:2], points[-1]])
+
+    def points(self) -> list[tuple[int, float]]:
+        """Return the points of the curve, in session seconds and topic unit."""
+        return [(time, level * self.quantum) for time, level in self._points(self.data)]
+
+    @staticmethod
+    def _points(data: bytes) -> list[tuple[int, int]]:
+        """Decode the points of the curve, in seconds and quantized levels."""
+        deltas = _decode_varints(data)
+        points = []
+        time = level = 0
+        for index in range(0, len(deltas) - 1, 2):
+            time += deltas[index]
+            level += deltas[index + 1]
+            points.append((time, level))
+        return points
+
+    def _encode(self, points: list[tuple[int, int]]) -> None:
+        """Encode the points again, dropping the repeated levels."""
+        self.data.clear()
+        self._previous = (0, 0)
+        self._time = self._level = 0
+        self._offset = None
+        for time, level in points:
+            if self.data and level == self._level:
+                continue
+            self._previous = (self._time, self._level)
+            self._offset = len(self.data)
+            _encode_varint(time - self._time, self.data)
+            _encode_varint(level - self._level, self.data)
+            self._time, self._level = time, level
+
+
+@dataclass(slots=True)
+class ChargingSession:
+    """A charging session of a port, from its start to the return to idle."""
+
+    port: int
+    start: float
+    end: float | None = None
+    energy: float | None = None
+    curves: dict[str, SessionCurve] = field(
+        default_factory=lambda: {
+            key: SessionCurve(quantum) for key, quantum in CURVE_KEYS.items()
+        }
+    )
+
+    def as_dict(self, decoded: bool = False) -> dict[str, Any]:
+        """Return the session, with the encoded or the decoded curves."""
+        return {
+            "port": self.port,
+            "start": self.start,
+            "end": self.end,
+            "energy": self.energy,
+            "curves": {
+                key: curve.points()
+                if decoded
+                else {
+                    "data": b64encode(curve.data).decode(),
+                    "interval": curve.interval,
+                }
+                for key, curve in self.curves.items()
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "ChargingSession":
+        """Restore a session saved with as_dict."""
+        session = cls(data["port"], data["start"], data["end"], data["energy"])
+        for key, curve in data["curves"].items():
+            if key in CURVE_KEYS:
+                session.curves[key] = SessionCurve(
+                    CURVE_KEYS[key], b64decode(curve["data"]), curve["interval"]
+                )
+        return session
+
+
+class SessionCurveRecorder:
+    """Record the curves of the charging sessions of a config entry.
+
+    A session starts with the first state sample out of idle and ends with the
+    return to idle. The finished sessions of every port and the running ones
+    are saved in the store of the entry, a running session restored after a
+    restart goes on until its port reports idle.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        entry_id: str,
+        dispatcher: PrismDispatcher,
+        ports: int,
+    ) -> None:
+        """Initialize the recorder."""
+        self._dispatcher = dispatcher
+        self._store = _get_store(hass, entry_id)
+        self._sessions: dict[int, deque[ChargingSession]] = {
+            port: deque(maxlen=MAX_SESSIONS) for port in range(1, ports + 1)
+        }
+        self._running: dict[int, ChargingSession] = {}
+
+    async def async_start(self) -> CALLBACK_TYPE:
+        """Load the saved sessions and start recording, returns the stop."""
+        try:
+            stored = await self._store.async_load() or {}
+            for data in stored.get("sessions", []):
+                session = ChargingSession.from_dict(data)
+                if session.port not in self._sessions:
+                    continue
+                if session.end is None:
+                    self._running[session.port] = session
+                else:
+                    self._sessions[session.port].append(session)
+        except (KeyError, TypeError, ValueError) as err:
+            _LOGGER.warning("Discarding the saved session curves: %s", err)
+        unsubscribe = self._dispatcher.async_subscribe_telemetry(
+            self._async_sample_received
+        )
+
+        @callback
+        def _stop() -> None:
+            unsubscribe()
+            self._store.async_delay_save(self._data_to_save, 0)
+
+        return _stop
+
+    @callback
+    def async_get_sessions(self, port: int | None = None) -> list[ChargingSession]:
+        """Return the finished and the running sessions, oldest first."""
+        sessions = []
+        for session_port, finished in self._sessions.items():
+            if port is None or port == session_port:
+                sessions.extend(finished)
+                if session_port in self._running:
+                    sessions.append(self._running[session_port])
+        return sessions
+
+    @callback
+    def _async_sample_received(self, sample: PrismSample) -> None:
+        """Follow the sessions and add the samples to their curves."""
+        if sample.port not in self._sessions or sample.value is None:
+            return
+        session = self._running.get(sample.port)
+        if sample.key == STATE_KEY:
+            if sample.value == IDLE_STATE and session is not None:
+                session.end = sample.timestamp
+                self._sessions[sample.port].append(self._running.pop(sample.port))
+                self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+            elif sample.value != IDLE_STATE and session is None:
+                self._running[sample.port] = ChargingSession(
+                    sample.port, sample.timestamp
+                )
+                self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+            return
+        if session is None or not isinstance(sample.value, float):
+            return
+        if sample.key == ENERGY_KEY:
+            session.energy = sample.value
+        elif (curve := session.curves.get(sample.key)) is not None:
+            curve.add(round(sample.timestamp - session.start), sample.value)
+
+    @callback
+    def _data_to_save(self) -> dict[str, Any]:
+        """Return the finished and the running sessions to save."""
+        return {
+            "sessions": [session.as_dict() for session in self.async_get_sessions()]
+        }
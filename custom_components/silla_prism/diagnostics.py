@@ -0,0 +1,39 @@
+"""Diagnostics support for the Silla Prism integration."""
+
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import CONF_SERIAL
+from .domain_data import DomainData
+from .entry_data import RuntimeEntryData
+
+TO_REDACT = {CONF_SERIAL}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    entry_data: RuntimeEntryData = DomainData.get(hass).get_entry_data(entry)
+    diagnostics: dict[str, Any] = {
+        "entry": {
+            "data": async_redact_data(entry.data, TO_REDACT),
+            "options": dict(entry.options),
+        },
+        "snapshot": entry_data.snapshot,
+        "cadences": entry_data.dispatcher.async_get_cadences(),
+        "filters": entry_data.dispatcher.async_get_filters(),
+        "commands": entry_data.dispatcher.commands.as_dict(),
+        "trace": entry_data.dispatcher.trace.as_list(),
+    }
+    if entry_data.overload is not None:
+        diagnostics["overload"] = {
+            "last_latency": entry_data.overload.last_latency,
+            "max_latency": entry_data.overload.max_latency,
+        }
+    if entry_data.scheduler is not None:
+        diagnostics["schedule"] = entry_data.scheduler.async_next()
+    return diagnostics
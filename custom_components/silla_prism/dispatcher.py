@@ -0,0 +1,471 @@
+"""MQTT dispatcher for the Prism entities of one config entry."""
+
+import asyncio
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+import logging
+import time
+from typing import Any
+
+from homeassistant.components import mqtt
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.entity import Entity
+
+from .cadence import TopicCadence
+from .client import decode_payload
+from .command_queue import PrismCommand, PrismCommandQueue, get_policy
+from .filters import SampleFilter
+from .telemetry import (
+    SIGNAL_TELEMETRY,
+    SIGNAL_TRANSITION,
+    PrismSample,
+    PrismTransition,
+    async_subscribe_telemetry,
+    async_subscribe_transitions,
+)
+from .trace import DIRECTION_IN, DIRECTION_OUT, PrismTrace
+
+_LOGGER = logging.getLogger(__name__)
+
+MessageHandler = Callable[[mqtt.ReceiveMessage], None]
+
+
+def _dispatch(handlers: list[MessageHandler], msg: mqtt.ReceiveMessage) -> None:
+    """Run the handlers of a message, a broken handler does not starve the others."""
+    for handler in handlers:
+        try:
+            handler(msg)
+        except Exception:
+            _LOGGER.exception("Error handling %s: %s", msg.topic, msg.payload)
+
+
+@dataclass(slots=True)
+class _Expiry:
+    """The expiry of the value of an entity.
+
+    Until the topic publishes its first message the expiry counts from the
+    time the entity started tracking it.
+    """
+
+    cadence: TopicCadence
+    expire_after: float
+    since: float
+    expired: bool = False
+
+    def deadline(self, multiple: float) -> float:
+        """Return the loop time when the value is stale."""
+        last = self.since if self.cadence.last is None else self.cadence.last
+        return last + self.cadence.timeout(multiple, self.expire_after)
+
+
+class PrismDispatcher:
+    """Route the MQTT messages of one entry and coalesce the state writes.
+
+    Every topic is subscribed only once, whatever the number of entities that
+    listen to it. Entities do not write their state in the message handlers but
+    mark themselves dirty: all the dirty entities are written together in a
+    single flush at the end of the burst of messages published by the charger.
+    The registered telemetry topics are also decoded once and sent at full rate
+    on the telemetry signal of the entry.
+
+    The dispatcher learns the publish cadence of every topic and marks the
+    values stale after expire_multiple times the cadence, with a single sweep
+    timer for all the entities of the entry. While the MQTT broker is
+    disconnected all the entities are unavailable, they are restored in a
+    single pass when it connects again.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        entry_id: str,
+        topic: str,
+        flush_window: float,
+        expire_multiple: float,
+    ) -> None:
+        """Initialize the dispatcher, flush_window is in seconds."""
+        self._hass = hass
+        self._entry_id = entry_id
+        self._telemetry_signal = SIGNAL_TELEMETRY.format(entry_id)
+        self._transition_signal = SIGNAL_TRANSITION.format(entry_id)
+        self._topic = topic
+        self._flush_window = flush_window
+        self._handlers: dict[str, list[MessageHandler]] = {}
+        self._raw_handlers: dict[str, list[MessageHandler]] = {}
+        self._unsubscribes: dict[str, CALLBACK_TYPE] = {}
+        self._receivers: dict[str, MessageHandler] = {}
+        self._dirty: dict[Entity, None] = {}
+        self._flush_handle: asyncio.Handle | None = None
+        self._flush_listeners: list[CALLBACK_TYPE] = []
+        self._expire_multiple = expire_multiple
+        self._cadences: dict[str, TopicCadence] = {}
+        self._filters: dict[str, SampleFilter] = {}
+        self._expiring: dict[Entity, _Expiry] = {}
+        self._entities: dict[Entity, None] = {}
+        self._offline: dict[Entity, None] = {}
+        self._connected = True
+        self._sweep_handle: asyncio.TimerHandle | None = None
+        # perf_counter time of the message being handled, for the latencies
+        self.last_receipt = 0.0
+        self.trace = PrismTrace()
+        self.commands = PrismCommandQueue(hass, self._async_send)
+
+    async def async_subscribe(
+        self, topic: str, handler: MessageHandler, raw: bool = False
+    ) -> CALLBACK_TYPE:
+        """Subscribe a handler to a topic relative to the entry topic.
+
+        The raw handlers get every message before the sample filter of the
+        topic, for the safety paths that must not wait for a step to be
+        accepted by the filter.
+        """
+        subscribe = topic not in self._receivers
+        if subscribe:
+            handlers: list[MessageHandler] = []
+            raw_handlers: list[MessageHandler] = []
+            self._handlers[topic] = handlers
+            self._raw_handlers[topic] = raw_handlers
+            _LOGGER.debug("Subscribing topic: %s%s", self._topic, topic)
+
+            record = self.trace.record
+            loop_time = self._hass.loop.time
+            cadence = self._cadences.setdefault(topic, TopicCadence())
+            filters = self._filters
+
+            @callback
+            def _message_received(msg: mqtt.ReceiveMessage) -> None:
+                self.last_receipt = time.perf_counter()
+                record(DIRECTION_IN, msg.topic, msg.payload)
+                now = loop_time()
+                cadence.update(now)
+                if raw_handlers:
+                    _dispatch(raw_handlers, msg)
+                if (
+                    (sample_filter := filters.get(topic)) is not None
+                    and (value := decode_payload(msg.payload, None)) is not None
+                    and not sample_filter.accept(now, value)
+                ):
+                    _LOGGER.debug("Rejected outlier %s: %s", msg.topic, msg.payload)
+                    return
+                _dispatch(handlers, msg)
+
+            self._receivers[topic] = _message_received
+        handlers = self._handlers[topic]
+        raw_handlers = self._raw_handlers[topic]
+        (raw_handlers if raw else handlers).append(handler)
+        if subscribe:
+            self._unsubscribes[topic] = await mqtt.async_subscribe(
+                self._hass, self._topic + topic, self._receivers[topic]
+            )
+
+        @callback
+        def _unsubscribe() -> None:
+            (raw_handlers if raw else handlers).remove(handler)
+            if not handlers and not raw_handlers:
+                del self._handlers[topic]
+                del self._raw_handlers[topic]
+                del self._receivers[topic]
+                if unsubscribe := self._unsubscribes.pop(topic, None):
+                    unsubscribe()
+
+        return _unsubscribe
+
+    async def async_set_topic(self, topic: str) -> None:
+        """Move all the subscriptions under a new entry topic.
+
+        The handlers, the telemetry decoders and the learned cadences are kept,
+        only the MQTT subscriptions are replaced.
+        """
+        _LOGGER.debug("Moving subscriptions from %s to %s", self._topic, topic)
+        self._topic = topic
+        for relative in list(self._unsubscribes):
+            self._unsubscribes.pop(relative)()
+            unsubscribe = await mqtt.async_subscribe(
+                self._hass, topic + relative, self._receivers[relative]
+            )
+            if relative in self._handlers:
+                self._unsubscribes[relative] = unsubscribe
+            else:
+                # All the handlers left while subscribing
+                unsubscribe()
+
+    @callback
+    def async_configure(self, flush_window: float, expire_multiple: float) -> None:
+        """Change the flush window (in seconds) and the expiry multiple."""
+        self._flush_window = flush_window
+        self._expire_multiple = expire_multiple
+        if self._expiring and self._connected:
+            # Deadlines may be earlier with the new multiple
+            self._async_schedule_sweep(self._hass.loop.time())
+
+    async def async_publish(
+        self,
+        topic: str,
+        payload: mqtt.PublishPayloadType,
+        sent: CALLBACK_TYPE | None = None,
+    ) -> None:
+        """Queue a command to a topic relative to the entry topic.
+
+        The lane, QoS and retain flag of the command come from its policy, sent
+        is called when the command is actually published.
+        """
+        await self.commands.async_publish(
+            PrismCommand(topic, payload, get_policy(topic), sent)
+        )
+
+    async def _async_send(self, command: PrismCommand) -> None:
+        """Publish a command of the queue under the current entry topic."""
+        topic = self._topic + command.topic
+        self.trace.record(DIRECTION_OUT, topic, command.payload)
+        await mqtt.async_publish(
+            self._hass,
+            topic,
+            command.payload,
+            command.policy.qos,
+            command.policy.retain,
+        )
+        if command.sent is not None:
+            command.sent()
+
+    @callback
+    def async_connection_changed(self, connected: bool) -> None:
+        """Follow the connection state of the MQTT broker."""
+        self.commands.async_connection_changed(connected)
+        if connected == self._connected:
+            return
+        self._connected = connected
+        if connected:
+            self._async_resync()
+        else:
+            self._async_disconnected()
+
+    async def async_register_telemetry(
+        self,
+        topic: str,
+        port: int,
+        key: str,
+        options: Sequence[str] | None = None,
+        transitions: bool = False,
+        sample_filter: SampleFilter | None = None,
+    ) -> CALLBACK_TYPE:
+        """Send the decoded samples of a topic on the telemetry signal.
+
+        With transitions the real changes of the decoded value are also sent on
+        the transition signal, with the time spent in the previous value. The
+        messages rejected by the sample filter are dropped for all the handlers
+        of the topic.
+        """
+        if sample_filter is not None:
+            self._filters[topic] = sample_filter
+        last_value: float | str | None = None
+        last_change = 0.0
+
+        @callback
+        def _decode_sample(msg: mqtt.ReceiveMessage) -> None:
+            nonlocal last_value, last_change
+            value = decode_payload(msg.payload, options)
+            timestamp = time.time()
+            async_dispatcher_send(
+                self._hass,
+                self._telemetry_signal,
+                PrismSample(port, key, value, timestamp),
+            )
+            if not transitions or value is None or value == last_value:
+                return
+            if last_value is not None:
+                async_dispatcher_send(
+                    self._hass,
+                    self._transition_signal,
+                    PrismTransition(
+                        port, key, last_value, value, timestamp - last_change, timestamp
+                    ),
+                )
+            last_value, last_change = value, timestamp
+
+        return await self.async_subscribe(topic, _decode_sample)
+
+    @callback
+    def async_get_filters(self) -> dict[str, dict[str, Any]]:
+        """Return the counters of the sample filters, for the diagnostics."""
+        return {
+            topic: sample_filter.as_dict()
+            for topic, sample_filter in self._filters.items()
+        }
+
+    @callback
+    def async_subscribe_telemetry(
+        self, target: Callable[[PrismSample], None]
+    ) -> CALLBACK_TYPE:
+        """Subscribe to the telemetry samples of this entry."""
+        return async_subscribe_telemetry(self._hass, self._entry_id, target)
+
+    @callback
+    def async_subscribe_transitions(
+        self, target: Callable[[PrismTransition], None]
+    ) -> CALLBACK_TYPE:
+        """Subscribe to the state and mode transitions of this entry."""
+        return async_subscribe_transitions(self._hass, self._entry_id, target)
+
+    @callback
+    def async_track_entity(self, entity: Entity) -> CALLBACK_TYPE:
+        """Make the entity unavailable while the broker is disconnected."""
+        self._entities[entity] = None
+
+        @callback
+        def _untrack() -> None:
+            self._entities.pop(entity, None)
+            self._offline.pop(entity, None)
+
+        return _untrack
+
+    @callback
+    def async_track_expiry(
+        self, entity: Entity, topic: str, expire_after: float
+    ) -> CALLBACK_TYPE:
+        """Mark the entity value stale when the subscribed topic goes quiet."""
+        self._expiring[entity] = _Expiry(
+            self._cadences[topic], expire_after, self._hass.loop.time()
+        )
+
+        @callback
+        def _untrack() -> None:
+            self._expiring.pop(entity, None)
+
+        return _untrack
+
+    @callback
+    def async_refresh_expiry(self, entity: Entity) -> None:
+        """Restart the expiry of an entity that received a new value."""
+        if (expiry := self._expiring.get(entity)) is None:
+            return
+        expiry.expired = False
+        self._async_schedule_sweep(expiry.deadline(self._expire_multiple))
+
+    @callback
+    def async_get_cadences(self) -> dict[str, dict[str, Any]]:
+        """Return the learned cadence of the subscribed topics."""
+        return {
+            topic: cadence.as_dict(self._expire_multiple)
+            for topic, cadence in self._cadences.items()
+        }
+
+    @callback
+    def async_add_flush_listener(self, listener: CALLBACK_TYPE) -> None:
+        """Add a listener called at the end of every flush."""
+        self._flush_listeners.append(listener)
+
+    @callback
+    def async_mark_dirty(self, entity: Entity) -> None:
+        """Write the entity state at the next flush."""
+        self._dirty[entity] = None
+        self.async_schedule_flush()
+
+    @callback
+    def async_schedule_flush(self) -> None:
+        """Schedule a flush at the end of the current burst."""
+        if self._flush_handle is not None:
+            return
+        if self._flush_window > 0:
+            self._flush_handle = self._hass.loop.call_later(
+                self._flush_window, self._async_flush
+            )
+        else:
+            self._flush_handle = self._hass.loop.call_soon(self._async_flush)
+
+    @callback
+    def async_shutdown(self) -> None:
+        """Cancel the pending flush, the expiry sweep and all the subscriptions."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if self._sweep_handle is not None:
+            self._sweep_handle.cancel()
+            self._sweep_handle = None
+        self._dirty.clear()
+        self._expiring.clear()
+        self._entities.clear()
+        self._offline.clear()
+        for unsubscribe in self._unsubscribes.values():
+            unsubscribe()
+        self._unsubscribes.clear()
+        self._receivers.clear()
+        self._handlers.clear()
+        self._raw_handlers.clear()
+
+    @callback
+    def _async_flush(self) -> None:
+        """Write the state of all the dirty entities."""
+        dirty, self._dirty = self._dirty, {}
+        for entity in dirty:
+            if entity.hass is not None:
+                entity.async_write_ha_state()
+        for listener in self._flush_listeners:
+            listener()
+        self._flush_handle = None
+        if self._dirty:
+            self.async_schedule_flush()
+
+    @callback
+    def _async_disconnected(self) -> None:
+        """Make all the available entities unavailable in a single flush."""
+        _LOGGER.debug("MQTT broker disconnected, entities of %s offline", self._topic)
+        if self._sweep_handle is not None:
+            self._sweep_handle.cancel()
+            self._sweep_handle = None
+        for entity in self._entities:
+            if entity.available:
+                self._offline[entity] = None
+                entity.async_set_broker_connected(False)
+                self._dirty[entity] = None
+        self.async_schedule_flush()
+
+    @callback
+    def _async_resync(self) -> None:
+        """Restore the entities that were available before the outage.
+
+        The expiry of every topic restarts from now, so a value is stale again
+        only if the Prism does not publish it after the reconnection.
+        """
+        _LOGGER.debug("MQTT broker connected, resync of %s", self._topic)
+        now = self._hass.loop.time()
+        for cadence in self._cadences.values():
+            cadence.restart(now)
+        for expiry in self._expiring.values():
+            expiry.since = now
+        offline, self._offline = self._offline, {}
+        for entity in offline:
+            entity.async_set_broker_connected(True)
+            self._dirty[entity] = None
+        if self._expiring:
+            self._async_schedule_sweep(now)
+        self.async_schedule_flush()
+
+    @callback
+    def _async_schedule_sweep(self, deadline: float) -> None:
+        """Schedule the expiry sweep not later than deadline."""
+        if not self._connected:
+            return
+        if self._sweep_handle is not None:
+            if self._sweep_handle.when() <= deadline:
+                return
+            self._sweep_handle.cancel()
+        self._sweep_handle = self._hass.loop.call_at(deadline, self._async_sweep)
+
+    @callback
+    def _async_sweep(self) -> None:
+        """Expire the stale values and schedule the next sweep."""
+        self._sweep_handle = None
+        now = self._hass.loop.time()
+        next_deadline: float | None = None
+        for entity, expiry in list(self._expiring.items()):
+            if expiry.expired:
+                continue
+            deadline = expiry.deadline(self._expire_multiple)
+            if deadline <= now:
+                expiry.expired = True
+                entity.value_is_expired()
+            elif next_deadline is None or deadline < next_deadline:
+                next_deadline = deadline
+        if next_deadline is not None:
+            self._async_schedule_sweep(next_deadline)
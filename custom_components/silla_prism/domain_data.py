@@ -5,10 +5,12 @@ import logging
 from typing import Self, cast
 
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
 
 from .const import DOMAIN
 from .entry_data import RuntimeEntryData
+from .load_balancer import PrismLoadBalancer
+from .site import SiteAggregator
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -18,11 +20,22 @@ class DomainData:
     """Define a class that stores global prism wallbox data in hass.data[DOMAIN]."""
 
     _entry_datas: dict[str, RuntimeEntryData] = field(default_factory=dict)
+    _load_balancer: PrismLoadBalancer | None = None
+    _site_aggregator: SiteAggregator | None = None
+    _site_sensor_hosts: dict[str, CALLBACK_TYPE] = field(default_factory=dict)
 
     def get_entry_data(self, entry: ConfigEntry) -> RuntimeEntryData:
         """Return the runtime entry data associated with this config entry."""
         return self._entry_datas[entry.entry_id]
 
+    def get_entry_datas(self) -> dict[str, RuntimeEntryData]:
+        """Return the runtime entry data of all loaded config entries."""
+        return self._entry_datas
+
+    def pop_entry_data(self, entry: ConfigEntry) -> RuntimeEntryData:
+        """Pop the runtime entry data associated with this config entry."""
+        return self._entry_datas.pop(entry.entry_id)
+
     def set_entry_data(self, entry: ConfigEntry, entry_data: RuntimeEntryData) -> None:
         """Set the runtime entry data associated with this config entry."""
         if entry.entry_id not in self._entry_datas:
@@ -31,6 +44,40 @@ class DomainData:
             _LOGGER.warning("Entry data already set! Overwriting!")
             self._entry_datas[entry.entry_id] = entry_data
 
+    def get_load_balancer(self, hass: HomeAssistant) -> PrismLoadBalancer:
+        """Return the site load balancer shared by all config entries."""
+        if self._load_balancer is None:
+            self._load_balancer = PrismLoadBalancer(hass)
+        return self._load_balancer
+
+    def get_site_aggregator(self) -> SiteAggregator:
+        """Return the site aggregates shared by all config entries."""
+        if self._site_aggregator is None:
+            self._site_aggregator = SiteAggregator()
+        return self._site_aggregator
+
+    @callback
+    def async_add_site_sensor_host(
+        self, entry_id: str, add_sensors: CALLBACK_TYPE
+    ) -> CALLBACK_TYPE:
+        """Add a config entry able to host the site sensors, returns the remove.
+
+        The site sensors exist once per domain: the first entry adds them, when
+        it is removed the next entry adds them again.
+        """
+        self._site_sensor_hosts[entry_id] = add_sensors
+        if len(self._site_sensor_hosts) == 1:
+            add_sensors()
+
+        @callback
+        def _remove() -> None:
+            hosting = next(iter(self._site_sensor_hosts)) == entry_id
+            del self._site_sensor_hosts[entry_id]
+            if hosting and self._site_sensor_hosts:
+                next(iter(self._site_sensor_hosts.values()))()
+
+        return _remove
+
     @classmethod
     def get(cls, hass: HomeAssistant) -> Self:
         """Get the global DomainData instance stored in hass.data."""
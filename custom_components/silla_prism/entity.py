@@ -1,14 +1,13 @@
 """Contains sensors exposed by the Prism integration."""
 
-from datetime import datetime
 import logging
+from typing import Any
 
-from homeassistant.components import mqtt
-from homeassistant.core import CALLBACK_TYPE, callback
+from homeassistant.core import callback
 from homeassistant.helpers.device_registry import DeviceInfo
 from homeassistant.helpers.entity import Entity, EntityDescription
-from homeassistant.helpers.event import async_call_later
 
+from .dispatcher import PrismDispatcher
 from .entry_data import RuntimeEntryData
 
 _LOGGER = logging.getLogger(__name__)
@@ -26,11 +25,36 @@ class PrismBaseEntityDescription(EntityDescription, frozen_or_thawed=True):
     topic: str = None
 
 
+class PrismDerivedEntity(Entity):
+    """An Entity computed from the telemetry of a config entry.
+
+    Like the entities of the topics, it is unavailable while the MQTT broker is
+    disconnected. It must come before the platform entity in the bases.
+    """
+
+    _dispatcher: PrismDispatcher
+    _broker_connected = True
+
+    @property
+    def available(self) -> bool:
+        """Return False while the broker is disconnected."""
+        return self._broker_connected and super().available
+
+    @callback
+    def async_set_broker_connected(self, connected: bool) -> None:
+        """Follow the MQTT broker connection, written at the next flush."""
+        self._broker_connected = connected
+
+    async def async_added_to_hass(self) -> None:
+        """Follow the MQTT broker connection with the entities of the topics."""
+        await super().async_added_to_hass()
+        self.async_on_remove(self._dispatcher.async_track_entity(self))
+
+
 class PrismBaseEntity(Entity):
     """A base Entity that is registered under a Prism device."""
 
     _expire_after: int | None
-    _expiration_trigger: CALLBACK_TYPE | None = None
     _attr_should_poll = False
 
     def __init__(
@@ -39,31 +63,79 @@ class PrismBaseEntity(Entity):
         sensor_domain: str,
         description: PrismBaseEntityDescription,
         device: DeviceInfo,
+        port: int = 0,
     ) -> None:
         """Initialize the device info and set the update coordinator."""
         # Create device instance
         self._attr_device_info = device
         self.entity_description = description
+        self._entry_data = entry_data
+        self._port = port
         # Preload attributes
         self._attr_unique_id = _get_unique_id(entry_data.serial, description.key)
-        self._topic = entry_data.topic + description.topic
         self._expire_after = description.expire_after
         # Init expire proceudre
         if self._expire_after is not None and self._expire_after > 0:
             self._attr_available = False
 
+    @property
+    def _topic(self) -> str:
+        """Return the absolute topic of the entity."""
+        return self._entry_data.topic + self.entity_description.topic
+
+    @callback
+    def async_write_ha_state(self) -> None:
+        """Write the state to the state machine and to the device snapshot."""
+        super().async_write_ha_state()
+        self._entry_data.async_update_snapshot(
+            self._port,
+            self.entity_description.translation_key,
+            self._snapshot_value() if self._attr_available else None,
+        )
+
+    def _snapshot_value(self) -> Any:
+        """Return the value pushed to the device snapshot. To be overridden."""
+        return None
+
+    def _register_snapshot_entity(self) -> None:
+        """Expose the entity id of this entity in the device snapshot."""
+        self._entry_data.async_register_entity_id(
+            self._port, self.entity_description.translation_key, self.entity_id
+        )
+
     @callback
-    def value_is_expired(self, *_: datetime) -> None:
-        """Triggered when value is expired."""
+    def value_is_expired(self) -> None:
+        """Triggered by the entry dispatcher when value is expired."""
         _LOGGER.debug("entity value_is_expired for topic %s", self._topic)
-        self._expiration_trigger = None
         self._value_is_expired()
-        self.async_write_ha_state()
+        self.async_schedule_write()
+
+    @callback
+    def async_set_broker_connected(self, connected: bool) -> None:
+        """Follow the MQTT broker connection, written at the next flush."""
+        self._attr_available = connected
+
+    @callback
+    def async_schedule_write(self) -> None:
+        """Write the state at the end of the current burst of messages."""
+        self._entry_data.dispatcher.async_mark_dirty(self)
 
     async def _subscribe_topic(self):
-        """Subscribe to mqtt topic."""
+        """Subscribe to mqtt topic through the entry dispatcher."""
         _LOGGER.debug("_subscribe_topic: %s", self._topic)
-        await mqtt.async_subscribe(self.hass, self._topic, self.message_received)
+        dispatcher = self._entry_data.dispatcher
+        self.async_on_remove(
+            await dispatcher.async_subscribe(
+                self.entity_description.topic, self._message_received
+            )
+        )
+        self.async_on_remove(dispatcher.async_track_entity(self))
+        if self._expire_after is not None and self._expire_after > 0:
+            self.async_on_remove(
+                dispatcher.async_track_expiry(
+                    self, self.entity_description.topic, self._expire_after
+                )
+            )
 
     def _value_is_expired(self):
         """Triggered when value is expired. To be overridden."""
@@ -73,26 +145,8 @@ class PrismBaseEntity(Entity):
         """Change the selected option."""
         raise NotImplementedError
 
-    def message_received(self, msg) -> None:
-        """Update the sensor with the most recent event."""
-        self.hass.loop.call_soon_threadsafe(self._message_received, msg)
-
     def schedule_expiration_callback(self) -> None:
         """When self._expire_after is set, and we receive a message, assume device is not expired since it has to be to receive the message."""
         if self._expire_after is not None and self._expire_after > 0:
             self._attr_available = True
-            if self._expiration_trigger:
-                # Reset old trigger
-                self._expiration_trigger()
-            else:
-                # Set new trigger
-                self._expiration_trigger = async_call_later(
-                    self.hass, self._expire_after, self.value_is_expired
-                )
-
-    def cleanup_expiration_trigger(self) -> None:
-        """Clean up expiration triggers."""
-        if self._expiration_trigger:
-            self._expiration_trigger()
-            self._expiration_trigger = None
-            self._attr_available = True
+            self._entry_data.dispatcher.async_refresh_expiry(self)
@@ -1,9 +1,20 @@
 """Runtime entry data for Silla Prism stored in hass.data."""
 
-from dataclasses import dataclass
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any
 
+from homeassistant.core import CALLBACK_TYPE, callback
 from homeassistant.helpers.device_registry import DeviceInfo
 
+from .curves import SessionCurveRecorder
+from .dispatcher import PrismDispatcher
+from .overload import PrismOverloadProtection
+from .scheduler import PrismScheduler
+from .tariff import TariffSchedule
+
+SnapshotListener = Callable[[dict[int, dict[str, Any]]], None]
+
 
 @dataclass(slots=True)
 class RuntimeEntryData:
@@ -16,3 +27,87 @@ class RuntimeEntryData:
     serial: str
     maxcurr: int
     devices: list[DeviceInfo]
+    dispatcher: PrismDispatcher
+    rolling_stats: bool = False
+    site_aggregates: bool = False
+    tariffs: TariffSchedule | None = None
+    overload: PrismOverloadProtection | None = None
+    scheduler: PrismScheduler | None = None
+    curves: SessionCurveRecorder | None = None
+    schedule: str | None = None
+    controller_stops: dict[str, CALLBACK_TYPE] = field(default_factory=dict)
+    snapshot: dict[int, dict[str, Any]] = field(default_factory=dict)
+    entity_ids: dict[int, dict[str, str]] = field(default_factory=dict)
+    _snapshot_listeners: list[SnapshotListener] = field(default_factory=list)
+    _snapshot_changes: dict[int, dict[str, Any]] = field(default_factory=dict)
+    _max_current_listeners: list[CALLBACK_TYPE] = field(default_factory=list)
+
+    def __post_init__(self) -> None:
+        """Send the snapshot changes once per dispatcher flush."""
+        self.dispatcher.async_add_flush_listener(self._async_flush_snapshot)
+
+    @callback
+    def async_stop_controller(self, name: str) -> None:
+        """Stop a running controller, if any."""
+        if (stop := self.controller_stops.pop(name, None)) is not None:
+            stop()
+
+    @callback
+    def async_stop_controllers(self) -> None:
+        """Stop all the running controllers."""
+        for name in list(self.controller_stops):
+            self.async_stop_controller(name)
+
+    @callback
+    def async_update_snapshot(self, port: int, key: str, value: Any) -> None:
+        """Update one value of the device snapshot, listeners get it at next flush."""
+        port_snapshot = self.snapshot.setdefault(port, {})
+        if key in port_snapshot and port_snapshot[key] == value:
+            return
+        port_snapshot[key] = value
+        if not self._snapshot_changes:
+            self.dispatcher.async_schedule_flush()
+        self._snapshot_changes.setdefault(port, {})[key] = value
+
+    @callback
+    def _async_flush_snapshot(self) -> None:
+        """Notify the listeners of all the changes since the last flush."""
+        if not self._snapshot_changes:
+            return
+        changes, self._snapshot_changes = self._snapshot_changes, {}
+        for listener in self._snapshot_listeners:
+            listener(changes)
+
+    @callback
+    def async_register_entity_id(self, port: int, key: str, entity_id: str) -> None:
+        """Remember which entity exposes a snapshot key."""
+        self.entity_ids.setdefault(port, {})[key] = entity_id
+
+    @callback
+    def async_subscribe_snapshot(self, listener: SnapshotListener) -> CALLBACK_TYPE:
+        """Subscribe to snapshot changes, returns the unsubscribe callback."""
+        self._snapshot_listeners.append(listener)
+
+        @callback
+        def _unsubscribe() -> None:
+            self._snapshot_listeners.remove(listener)
+
+        return _unsubscribe
+
+    @callback
+    def async_set_max_current(self, maxcurr: int) -> None:
+        """Change the maximum current of the ports and notify the listeners."""
+        self.maxcurr = maxcurr
+        for listener in self._max_current_listeners:
+            listener()
+
+    @callback
+    def async_subscribe_max_current(self, listener: CALLBACK_TYPE) -> CALLBACK_TYPE:
+        """Subscribe to maximum current changes, returns the unsubscribe callback."""
+        self._max_current_listeners.append(listener)
+
+        @callback
+        def _unsubscribe() -> None:
+            self._max_current_listeners.remove(listener)
+
+        return _unsubscribe
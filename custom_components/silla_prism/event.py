@@ -0,0 +1,203 @@
+"""Silla Prism event entity module."""
+
+import logging
+from typing import override
+
+from homeassistant.components.event import (
+    EventDeviceClass,
+    EventEntity,
+    EventEntityDescription,
+)
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+
+from .const import BINARY_SENSOR_DOMAIN, DOMAIN, EVENT_DOMAIN
+from .domain_data import DomainData
+from .entity import PrismBaseEntity, PrismDerivedEntity, _get_unique_id
+from .entry_data import RuntimeEntryData
+from .schema import GROUP_PORT, compile_descriptions, format_description
+from .sensor import SENSORS
+from .telemetry import PrismTransition
+
+_LOGGER = logging.getLogger(__name__)
+
+TOUCH_SEQUENCES: dict[tuple[int, ...], str] = {
+    (1,): "single",
+    (1, 1): "double",
+    (3,): "long",
+}
+# Keys of the touch binary sensors replaced by the touch event
+REMOVED_TOUCH_KEYS = ("touch_sigle_{}", "touch_double_{}", "touch_long_{}")
+
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    """Add entities for passed config_entry in HA."""
+    entry_data: RuntimeEntryData = DomainData.get(hass).get_entry_data(entry)
+    _LOGGER.debug("async_setup_entry for events: %s", entry_data)
+    _async_remove_touch_binary_sensors(hass, entry_data)
+
+    ports = entry_data.ports
+    events = []
+    for port in range(1, ports + 1):
+        events.extend(
+            [PrismTouchEvent(entry_data, description, port) for description in EVENTS]
+        )
+        events.extend(
+            [
+                PrismTransitionEvent(entry_data, description, port)
+                for description in TRANSITION_EVENTS
+            ]
+        )
+    async_add_entities(events)
+
+
+@callback
+def _async_remove_touch_binary_sensors(
+    hass: HomeAssistant, entry_data: RuntimeEntryData
+) -> None:
+    """Remove the touch binary sensors left in the entity registry."""
+    registry = er.async_get(hass)
+    ismultiport = entry_data.ports > 1
+    for port in range(1, entry_data.ports + 1):
+        for key in REMOVED_TOUCH_KEYS:
+            unique_id = _get_unique_id(
+                entry_data.serial, key.format(port) if ismultiport else key[:-3]
+            )
+            if entity_id := registry.async_get_entity_id(
+                BINARY_SENSOR_DOMAIN, DOMAIN, unique_id
+            ):
+                _LOGGER.debug("Removing the replaced entity %s", entity_id)
+                registry.async_remove(entity_id)
+
+
+class PrismEventEntityDescription(EventEntityDescription, frozen_or_thawed=True):
+    """A class that describes prism event entities."""
+
+    expire_after: float = 0
+    topic: str = None
+    source_key: str = None
+
+
+class PrismTouchEvent(PrismBaseEntity, EventEntity):
+    """An event entity for the touch gestures on the Prism."""
+
+    entity_description: PrismEventEntityDescription
+
+    def __init__(
+        self,
+        entry_data: RuntimeEntryData,
+        description: PrismEventEntityDescription,
+        port: int,
+    ) -> None:
+        """Init Prism touch event."""
+        ismultiport = entry_data.ports > 1
+        if not ismultiport:
+            device = entry_data.devices[0]
+        else:
+            device = entry_data.devices[port]
+        super().__init__(
+            entry_data,
+            EVENT_DOMAIN,
+            format_description(description, port, ismultiport),
+            device,
+            port,
+        )
+
+    @override
+    def _message_received(self, msg) -> None:
+        """Fire the event of the received touch sequence."""
+        try:
+            sequence = tuple(int(x) for x in msg.payload.split(","))
+        except ValueError:
+            _LOGGER.warning(
+                "Invalid topic payload: topic:%s payload:%s", self._topic, msg.payload
+            )
+            return
+        self._trigger_event(
+            TOUCH_SEQUENCES.get(sequence, "sequence"), {"sequence": list(sequence)}
+        )
+        self.async_schedule_write()
+
+    async def async_added_to_hass(self) -> None:
+        """Subscribe to mqtt."""
+        self._register_snapshot_entity()
+        await self._subscribe_topic()
+
+
+class PrismTransitionEvent(PrismDerivedEntity, EventEntity):
+    """An event entity fired on the real state or mode transitions of a port."""
+
+    _attr_should_poll = False
+    entity_description: PrismEventEntityDescription
+
+    def __init__(
+        self,
+        entry_data: RuntimeEntryData,
+        description: PrismEventEntityDescription,
+        port: int,
+    ) -> None:
+        """Init Prism transition event."""
+        ismultiport = entry_data.ports > 1
+        self._attr_device_info = entry_data.devices[port if ismultiport else 0]
+        self.entity_description = format_description(description, port, ismultiport)
+        self._attr_unique_id = _get_unique_id(
+            entry_data.serial, self.entity_description.key
+        )
+        self._dispatcher = entry_data.dispatcher
+        self._port = port
+        self._source_key = description.source_key
+
+    async def async_added_to_hass(self) -> None:
+        """Subscribe to the transitions of the entry."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self._dispatcher.async_subscribe_transitions(self._async_transition)
+        )
+
+    @callback
+    def _async_transition(self, transition: PrismTransition) -> None:
+        """Fire the event of a transition of this port."""
+        if transition.port != self._port or transition.key != self._source_key:
+            return
+        self._trigger_event(
+            transition.current,
+            {
+                "previous": transition.previous,
+                "dwell_time": round(transition.dwell_time, 1),
+            },
+        )
+        self._dispatcher.async_mark_dirty(self)
+
+
+def _transition_event_types(key: str) -> list[str]:
+    """Return the options of a sensor, without duplicates."""
+    description = next(d for d in SENSORS if d.translation_key == key)
+    return list(dict.fromkeys(description.options))
+
+
+EVENTS = compile_descriptions(
+    EVENT_DOMAIN, PrismEventEntityDescription, GROUP_PORT, device_class=EventDeviceClass
+)
+
+TRANSITION_EVENTS: tuple[PrismEventEntityDescription, ...] = (
+    PrismEventEntityDescription(
+        key="state_transition_{}",
+        source_key="current_state",
+        event_types=_transition_event_types("current_state"),
+        has_entity_name=True,
+        translation_key="state_transition",
+    ),
+    PrismEventEntityDescription(
+        key="mode_transition_{}",
+        source_key="current_port_mode",
+        event_types=_transition_event_types("current_port_mode"),
+        has_entity_name=True,
+        translation_key="mode_transition",
+    ),
+)
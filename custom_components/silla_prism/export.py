@@ -0,0 +1,427 @@
+"""Streaming export of the Prism sessions and telemetry.
+
+The recorded Prism sensors are read from the recorder SQLite database with
+one cursor per sensor, merged in time order and written in chunks, so the
+memory used by an export does not depend on the covered period or on the
+number of ports.
+
+Sessions are rebuilt from the recorded port states, a session lasts from when
+the port leaves idle until it is idle again. The telemetry is downsampled to
+fixed UTC intervals, with the time weighted mean of the measurements and the
+increase of the energy counters in every interval.
+
+Parquet files need pyarrow, which is imported only for Parquet exports.
+"""
+
+from collections.abc import Iterable, Iterator
+from contextlib import closing
+import csv
+from datetime import UTC, datetime
+import heapq
+from itertools import groupby, islice
+from operator import itemgetter
+from pathlib import Path
+import sqlite3
+from typing import Any
+
+from .recorded import (
+    DECODER_NUMBER,
+    RECORDER_DB,
+    SOURCE_STATES,
+    SOURCE_STATISTICS,
+    STATISTICS_PERIOD,
+    PrismSeries,
+    connect,
+    decoded_sensors,
+    discover_series,
+)
+
+EXPORT_SESSIONS = "sessions"
+EXPORT_TELEMETRY = "telemetry"
+FORMAT_CSV = "csv"
+FORMAT_PARQUET = "parquet"
+
+DEFAULT_INTERVAL = 900
+CHUNK_ROWS = 4096
+
+STATE_KEY = "current_state"
+SESSION_ENERGY_KEY = "session_output_energy"
+IDLE_STATE = "idle"
+CHARGING_STATE = "charging"
+MEASUREMENT = "measurement"
+
+TYPE_TIME = "time"
+TYPE_STRING = "string"
+TYPE_INT = "int"
+TYPE_FLOAT = "float"
+
+SESSION_COLUMNS = (
+    ("serial", TYPE_STRING),
+    ("port", TYPE_INT),
+    ("start", TYPE_TIME),
+    ("end", TYPE_TIME),
+    ("duration_s", TYPE_FLOAT),
+    ("charging_s", TYPE_FLOAT),
+    ("energy_wh", TYPE_FLOAT),
+)
+
+_UNAVAILABLE = ("", "unknown", "unavailable")
+
+_STATE_QUERY = """
+SELECT states.last_updated_ts, states.state
+FROM states JOIN states_meta ON states.metadata_id = states_meta.metadata_id
+WHERE states_meta.entity_id = ? AND states.last_updated_ts >= ?
+    AND states.last_updated_ts < ?
+ORDER BY states.last_updated_ts
+"""
+# The counters have no mean, only their state at the end of the period
+_STATISTICS_QUERY = """
+SELECT statistics.start_ts, COALESCE(statistics.mean, statistics.state)
+FROM statistics JOIN statistics_meta
+    ON statistics.metadata_id = statistics_meta.id
+WHERE statistics_meta.statistic_id = ? AND statistics.start_ts >= ?
+    AND statistics.start_ts < ?
+ORDER BY statistics.start_ts
+"""
+# The state held at the start of the export
+_HELD_STATE_QUERY = """
+SELECT states.last_updated_ts, states.state
+FROM states JOIN states_meta ON states.metadata_id = states_meta.metadata_id
+WHERE states_meta.entity_id = ? AND states.last_updated_ts < ?
+ORDER BY states.last_updated_ts DESC LIMIT 1
+"""
+_HELD_STATISTICS_QUERY = """
+SELECT statistics.start_ts, COALESCE(statistics.mean, statistics.state)
+FROM statistics JOIN statistics_meta
+    ON statistics.metadata_id = statistics_meta.id
+WHERE statistics_meta.statistic_id = ? AND statistics.start_ts < ?
+ORDER BY statistics.start_ts DESC LIMIT 1
+"""
+
+Columns = tuple[tuple[str, str], ...]
+
+
+def telemetry_columns() -> Columns:
+    """Return the columns of the telemetry export, one per numeric sensor."""
+    return (
+        ("start", TYPE_TIME),
+        ("serial", TYPE_STRING),
+        ("port", TYPE_INT),
+        *(
+            (row["translation_key"], TYPE_FLOAT)
+            for row in decoded_sensors()
+            if row["decoder"] == DECODER_NUMBER
+        ),
+    )
+
+
+def _query(
+    connection: sqlite3.Connection,
+    entity_id: str,
+    source: str,
+    start: float,
+    end: float,
+) -> Iterator[tuple[float, Any]]:
+    """Iterate the recorded states of a sensor, without the unavailable ones."""
+    states = _query_held(connection, entity_id, source, start, end, held=False)
+    for time, state in states:
+        if state is not None:
+            yield time, state
+
+
+def _query_held(
+    connection: sqlite3.Connection,
+    entity_id: str,
+    source: str,
+    start: float,
+    end: float,
+    held: bool = True,
+) -> Iterator[tuple[float, Any]]:
+    """Iterate the recorded states of a sensor, the unavailable ones as None.
+
+    When held, the state recorded before start comes first, moved to start.
+    """
+    if held and start > 0:
+        query = _HELD_STATE_QUERY if source == SOURCE_STATES else _HELD_STATISTICS_QUERY
+        for _, state in connection.execute(query, (entity_id, start)):
+            yield start, None if state in _UNAVAILABLE else state
+    query = _STATE_QUERY if source == SOURCE_STATES else _STATISTICS_QUERY
+    for time, state in connection.execute(query, (entity_id, start, min(end, 1e12))):
+        yield time, None if state in _UNAVAILABLE else state
+
+
+def _timestamp(time: float | None) -> datetime | None:
+    """Return a timestamp as an UTC datetime."""
+    return None if time is None else datetime.fromtimestamp(time, UTC)
+
+
+def _downsample(
+    states: Iterable[tuple[float, Any]], interval: float, counter: bool
+) -> Iterator[tuple[float, float]]:
+    """Yield the start and the value of every interval covered by the states.
+
+    Every state holds its value until the next one, as in analysis.integral_at,
+    and the signal ends at its last state. The value of a measurement is its
+    time weighted mean over the interval, an interval without samples gets the
+    held value. The value of a counter is its increase in the interval, a
+    counter lower than the previous sample has been reset. The unavailable
+    states are gaps, the intervals entirely in a gap are skipped.
+    """
+    bucket: float | None = None
+    area = weight = increase = 0.0
+    covered = False
+    held: float | None = None
+    held_time = 0.0
+    previous: float | None = None
+    for time, state in states:
+        try:
+            value: float | None = float(state)
+        except (TypeError, ValueError):
+            value = None
+        if bucket is None:
+            bucket, held_time = time - time % interval, time
+        while time >= bucket + interval:
+            edge = bucket + interval
+            if held is not None:
+                area += held * (edge - held_time)
+                weight += edge - held_time
+                covered = True
+            if covered:
+                yield bucket, increase if counter else _mean(area, weight, previous)
+            bucket, held_time = edge, edge
+            area = weight = increase = 0.0
+            covered = False
+        if held is not None:
+            area += held * (time - held_time)
+            weight += time - held_time
+        if value is not None:
+            covered = True
+            if counter and previous is not None:
+                increase += value - previous if value >= previous else value
+            previous = value
+        held, held_time = value, time
+    if bucket is not None and covered:
+        yield bucket, increase if counter else _mean(area, weight, previous)
+
+
+def _mean(area: float, weight: float, last: float | None) -> float:
+    """Return the time weighted mean, the last value of an instant interval."""
+    return area / weight if weight > 0 or last is None else last
+
+
+def _series_buckets(
+    connection: sqlite3.Connection,
+    series: PrismSeries,
+    source: str,
+    start: float,
+    end: float,
+    interval: float,
+) -> Iterator[tuple[float, str, float]]:
+    """Yield the downsampled values of a series, tagged with its key."""
+    states = _query_held(connection, series.entity_id, source, start, end)
+    counter = series.state_class != MEASUREMENT
+    for bucket, value in _downsample(states, interval, counter):
+        yield bucket, series.key, value
+
+
+def _group(
+    series: Iterable[PrismSeries], keys: Iterable[str]
+) -> list[tuple[tuple[str, int], list[PrismSeries]]]:
+    """Group the series with one of the keys by device and port."""
+    keys = set(keys)
+    groups: dict[tuple[str, int], list[PrismSeries]] = {}
+    for item in series:
+        if item.key in keys:
+            groups.setdefault((item.serial, item.port), []).append(item)
+    return sorted(groups.items())
+
+
+def _telemetry_rows(
+    connection: sqlite3.Connection,
+    series: list[PrismSeries],
+    columns: Columns,
+    source: str,
+    start: float,
+    end: float,
+    interval: float,
+) -> Iterator[tuple[Any, ...]]:
+    """Yield the telemetry rows of every port, interval by interval."""
+    keys = [name for name, _ in columns[3:]]
+    for (serial, port), items in _group(series, keys):
+        streams = [
+            _series_buckets(connection, item, source, start, end, interval)
+            for item in items
+        ]
+        for bucket, samples in groupby(heapq.merge(*streams), key=itemgetter(0)):
+            values = {key: value for _, key, value in samples}
+            yield (
+                _timestamp(bucket),
+                serial,
+                port,
+                *(values.get(key) for key in keys),
+            )
+
+
+def _tagged(
+    states: Iterable[tuple[float, Any]], key: str
+) -> Iterator[tuple[float, str, Any]]:
+    """Yield the states of a series, tagged with its key."""
+    for time, state in states:
+        yield time, key, state
+
+
+def _session_rows(
+    connection: sqlite3.Connection,
+    series: list[PrismSeries],
+    start: float,
+    end: float,
+) -> Iterator[tuple[Any, ...]]:
+    """Yield the charging sessions of every port, port by port."""
+    for (serial, port), items in _group(series, (STATE_KEY, SESSION_ENERGY_KEY)):
+        if all(item.key != STATE_KEY for item in items):
+            continue
+        streams = [
+            _tagged(
+                _query(connection, item.entity_id, SOURCE_STATES, start, end),
+                item.key,
+            )
+            for item in items
+        ]
+        began: float | None = None
+        charging_since: float | None = None
+        charging = 0.0
+        energy: float | None = None
+        for time, key, state in heapq.merge(*streams):
+            if key == SESSION_ENERGY_KEY:
+                if began is not None:
+                    try:
+                        energy = max(energy or 0.0, float(state))
+                    except ValueError:
+                        pass
+                continue
+            if charging_since is not None:
+                charging += time - charging_since
+                charging_since = None
+            if state == IDLE_STATE:
+                if began is not None:
+                    yield (
+                        serial,
+                        port,
+                        _timestamp(began),
+                        _timestamp(time),
+                        time - began,
+                        charging,
+                        energy,
+                    )
+                    began = None
+                continue
+            if began is None:
+                began, charging, energy = time, 0.0, None
+            if state == CHARGING_STATE:
+                charging_since = time
+        if began is not None:
+            # The session is still running at the end of the export
+            yield serial, port, _timestamp(began), None, None, charging, energy
+
+
+class _CsvWriter:
+    """Write the rows to a CSV file, the times in ISO 8601."""
+
+    def __init__(self, path: Path, columns: Columns) -> None:
+        """Create the file and write the header."""
+        self._file = path.open("w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(name for name, _ in columns)
+
+    def write(self, rows: list[tuple[Any, ...]]) -> None:
+        """Write a chunk of rows."""
+        self._writer.writerows(
+            [
+                value.isoformat() if isinstance(value, datetime) else value
+                for value in row
+            ]
+            for row in rows
+        )
+
+    def close(self) -> None:
+        """Close the file."""
+        self._file.close()
+
+
+class _ParquetWriter:
+    """Write the rows to a Parquet file, one row group per chunk."""
+
+    def __init__(self, path: Path, columns: Columns) -> None:
+        """Create the file with the schema of the columns."""
+        # pylint: disable-next=import-outside-toplevel
+        import pyarrow as pa
+        import pyarrow.parquet as pq  # pylint: disable=import-outside-toplevel
+
+        types = {
+            TYPE_TIME: pa.timestamp("us", tz="UTC"),
+            TYPE_STRING: pa.string(),
+            TYPE_INT: pa.int32(),
+            TYPE_FLOAT: pa.float64(),
+        }
+        self._pa = pa
+        self._schema = pa.schema([(name, types[kind]) for name, kind in columns])
+        self._writer = pq.ParquetWriter(str(path), self._schema)
+
+    def write(self, rows: list[tuple[Any, ...]]) -> None:
+        """Write a chunk of rows."""
+        arrays = [
+            self._pa.array(values, type=field.type)
+            for values, field in zip(zip(*rows), self._schema, strict=True)
+        ]
+        self._writer.write_table(
+            self._pa.Table.from_arrays(arrays, schema=self._schema)
+        )
+
+    def close(self) -> None:
+        """Close the file."""
+        self._writer.close()
+
+
+WRITERS = {FORMAT_CSV: _CsvWriter, FORMAT_PARQUET: _ParquetWriter}
+
+
+def export(
+    config_dir: Path,
+    path: Path,
+    kind: str = EXPORT_SESSIONS,
+    file_format: str = FORMAT_CSV,
+    source: str = SOURCE_STATISTICS,
+    start: float = 0,
+    end: float = float("inf"),
+    interval: float = DEFAULT_INTERVAL,
+    database: Path | None = None,
+) -> int:
+    """Write an export of the recorded Prism sensors, return the written rows.
+
+    The sessions are always rebuilt from the states, the telemetry intervals
+    are whole hours with the long term statistics.
+    """
+    database = database or config_dir / RECORDER_DB
+    series = discover_series(config_dir)
+    columns = SESSION_COLUMNS if kind == EXPORT_SESSIONS else telemetry_columns()
+    if source == SOURCE_STATISTICS:
+        interval = max(-(-interval // STATISTICS_PERIOD), 1) * STATISTICS_PERIOD
+    writer = WRITERS[file_format](path, columns)
+    written = 0
+    try:
+        with closing(connect(database)) as connection:
+            if kind == EXPORT_SESSIONS:
+                rows = _session_rows(connection, series, start, end)
+            else:
+                rows = _telemetry_rows(
+                    connection, series, columns, source, start, end, interval
+                )
+            while chunk := list(islice(rows, CHUNK_ROWS)):
+                writer.write(chunk)
+                written += len(chunk)
+    except BaseException:
+        writer.close()
+        path.unlink(missing_ok=True)
+        raise
+    writer.close()
+    return written
@@ -0,0 +1,127 @@
+"""Streaming outlier filters of the Prism numeric topics.
+
+The filters are declared per topic in topics.json and applied by the
+dispatcher before any handler sees a message, so a rejected sample reaches
+neither the entities nor the telemetry bus.
+"""
+
+from bisect import bisect_left, insort
+from collections import deque
+from collections.abc import Mapping
+from typing import Any
+
+FILTER_MEDIAN = "median"
+FILTER_RATE = "rate"
+
+# Shortest interval, in seconds, used to bound the change between two samples
+MIN_INTERVAL = 1.0
+
+
+class MedianFilter:
+    """Reject the samples too far from the median of the last samples.
+
+    The window holds the last size samples, rejected ones included, so a real
+    change of level is accepted once it fills half of the window. Adding a
+    sample costs O(log size) comparisons.
+    """
+
+    __slots__ = ("_sorted", "_threshold", "_window", "accepted", "rejected")
+
+    def __init__(self, size: int, threshold: float) -> None:
+        """Initialize the filter, threshold is in the unit of the topic."""
+        self._window: deque[float] = deque(maxlen=size)
+        self._sorted: list[float] = []
+        self._threshold = threshold
+        self.accepted = 0
+        self.rejected = 0
+
+    def accept(self, timestamp: float, value: float) -> bool:
+        """Add a sample, return False when it is an outlier."""
+        window = self._window
+        # The median is meaningful once the window is half full
+        outlier = (
+            len(window) > window.maxlen // 2
+            and abs(value - self._sorted[len(self._sorted) // 2]) > self._threshold
+        )
+        if len(window) == window.maxlen:
+            del self._sorted[bisect_left(self._sorted, window[0])]
+        window.append(value)
+        insort(self._sorted, value)
+        if outlier:
+            self.rejected += 1
+            return False
+        self.accepted += 1
+        return True
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the filter counters for the diagnostics."""
+        return {
+            "type": FILTER_MEDIAN,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+        }
+
+
+class RateFilter:
+    """Reject the samples changing faster than max_rate per second.
+
+    The change is measured from the last accepted sample. After max_rejects
+    consecutive rejections the new level is accepted, it is not a spike.
+    """
+
+    __slots__ = (
+        "_last",
+        "_max_rate",
+        "_max_rejects",
+        "_rejects",
+        "_time",
+        "accepted",
+        "rejected",
+    )
+
+    def __init__(self, max_rate: float, max_rejects: int = 3) -> None:
+        """Initialize the filter, max_rate is in the unit of the topic per s."""
+        self._max_rate = max_rate
+        self._max_rejects = max_rejects
+        self._last: float | None = None
+        self._time = 0.0
+        self._rejects = 0
+        self.accepted = 0
+        self.rejected = 0
+
+    def accept(self, timestamp: float, value: float) -> bool:
+        """Add a sample, return False when it is a spike."""
+        if (
+            self._last is not None
+            and self._rejects < self._max_rejects
+            and abs(value - self._last)
+            > self._max_rate * max(timestamp - self._time, MIN_INTERVAL)
+        ):
+            self._rejects += 1
+            self.rejected += 1
+            return False
+        self._last = value
+        self._time = timestamp
+        self._rejects = 0
+        self.accepted += 1
+        return True
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the filter counters for the diagnostics."""
+        return {
+            "type": FILTER_RATE,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+        }
+
+
+SampleFilter = MedianFilter | RateFilter
+
+
+def create_filter(spec: Mapping[str, Any]) -> SampleFilter:
+    """Create the filter described by a topic of the schema."""
+    if spec["type"] == FILTER_MEDIAN:
+        return MedianFilter(spec["size"], spec["threshold"])
+    if spec["type"] == FILTER_RATE:
+        return RateFilter(spec["max_rate"], spec.get("max_rejects", 3))
+    raise ValueError(f"Unknown filter type: {spec['type']}")
@@ -0,0 +1,218 @@
+// Silla Prism charger card.
+//
+// The card subscribes once to the silla_prism/subscribe websocket command and
+// renders the pushed device snapshot. It ignores the hass state updates, so it
+// is not re-rendered on every state change of the Home Assistant instance.
+
+const STATES = {
+  idle: "Idle",
+  waiting: "Waiting",
+  charging: "Charging",
+  pause: "Paused",
+};
+
+const MODES = {
+  solar: "OnlySun",
+  normal: "Boost",
+  paused: "Paused",
+  hybrid: "Hybrid",
+  suspended: "Suspended",
+  autolimit: "Auto limit",
+};
+
+const STATS = [
+  ["output_power", "Power", "W", 1],
+  ["output_current", "Current", "A", 0.001],
+  ["power_grid_voltage", "Voltage", "V", 1],
+  ["session_output_energy", "Session", "kWh", 0.001],
+  ["session_time", "Duration", "min", 1 / 60],
+  ["total_output_energy", "Total", "kWh", 0.001],
+  ["input_grid_power", "Grid", "W", 1],
+  ["current_set_by_user", "User limit", "A", 1],
+];
+
+class PrismChargerCard extends HTMLElement {
+  setConfig(config) {
+    this._config = { port: 1, ...config };
+    this._values = {};
+    this._entities = {};
+    this._entryId = this._config.entry_id;
+    this._build();
+  }
+
+  set hass(hass) {
+    this._hass = hass;
+    if (!this._unsub && this.isConnected) {
+      this._subscribe();
+    }
+  }
+
+  connectedCallback() {
+    if (this._hass && !this._unsub) {
+      this._subscribe();
+    }
+  }
+
+  disconnectedCallback() {
+    if (this._unsub) {
+      this._unsub.then((unsub) => unsub()).catch(() => {});
+      this._unsub = undefined;
+    }
+  }
+
+  getCardSize() {
+    return 4;
+  }
+
+  static getStubConfig() {
+    return { port: 1 };
+  }
+
+  _subscribe() {
+    const msg = { type: "silla_prism/subscribe" };
+    if (this._config.entry_id) {
+      msg.entry_id = this._config.entry_id;
+    }
+    this._unsub = this._hass.connection.subscribeMessage(
+      (event) => this._handleEvent(event),
+      msg
+    );
+    this._unsub.catch((err) => {
+      this._unsub = undefined;
+      this._status.textContent = err.message || "Subscription failed";
+    });
+  }
+
+  _handleEvent(event) {
+    const port = String(this._config.port);
+    if (event.snapshot) {
+      // A new snapshot follows every setup or unload of a config entry
+      if (!this._config.entry_id && !event.snapshot[this._entryId]) {
+        this._entryId = Object.keys(event.snapshot)[0];
+      }
+      const entry = event.snapshot[this._entryId];
+      if (!entry) {
+        this._status.textContent = "No Prism found";
+        return;
+      }
+      this._values = { ...(entry.values["0"] || {}), ...(entry.values[port] || {}) };
+      this._entities = {
+        ...(entry.entities["0"] || {}),
+        ...(entry.entities[port] || {}),
+      };
+    } else if (event.entry_id === this._entryId) {
+      const changes = event.changes;
+      if (!changes["0"] && !changes[port]) {
+        return;
+      }
+      Object.assign(this._values, changes["0"] || {}, changes[port] || {});
+    } else {
+      return;
+    }
+    this._update();
+  }
+
+  _build() {
+    if (!this.shadowRoot) {
+      this.attachShadow({ mode: "open" });
+    }
+    this.shadowRoot.innerHTML = `
+      <style>
+        .header { display: flex; justify-content: space-between; align-items: baseline; padding: 16px 16px 0; }
+        .name { font-size: 1.3em; }
+        .status { font-size: 1.1em; color: var(--primary-color); }
+        .mode { color: var(--secondary-text-color); padding: 0 16px; }
+        .stats { display: grid; grid-template-columns: repeat(4, 1fr); gap: 8px; padding: 16px; }
+        .stat { text-align: center; }
+        .value { font-size: 1.2em; }
+        .label { font-size: 0.8em; color: var(--secondary-text-color); }
+        .actions { display: flex; flex-wrap: wrap; gap: 8px; padding: 0 16px 16px; }
+        button { flex: 1; padding: 8px; border: none; border-radius: 4px; cursor: pointer;
+                 background: var(--secondary-background-color); color: var(--primary-text-color); }
+        button.active { background: var(--primary-color); color: var(--text-primary-color); }
+      </style>
+      <ha-card>
+        <div class="header">
+          <span class="name"></span>
+          <span class="status">…</span>
+        </div>
+        <div class="mode"></div>
+        <div class="stats"></div>
+        <div class="actions"></div>
+      </ha-card>`;
+    const root = this.shadowRoot;
+    root.querySelector(".name").textContent = this._config.name || "Silla Prism";
+    this._status = root.querySelector(".status");
+    this._mode = root.querySelector(".mode");
+    this._stats = {};
+    const stats = root.querySelector(".stats");
+    for (const [key, label] of STATS) {
+      const stat = document.createElement("div");
+      stat.className = "stat";
+      stat.innerHTML = `<div class="value">-</div><div class="label"></div>`;
+      stat.querySelector(".label").textContent = label;
+      stats.appendChild(stat);
+      this._stats[key] = stat.querySelector(".value");
+    }
+    this._buttons = {};
+    const actions = root.querySelector(".actions");
+    for (const mode of ["solar", "normal", "hybrid", "paused"]) {
+      this._buttons[mode] = this._addButton(actions, MODES[mode], () =>
+        this._callService("select", "select_option", "set_port_mode", {
+          option: mode,
+        })
+      );
+    }
+    this._addButton(actions, "Authorize", () =>
+      this._callService("button", "press", "set_mode_traps_auth")
+    );
+    this._addButton(actions, "Revoke", () =>
+      this._callService("button", "press", "set_mode_traps_noauth")
+    );
+  }
+
+  _addButton(parent, text, action) {
+    const button = document.createElement("button");
+    button.textContent = text;
+    button.addEventListener("click", action);
+    parent.appendChild(button);
+    return button;
+  }
+
+  _callService(domain, service, key, data = {}) {
+    const entityId = this._entities[key];
+    if (this._hass && entityId) {
+      this._hass.callService(domain, service, { entity_id: entityId, ...data });
+    }
+  }
+
+  _update() {
+    const values = this._values;
+    this._status.textContent =
+      values.current_state == null
+        ? "Unavailable"
+        : STATES[values.current_state] || values.current_state;
+    this._mode.textContent =
+      values.current_port_mode == null
+        ? ""
+        : MODES[values.current_port_mode] || values.current_port_mode;
+    for (const [key, , unit, scale] of STATS) {
+      const value = parseFloat(values[key]);
+      this._stats[key].textContent = Number.isNaN(value)
+        ? "-"
+        : `${+(value * scale).toFixed(scale < 1 ? 1 : 0)} ${unit}`;
+    }
+    for (const [mode, button] of Object.entries(this._buttons)) {
+      button.classList.toggle("active", values.set_port_mode === mode);
+    }
+  }
+}
+
+customElements.define("prism-charger-card", PrismChargerCard);
+
+window.customCards = window.customCards || [];
+window.customCards.push({
+  type: "prism-charger-card",
+  name: "Silla Prism charger card",
+  description: "Charger card fed by the Silla Prism websocket push API",
+});
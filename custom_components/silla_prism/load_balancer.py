@@ -0,0 +1,286 @@
+"""Site level current load balancer for the Prism ports."""
+
+from collections.abc import Hashable, Mapping
+from dataclasses import dataclass, field
+import logging
+from typing import TypeVar
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+
+from .client import PAUSED_MODE, command_topic, encode_option
+from .dispatcher import PrismDispatcher
+from .schema import SCHEMA
+from .telemetry import PrismSample
+
+_LOGGER = logging.getLogger(__name__)
+
+MIN_CURRENT = 6
+# Allocation of the ports that do not fit, they are paused with their mode since
+# the current limit of a port can not go under MIN_CURRENT
+PAUSED_CURRENT = 0
+# Mode given back to a paused port that was in a mode it can not be set to
+RESUME_MODE = "normal"
+# Current in A that a charging port may take above its measured current
+HEADROOM_CURRENT = 2
+# Minimum change in A of the measured current that triggers a new allocation
+CURRENT_HYSTERESIS = 1
+ACTIVE_STATES = ("waiting", "charging")
+MODE_OPTIONS: list[str] = next(
+    row["options"]
+    for row in SCHEMA["select"]
+    if row["translation_key"] == "set_port_mode"
+)
+
+_KeyT = TypeVar("_KeyT", bound=Hashable)
+
+
+@dataclass(slots=True)
+class PortLoad:
+    """The load of a Prism port as seen by the balancer."""
+
+    priority: int
+    max_current: int
+    state: str | None = None
+    current: float | None = None
+    allocated: int | None = None
+    # Cap of the overload protection while the port is reduced
+    ceiling: int | None = None
+    mode: str | None = None
+    # Mode to give back to the port paused by the balancer
+    resume_mode: str | None = None
+
+    @property
+    def active(self) -> bool:
+        """Return True when the port takes part in the allocation.
+
+        A port paused by the balancer still waits for its share.
+        """
+        return self.state in ACTIVE_STATES or (
+            self.resume_mode is not None and self.state == "pause"
+        )
+
+    @property
+    def demand(self) -> float:
+        """Return the maximum current the port can use."""
+        demand: float = self.max_current
+        if self.state == "charging" and self.current is not None:
+            demand = min(demand, max(MIN_CURRENT, self.current + HEADROOM_CURRENT))
+        return demand if self.ceiling is None else min(demand, self.ceiling)
+
+
+def allocate_currents(
+    limit: float, ports: Mapping[_KeyT, PortLoad]
+) -> dict[_KeyT, int]:
+    """Share the site current limit between the active ports.
+
+    Every active port gets at least MIN_CURRENT, in priority order as long as the
+    limit allows it, the ports that do not fit get PAUSED_CURRENT.
+    The remaining current is given to the higher priority ports first and shared
+    fairly (water filling) between the ports with the same priority, without
+    exceeding the demand of each port. The sum of the allocations never exceeds
+    the limit. Cost is O(n log n).
+    """
+    active = sorted(
+        (key for key, port in ports.items() if port.active),
+        key=lambda key: -ports[key].priority,
+    )
+    fitting = min(len(active), int(limit // MIN_CURRENT))
+    if fitting < len(active):
+        _LOGGER.warning(
+            "Site limit of %s A too low for %d active ports, %d paused",
+            limit,
+            len(active),
+            len(active) - fitting,
+        )
+    allocations = dict.fromkeys(active, PAUSED_CURRENT)
+    allocations.update(dict.fromkeys(active[:fitting], MIN_CURRENT))
+    budget = limit - fitting * MIN_CURRENT
+
+    start = 0
+    while start < fitting and budget > 0:
+        # Ports with the same priority share the budget left by the previous ones
+        priority = ports[active[start]].priority
+        end = start
+        while end < fitting and ports[active[end]].priority == priority:
+            end += 1
+        group = sorted(active[start:end], key=lambda key: ports[key].demand)
+        for index, key in enumerate(group):
+            share = budget / (len(group) - index)
+            extra = min(share, ports[key].demand - MIN_CURRENT)
+            allocations[key] += int(extra)
+            budget -= int(extra)
+        start = end
+
+    return allocations
+
+
+@dataclass(slots=True)
+class _EntryLoads:
+    """The ports of one config entry taking part in the balancing."""
+
+    dispatcher: PrismDispatcher
+    limit: float
+    ports: dict[int, PortLoad] = field(default_factory=dict)
+
+
+class PrismLoadBalancer:
+    """Keep the sum of the current limits of all the ports under the site limit.
+
+    The balancer follows the state and the current of every port on the
+    telemetry bus. A new allocation is computed at most once per event loop
+    iteration, when a port starts or stops or its current changes, and only the
+    changed limits are published to the chargers.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the balancer."""
+        self._hass = hass
+        self._entries: dict[str, _EntryLoads] = {}
+        self._scheduled = False
+
+    @callback
+    def async_add_entry(
+        self,
+        entry_id: str,
+        dispatcher: PrismDispatcher,
+        ports: int,
+        max_current: int,
+        limit: float,
+        priority: int,
+    ) -> CALLBACK_TYPE:
+        """Add the ports of a config entry, returns the remove callback."""
+        loads = self._entries[entry_id] = _EntryLoads(
+            dispatcher,
+            limit,
+            {port: PortLoad(priority, max_current) for port in range(1, ports + 1)},
+        )
+
+        @callback
+        def _sample_received(sample: PrismSample) -> None:
+            port = loads.ports.get(sample.port)
+            if port is None:
+                return
+            if sample.key == "current_state":
+                if port.state != sample.value:
+                    port.state = sample.value
+                    if not port.active:
+                        # The limit of the port is left as it was, it is
+                        # allocated again as soon as the next session starts
+                        port.allocated = None
+                    self._async_schedule()
+            elif sample.key == "current_port_mode":
+                port.mode = sample.value
+            elif sample.key == "output_current" and sample.value is not None:
+                current = sample.value / 1000
+                if (
+                    port.current is None
+                    or abs(current - port.current) >= CURRENT_HYSTERESIS
+                ):
+                    port.current = current
+                    if port.active:
+                        self._async_schedule()
+
+        unsubscribe = dispatcher.async_subscribe_telemetry(_sample_received)
+
+        @callback
+        def _remove_entry() -> None:
+            unsubscribe()
+            del self._entries[entry_id]
+            for port_id, port in loads.ports.items():
+                if port.resume_mode is not None:
+                    self._async_set_mode(loads.dispatcher, port_id, port.resume_mode)
+            self._async_schedule()
+
+        return _remove_entry
+
+    @callback
+    def async_update_entry(
+        self, entry_id: str, max_current: int, limit: float, priority: int
+    ) -> None:
+        """Change the limits of a config entry, its ports keep their state."""
+        loads = self._entries[entry_id]
+        loads.limit = limit
+        for port in loads.ports.values():
+            port.max_current = max_current
+            port.priority = priority
+        self._async_schedule()
+
+    @callback
+    def async_set_ceiling(self, entry_id: str, port: int, ceiling: int | None) -> bool:
+        """Cap the allocation of a port, None removes the cap.
+
+        Returns False when the port is not balanced. A port allocated over a
+        lower ceiling is taken as already lowered to it, the overload protection
+        publishes the reduced limit on its fast path.
+        """
+        if (loads := self._entries.get(entry_id)) is None:
+            return False
+        load = loads.ports[port]
+        load.ceiling = ceiling
+        if ceiling is not None and load.allocated is not None:
+            load.allocated = min(load.allocated, ceiling)
+        self._async_schedule()
+        return True
+
+    @callback
+    def _async_schedule(self) -> None:
+        """Schedule an allocation at the end of the current loop iteration."""
+        if not self._scheduled:
+            self._scheduled = True
+            self._hass.loop.call_soon(self._async_allocate)
+
+    @callback
+    def _async_allocate(self) -> None:
+        """Compute the allocation and publish the changed current limits.
+
+        The ports that do not fit are paused with their mode, their limit is
+        left as it was, and get their mode back when they fit again or stop.
+        """
+        self._scheduled = False
+        if not self._entries:
+            return
+        limit = min(loads.limit for loads in self._entries.values())
+        ports = {
+            (entry_id, port_id): port
+            for entry_id, loads in self._entries.items()
+            for port_id, port in loads.ports.items()
+        }
+        allocations = allocate_currents(limit, ports)
+        if sum(allocations.values()) > limit:
+            _LOGGER.error(
+                "Allocation over the site limit of %s A: %s", limit, allocations
+            )
+            return
+        for (entry_id, port_id), port in ports.items():
+            dispatcher = self._entries[entry_id].dispatcher
+            current = allocations.get((entry_id, port_id))
+            if current == PAUSED_CURRENT:
+                if port.resume_mode is None and port.mode != PAUSED_MODE:
+                    port.resume_mode = (
+                        port.mode if port.mode in MODE_OPTIONS else RESUME_MODE
+                    )
+                    _LOGGER.debug("Port %s/%d paused", entry_id, port_id)
+                    self._async_set_mode(dispatcher, port_id, PAUSED_MODE)
+                continue
+            if current is not None and port.allocated != current:
+                port.allocated = current
+                _LOGGER.debug("Port %s/%d limited to %d A", entry_id, port_id, current)
+                self._hass.async_create_task(
+                    dispatcher.async_publish(
+                        command_topic(port_id, "set_current_limit"), current
+                    )
+                )
+            if port.resume_mode is not None:
+                self._async_set_mode(dispatcher, port_id, port.resume_mode)
+                port.resume_mode = None
+
+    @callback
+    def _async_set_mode(
+        self, dispatcher: PrismDispatcher, port_id: int, mode: str
+    ) -> None:
+        """Publish the mode of a port."""
+        self._hass.async_create_task(
+            dispatcher.async_publish(
+                command_topic(port_id, "set_mode"), encode_option(MODE_OPTIONS, mode)
+            )
+        )
@@ -1,9 +1,8 @@
 """Contains numbers configurations for Prism wallbox integration."""
 
 import logging
-from typing import override
+from typing import Any, override
 
-from homeassistant.components import mqtt
 from homeassistant.components.number import (
     NumberDeviceClass,
     NumberEntity,
@@ -11,7 +10,6 @@ from homeassistant.components.number import (
     NumberMode,
 )
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import EntityCategory
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
@@ -19,6 +17,7 @@ from .const import NUMBER_DOMAIN
 from .domain_data import DomainData
 from .entity import PrismBaseEntity
 from .entry_data import RuntimeEntryData
+from .schema import GROUP_PORT, compile_descriptions, format_description
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -56,40 +55,6 @@ class PrismNumber(PrismBaseEntity, NumberEntity):
 
     entity_description: PrismNumberEntityDescription
 
-    def description(
-        self,
-        port: int,
-        mulitport: bool,
-        max_current: int,
-        description: PrismNumberEntityDescription,
-    ) -> PrismNumberEntityDescription:
-        """Create a Number entity for Prism EVSE devices."""
-        if mulitport:
-            return PrismNumberEntityDescription(
-                key=description.key.format(port),
-                topic=description.topic.format(port),
-                topic_out=description.topic_out.format(port),
-                entity_category=description.entity_category,
-                device_class=description.device_class,
-                native_min_value=description.native_min_value,
-                native_max_value=max_current,
-                mode=description.mode,
-                has_entity_name=description.has_entity_name,
-                translation_key=description.translation_key,
-            )
-        return PrismNumberEntityDescription(
-            key=description.key[:-3],
-            topic=description.topic.format(port),
-            topic_out=description.topic_out.format(port),
-            entity_category=description.entity_category,
-            device_class=description.device_class,
-            native_min_value=description.native_min_value,
-            native_max_value=max_current,
-            mode=description.mode,
-            has_entity_name=description.has_entity_name,
-            translation_key=description.translation_key,
-        )
-
     def __init__(
         self,
         entry_data: RuntimeEntryData,
@@ -97,39 +62,53 @@ class PrismNumber(PrismBaseEntity, NumberEntity):
         port: int,
     ) -> None:
         """Init Prism select."""
-        max_current = entry_data.maxcurr
         ismultiport = entry_data.ports > 1
         if not ismultiport:
             device = entry_data.devices[0]
         else:
             device = entry_data.devices[port]
 
-        _description = self.description(port, ismultiport, max_current, description)
+        _description = format_description(description, port, ismultiport)
         super().__init__(
             entry_data,
             NUMBER_DOMAIN,
             _description,
             device,
+            port,
         )
 
-        self._topic_out = entry_data.topic + _description.topic_out
+        self._topic_out = _description.topic_out
         self._attr_native_value = self.native_min_value
 
     @override
     def _message_received(self, msg) -> None:
         """Update the sensor with the most recent event."""
         self._attr_native_value = msg.payload
-        self.schedule_update_ha_state()
+        self.async_schedule_write()
+
+    @override
+    def _snapshot_value(self) -> Any:
+        """Return the value pushed to the device snapshot."""
+        return self._attr_native_value
+
+    @property
+    @override
+    def native_max_value(self) -> float:
+        """Return the maximum current, it follows the entry reconfiguration."""
+        return self._entry_data.maxcurr
 
     async def async_added_to_hass(self) -> None:
         """Subscribe to mqtt."""
+        self._register_snapshot_entity()
+        self.async_on_remove(
+            self._entry_data.async_subscribe_max_current(self.async_schedule_write)
+        )
         await self._subscribe_topic()
 
     async def async_will_remove_from_hass(self) -> None:
         """Unsubscribe from mqtt."""
         _LOGGER.debug("async_will_remove_from_hass key:%s", self.entity_description.key)
         await super().async_will_remove_from_hass()
-        self.cleanup_expiration_trigger()
 
     def set_native_value(self, _: float) -> None:
         """Set the native value."""
@@ -143,31 +122,13 @@ class PrismNumber(PrismBaseEntity, NumberEntity):
         #     self._topic_out,
         #     value,
         # )
-        await mqtt.async_publish(self.hass, self._topic_out, int(value))
-
-
-NUMBERS: tuple[PrismNumberEntityDescription, ...] = (
-    PrismNumberEntityDescription(
-        key="set_max_current_{}",
-        topic="{}/user_amp",
-        topic_out="{}/command/set_current_user",
-        entity_category=EntityCategory.CONFIG,
-        device_class=NumberDeviceClass.CURRENT,
-        native_min_value=6,
-        native_max_value=16,
-        mode=NumberMode.BOX,
-        has_entity_name=True,
-        translation_key="set_max_current",
-    ),
-    PrismNumberEntityDescription(
-        key="set_current_limit_{}",
-        topic="{}/pilot",
-        topic_out="{}/command/set_current_limit",
-        entity_category=EntityCategory.CONFIG,
-        device_class=NumberDeviceClass.CURRENT,
-        native_min_value=6,
-        native_max_value=16,
-        has_entity_name=True,
-        translation_key="set_current_limit",
-    ),
+        await self._entry_data.dispatcher.async_publish(self._topic_out, int(value))
+
+
+NUMBERS = compile_descriptions(
+    NUMBER_DOMAIN,
+    PrismNumberEntityDescription,
+    GROUP_PORT,
+    device_class=NumberDeviceClass,
+    mode=NumberMode,
 )
@@ -0,0 +1,215 @@
+"""Grid overload protection fast path for the Prism ports."""
+
+from collections.abc import Callable
+from dataclasses import dataclass
+from functools import partial
+import logging
+import math
+import time
+
+from homeassistant.components import mqtt
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+
+from .client import command_topic, decode_payload
+from .dispatcher import PrismDispatcher
+from .load_balancer import MIN_CURRENT
+from .telemetry import PrismSample
+
+_LOGGER = logging.getLogger(__name__)
+
+GRID_POWER_TOPIC = "energy_data/power_grid"
+DEFAULT_VOLTAGE = 230
+# Seconds the car needs to follow a new current limit
+REACTION_TIME = 5
+# Seconds between two 1 A steps of the recovery ramp
+RAMP_INTERVAL = 30
+# Maximum seconds from the receipt of the grid power to the command publish
+LATENCY_BUDGET = 0.005
+
+
+@dataclass(slots=True)
+class _PortLimit:
+    """The current limit of a port as seen by the protection."""
+
+    state: str | None = None
+    pilot: int | None = None
+    restore_to: int | None = None
+    limited: int | None = None
+
+
+class PrismOverloadProtection:
+    """Reduce the current limit of the charging ports when the grid is overloaded.
+
+    Every grid power message is evaluated inline in the MQTT message handler,
+    ahead of the outlier filter of the topic, and when the import exceeds the
+    configured limit the reduced current limits are published before the
+    handler returns. The latency is measured from the receipt of the message
+    to the publish of the command. The limits are restored with a slow ramp,
+    driven by the grid power messages, once the import is below the limit. The
+    reduced limit of a balanced port is also a ceiling of its allocation, the
+    load balancer publishes the ramp and can not raise the port back while it
+    is reduced.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        dispatcher: PrismDispatcher,
+        ports: int,
+        import_limit: float,
+        ceiling: Callable[[int, int | None], bool] | None = None,
+    ) -> None:
+        """Initialize the protection, import_limit is in W.
+
+        ceiling caps the allocation of a port by the load balancer, None
+        removes the cap, it returns False when the port is not balanced.
+        """
+        self._hass = hass
+        self._dispatcher = dispatcher
+        self._import_limit = import_limit
+        self._ceiling = ceiling
+        self._ports = {port: _PortLimit() for port in range(1, ports + 1)}
+        self._voltage: float = DEFAULT_VOLTAGE
+        self._hold_until = 0.0
+        self._last_ramp = 0.0
+        self.last_latency: float | None = None
+        self.max_latency: float = 0.0
+
+    async def async_start(self) -> CALLBACK_TYPE:
+        """Start the protection, returns the stop callback."""
+        unsubscribe_telemetry = self._dispatcher.async_subscribe_telemetry(
+            self._async_sample_received
+        )
+        unsubscribe_grid = await self._dispatcher.async_subscribe(
+            GRID_POWER_TOPIC, self._async_grid_power_received, raw=True
+        )
+
+        @callback
+        def _stop() -> None:
+            unsubscribe_telemetry()
+            unsubscribe_grid()
+            self._async_restore()
+
+        return _stop
+
+    @callback
+    def async_set_import_limit(self, import_limit: float) -> None:
+        """Change the import limit, the reduced ports stay reduced."""
+        self._import_limit = import_limit
+
+    @callback
+    def _async_restore(self) -> None:
+        """Give back their current limit to the reduced ports."""
+        for port_id, port in self._ports.items():
+            if port.limited is not None and port.restore_to is not None:
+                self._async_release(port_id, port.restore_to)
+            port.limited = port.restore_to = None
+
+    @callback
+    def _async_sample_received(self, sample: PrismSample) -> None:
+        """Follow the state, the current limit and the voltage of the ports."""
+        if sample.value is None or (port := self._ports.get(sample.port)) is None:
+            return
+        if sample.key == "current_state":
+            port.state = sample.value
+        elif sample.key == "output_car_current":
+            port.pilot = int(sample.value)
+        elif sample.key == "power_grid_voltage" and sample.value > 0:
+            self._voltage = sample.value
+
+    @callback
+    def _async_grid_power_received(self, msg: mqtt.ReceiveMessage) -> None:
+        """Evaluate a grid power sample against the import limit."""
+        received = self._dispatcher.last_receipt
+        power = decode_payload(msg.payload, None)
+        if power is None:
+            return
+        now = time.monotonic()
+        if power > self._import_limit:
+            if now >= self._hold_until and self._async_reduce(power, received):
+                self._hold_until = now + REACTION_TIME
+                self._last_ramp = now
+        elif (
+            now - self._last_ramp >= RAMP_INTERVAL
+            and power < self._import_limit - self._voltage
+        ):
+            self._last_ramp = now
+            self._async_ramp()
+
+    @callback
+    def _async_reduce(self, power: float, received: float) -> bool:
+        """Shed the excess import from the charging ports."""
+        charging = {
+            port_id: port
+            for port_id, port in self._ports.items()
+            if port.state == "charging" and port.pilot is not None
+        }
+        if not charging:
+            return False
+        shed = math.ceil((power - self._import_limit) / self._voltage)
+        reduction = math.ceil(shed / len(charging))
+        published = False
+        for port_id, port in charging.items():
+            current = port.limited if port.limited is not None else port.pilot
+            limited = max(MIN_CURRENT, current - reduction)
+            if limited >= current:
+                continue
+            if port.restore_to is None:
+                port.restore_to = port.pilot
+            port.limited = limited
+            self._async_publish(
+                port_id, limited, partial(self._async_check_latency, received)
+            )
+            self._async_cap(port_id, limited)
+            published = True
+        if published:
+            _LOGGER.info("Grid import of %s W over the limit, shed %d A", power, shed)
+        return published
+
+    @callback
+    def _async_ramp(self) -> None:
+        """Raise by 1 A the current limit of the reduced ports."""
+        for port_id, port in self._ports.items():
+            if port.limited is None or port.restore_to is None:
+                continue
+            port.limited += 1
+            if port.limited >= port.restore_to:
+                self._async_release(port_id, port.restore_to)
+                port.limited = port.restore_to = None
+            elif not self._async_cap(port_id, port.limited):
+                self._async_publish(port_id, port.limited)
+
+    @callback
+    def _async_cap(self, port_id: int, ceiling: int | None) -> bool:
+        """Cap the allocation of a port, returns False when it is not balanced."""
+        return self._ceiling is not None and self._ceiling(port_id, ceiling)
+
+    @callback
+    def _async_release(self, port_id: int, restore_to: int) -> None:
+        """Give back its limit to a reduced port, the balancer owns a balanced one."""
+        if not self._async_cap(port_id, None):
+            self._async_publish(port_id, restore_to)
+
+    @callback
+    def _async_publish(
+        self, port_id: int, current: int, sent: CALLBACK_TYPE | None = None
+    ) -> None:
+        """Publish a current limit without waiting for the next loop iteration."""
+        self._hass.async_create_task(
+            self._dispatcher.async_publish(
+                command_topic(port_id, "set_current_limit"), current, sent
+            ),
+            eager_start=True,
+        )
+
+    @callback
+    def _async_check_latency(self, received: float) -> None:
+        """Measure the latency from the receipt of the sample to the publish."""
+        self.last_latency = latency = time.perf_counter() - received
+        self.max_latency = max(self.max_latency, latency)
+        if latency > LATENCY_BUDGET:
+            _LOGGER.warning(
+                "Overload protection latency of %.1f ms exceeds the %.1f ms budget",
+                latency * 1000,
+                LATENCY_BUDGET * 1000,
+            )
@@ -0,0 +1,139 @@
+"""Time aligned power flow of a Prism with the Powerwall sensors."""
+
+from asyncio import TimerHandle
+from collections.abc import Callable
+from dataclasses import dataclass
+import math
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+
+from .dispatcher import PrismDispatcher
+from .telemetry import PrismSample
+
+# Seconds a snapshot waits for the other streams of the same burst
+ALIGN_WINDOW = 2.0
+# Maximum age in seconds of the value of a stream missing from a snapshot
+MAX_HOLD = 30.0
+
+GRID_KEY = "input_grid_power"
+SOLAR_KEY = "powerwall_solar"
+HOUSE_KEY = "powerwall_house"
+PORT_KEY = "output_power"
+
+
+@dataclass(slots=True, frozen=True)
+class PowerFlow:
+    """The power flow of a snapshot and the values derived from it, in W."""
+
+    timestamp: float
+    grid: float
+    solar: float
+    house: float
+    ports: tuple[float, ...]
+
+    @property
+    def ev_power(self) -> float:
+        """Return the power delivered by all the ports."""
+        return math.fsum(self.ports)
+
+    @property
+    def export_power(self) -> float:
+        """Return the power exported to the grid."""
+        return max(-self.grid, 0.0)
+
+    @property
+    def house_power_without_ev(self) -> float:
+        """Return the house load, without the power of the ports."""
+        return max(self.house - self.ev_power, 0.0)
+
+    @property
+    def self_consumption(self) -> float | None:
+        """Return the share of the solar power used on site, in %."""
+        if self.solar <= 0:
+            return None
+        return min(max(100 * (self.solar - self.export_power) / self.solar, 0.0), 100.0)
+
+
+class PowerFlowBuffer:
+    """Group the grid, solar, house and port power samples into snapshots.
+
+    The streams are published as independent messages of the same burst. A
+    snapshot is opened by the first sample and closed when every stream has
+    reported, when a stream reports again or after the align window. The
+    streams that did not report keep their previous value when it is at most
+    MAX_HOLD seconds older than the snapshot, otherwise the snapshot is
+    dropped. The listener gets one PowerFlow per snapshot.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        dispatcher: PrismDispatcher,
+        ports: int,
+        listener: Callable[[PowerFlow], None],
+    ) -> None:
+        """Initialize the buffer for the given number of ports."""
+        self._hass = hass
+        self._dispatcher = dispatcher
+        self._listener = listener
+        self._slots = {
+            (0, GRID_KEY): 0,
+            (0, SOLAR_KEY): 1,
+            (0, HOUSE_KEY): 2,
+            **{(port, PORT_KEY): 2 + port for port in range(1, ports + 1)},
+        }
+        self._values: list[float | None] = [None] * len(self._slots)
+        self._times = [0.0] * len(self._slots)
+        self._pending: set[int] = set()
+        self._opened = 0.0
+        self._timer: TimerHandle | None = None
+
+    @callback
+    def async_start(self) -> CALLBACK_TYPE:
+        """Start following the telemetry, returns the stop callback."""
+        unsubscribe = self._dispatcher.async_subscribe_telemetry(
+            self._async_sample_received
+        )
+
+        @callback
+        def _stop() -> None:
+            unsubscribe()
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+        return _stop
+
+    @callback
+    def _async_sample_received(self, sample: PrismSample) -> None:
+        """Add a sample to the open snapshot."""
+        slot = self._slots.get((sample.port, sample.key))
+        if slot is None or not isinstance(sample.value, float):
+            return
+        if slot in self._pending:
+            # A new burst started before the snapshot was complete
+            self._async_close()
+        if not self._pending:
+            self._opened = sample.timestamp
+            self._timer = self._hass.loop.call_later(ALIGN_WINDOW, self._async_close)
+        self._values[slot] = sample.value
+        self._times[slot] = sample.timestamp
+        self._pending.add(slot)
+        if len(self._pending) == len(self._values):
+            self._async_close()
+
+    @callback
+    def _async_close(self) -> None:
+        """Close the open snapshot and send its power flow."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._pending.clear()
+        if None in self._values:
+            # Every stream has to report once before the first snapshot
+            return
+        if self._opened - min(self._times) > MAX_HOLD:
+            # A stream stopped reporting, its value is from another instant
+            return
+        grid, solar, house, *ports = self._values
+        self._listener(PowerFlow(self._opened, grid, solar, house, tuple(ports)))
@@ -0,0 +1,88 @@
+"""Prism sensors recorded by Home Assistant.
+
+The recorded Prism sensors are found in the entity registry and read from the
+recorder SQLite database, without Home Assistant running. The module depends
+only on the standard library, it is shared by the offline analysis and the
+exports.
+"""
+
+from dataclasses import dataclass
+import json
+from pathlib import Path
+import re
+import sqlite3
+from typing import Any
+
+SCHEMA_PATH = Path(__file__).parent / "topics.json"
+RECORDER_DB = "home-assistant_v2.db"
+ENTITY_REGISTRY = Path(".storage") / "core.entity_registry"
+PLATFORM = "silla_prism"
+
+SOURCE_STATES = "states"
+SOURCE_STATISTICS = "statistics"
+STATISTICS_PERIOD = 3600
+
+DECODER_NUMBER = "number"
+DECODER_ENUM = "enum"
+
+
+@dataclass(slots=True, frozen=True)
+class PrismSeries:
+    """A recorded Prism sensor."""
+
+    serial: str
+    port: int
+    key: str
+    entity_id: str
+    decoder: str
+    state_class: str | None
+
+
+def decoded_sensors() -> list[dict[str, Any]]:
+    """Return the schema of the sensors decoded from the Prism topics."""
+    schema = json.loads(SCHEMA_PATH.read_text(encoding="utf-8"))
+    return [row for row in schema["sensor"] if "decoder" in row]
+
+
+def discover_series(config_dir: Path) -> list[PrismSeries]:
+    """Return the decoded Prism sensors of the entity registry.
+
+    The unique ids are matched against the key templates of the topic schema,
+    the port is 0 for the device sensors and 1 on single port devices.
+    """
+    patterns = [
+        (
+            row,
+            re.compile(
+                rf"^prism_(?:(?P<serial>[A-Za-z0-9]*)_)?{row['translation_key']}"
+                r"(?:_(?P<port>\d+))?(?:_001)?$"
+            ),
+        )
+        for row in decoded_sensors()
+    ]
+    registry = json.loads((config_dir / ENTITY_REGISTRY).read_text(encoding="utf-8"))
+    series = []
+    for entity in registry["data"]["entities"]:
+        if entity["platform"] != PLATFORM:
+            continue
+        for row, pattern in patterns:
+            if (match := pattern.match(entity["unique_id"])) is None:
+                continue
+            port = int(match["port"] or 1) if row["group"] == "port" else 0
+            series.append(
+                PrismSeries(
+                    match["serial"] or "",
+                    port,
+                    row["translation_key"],
+                    entity["entity_id"],
+                    row["decoder"],
+                    row.get("state_class"),
+                )
+            )
+            break
+    return series
+
+
+def connect(database: Path) -> sqlite3.Connection:
+    """Open the recorder database read only."""
+    return sqlite3.connect(f"file:{database}?mode=ro", uri=True)
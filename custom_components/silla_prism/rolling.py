@@ -0,0 +1,98 @@
+"""Incremental rolling window statistics."""
+
+from collections import deque
+
+
+class RollingWindow:
+    """Mean, minimum and maximum of the samples of the last duration seconds.
+
+    The samples are stored in a fixed size circular buffer with a running sum,
+    the minimum and the maximum are kept in monotonic deques. Adding a sample
+    costs O(1) amortized, reading a statistic costs O(1). The samples leave the
+    window when a sample is added or when the window is pruned, a quiet stream
+    has to be pruned periodically.
+    """
+
+    __slots__ = (
+        "_capacity",
+        "_count",
+        "_duration",
+        "_head",
+        "_max",
+        "_min",
+        "_seq",
+        "_sum",
+        "_times",
+        "_values",
+    )
+
+    def __init__(self, duration: float, capacity: int) -> None:
+        """Initialize the window, duration is in seconds."""
+        self._duration = duration
+        self._capacity = capacity
+        self._times = [0.0] * capacity
+        self._values = [0.0] * capacity
+        self._head = 0
+        self._count = 0
+        self._seq = 0
+        self._sum = 0.0
+        self._min: deque[tuple[int, float]] = deque()
+        self._max: deque[tuple[int, float]] = deque()
+
+    def add(self, timestamp: float, value: float) -> None:
+        """Add a sample and drop the samples that left the window."""
+        if self._count == self._capacity:
+            self._drop_oldest()
+        tail = (self._head + self._count) % self._capacity
+        self._times[tail] = timestamp
+        self._values[tail] = value
+        self._count += 1
+        self._sum += value
+        seq = self._seq + self._count - 1
+        while self._min and self._min[-1][1] >= value:
+            self._min.pop()
+        self._min.append((seq, value))
+        while self._max and self._max[-1][1] <= value:
+            self._max.pop()
+        self._max.append((seq, value))
+        self.prune(timestamp)
+
+    def prune(self, now: float) -> bool:
+        """Drop the samples older than the window duration.
+
+        Returns True when samples were dropped.
+        """
+        limit = now - self._duration
+        count = self._count
+        while self._count and self._times[self._head] < limit:
+            self._drop_oldest()
+        return self._count != count
+
+    def _drop_oldest(self) -> None:
+        """Drop the oldest sample of the buffer."""
+        self._sum -= self._values[self._head]
+        self._head = (self._head + 1) % self._capacity
+        self._count -= 1
+        self._seq += 1
+        if self._min[0][0] < self._seq:
+            self._min.popleft()
+        if self._max[0][0] < self._seq:
+            self._max.popleft()
+        if not self._count:
+            # Reset the running sum to avoid accumulating rounding errors
+            self._sum = 0.0
+
+    @property
+    def mean(self) -> float | None:
+        """Return the mean of the samples in the window."""
+        return self._sum / self._count if self._count else None
+
+    @property
+    def min(self) -> float | None:
+        """Return the minimum of the samples in the window."""
+        return self._min[0][1] if self._count else None
+
+    @property
+    def max(self) -> float | None:
+        """Return the maximum of the samples in the window."""
+        return self._max[0][1] if self._count else None
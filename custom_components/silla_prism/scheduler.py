@@ -0,0 +1,188 @@
+"""Weekly scheduler of the mode commands of the Prism ports."""
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+import heapq
+import logging
+import re
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_track_point_in_utc_time
+from homeassistant.util import dt as dt_util
+
+from .client import command_topic
+from .dispatcher import PrismDispatcher
+from .schema import SCHEMA
+from .tariff import parse_days
+
+_LOGGER = logging.getLogger(__name__)
+
+WEEK = timedelta(days=7)
+
+_RULE = re.compile(
+    r"^(?:(?P<ports>[\d,]+)\s+)?(?:(?P<days>[a-z,\-]+)\s+)?"
+    r"(?P<hour>\d{1,2}):(?P<minute>\d{2})\s+(?P<action>\w+)$"
+)
+
+
+def _compile_actions() -> dict[str, tuple[str, str | int]]:
+    """Return the command and the payload of every action, by name.
+
+    The actions are the options of the mode select and the mode traps
+    buttons, e.g. solar or noauth.
+    """
+    actions: dict[str, tuple[str, str | int]] = {}
+    for row in SCHEMA["select"]:
+        command = row["topic_out"].rpartition("/")[2]
+        for index, option in enumerate(row["options"], 1):
+            actions[option] = (command, index)
+    for row in SCHEMA["button"]:
+        name = row["translation_key"].removeprefix(f"{row['command']}_")
+        actions[name] = (row["command"], row["parameter"])
+    return actions
+
+
+ACTIONS = _compile_actions()
+
+
+@dataclass(slots=True, frozen=True)
+class ScheduleRule:
+    """A command published to a port every week at a local time."""
+
+    weekday: int
+    hour: int
+    minute: int
+    port: int
+    command: str
+    payload: str | int
+
+    def next_time(self, now: datetime) -> datetime:
+        """Return the first local time of the rule after now."""
+        days = (self.weekday - now.weekday()) % 7
+        candidate = now.replace(
+            hour=self.hour, minute=self.minute, second=0, microsecond=0
+        ) + timedelta(days=days)
+        return candidate if candidate > now else candidate + WEEK
+
+
+def parse_schedule(text: str, ports: int) -> list[ScheduleRule]:
+    """Parse the schedule option, raises ValueError when it is invalid.
+
+    The rules are separated by semicolons or new lines, each with optional
+    ports and days, the local time and the action, e.g.
+    "mon-fri 22:00 normal; 2 sat,sun 08:00 solar".
+    """
+    rules = []
+    lines = (line.strip().lower() for line in re.split(r"[;\n]", text))
+    for line in filter(None, lines):
+        if (match := _RULE.match(line)) is None or match["action"] not in ACTIONS:
+            raise ValueError(f"Invalid rule: {line}")
+        hour, minute = int(match["hour"]), int(match["minute"])
+        if hour > 23 or minute > 59:
+            raise ValueError(f"Invalid time: {line}")
+        rule_ports = list(range(1, ports + 1))
+        if match["ports"] is not None:
+            rule_ports = [int(port) for port in match["ports"].split(",")]
+            if not all(1 <= port <= ports for port in rule_ports):
+                raise ValueError(f"Invalid port: {line}")
+        command, payload = ACTIONS[match["action"]]
+        rules.extend(
+            ScheduleRule(day, hour, minute, port, command, payload)
+            for day in parse_days(match["days"])
+            for port in rule_ports
+        )
+    return rules
+
+
+class PrismScheduler:
+    """Publish the scheduled commands of a config entry.
+
+    The next occurrence of every rule is kept in a heap, ordered by time, and a
+    single timer waits for the earliest one. At start the last command due for
+    every port and command is published, so the ports are in the scheduled
+    mode after a restart or a schedule change.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        dispatcher: PrismDispatcher,
+        rules: list[ScheduleRule],
+    ) -> None:
+        """Initialize the scheduler."""
+        self._hass = hass
+        self._dispatcher = dispatcher
+        self._rules = rules
+        self._heap: list[tuple[datetime, int]] = []
+        self._unsub_timer: CALLBACK_TYPE | None = None
+
+    @callback
+    def async_start(self) -> CALLBACK_TYPE:
+        """Publish the current slot and start the timer, returns the stop."""
+        now = dt_util.now()
+        current: dict[tuple[int, str], tuple[datetime, ScheduleRule]] = {}
+        for index, rule in enumerate(self._rules):
+            scheduled = rule.next_time(now)
+            self._heap.append((scheduled, index))
+            previous = scheduled - WEEK
+            channel = (rule.port, rule.command)
+            if channel not in current or current[channel][0] <= previous:
+                current[channel] = (previous, rule)
+        heapq.heapify(self._heap)
+        for _, rule in current.values():
+            self._async_publish(rule)
+        self._async_schedule()
+
+        @callback
+        def _stop() -> None:
+            if self._unsub_timer is not None:
+                self._unsub_timer()
+                self._unsub_timer = None
+            self._heap.clear()
+
+        return _stop
+
+    @callback
+    def async_next(self) -> list[dict[str, str | int]]:
+        """Return the next scheduled commands, for the diagnostics."""
+        return [
+            {
+                "time": scheduled.isoformat(),
+                "port": self._rules[index].port,
+                "command": self._rules[index].command,
+                "payload": self._rules[index].payload,
+            }
+            for scheduled, index in heapq.nsmallest(8, self._heap)
+        ]
+
+    @callback
+    def _async_schedule(self) -> None:
+        """Wait for the earliest rule of the heap."""
+        if self._heap:
+            self._unsub_timer = async_track_point_in_utc_time(
+                self._hass, self._async_fire, self._heap[0][0]
+            )
+
+    @callback
+    def _async_fire(self, _: datetime) -> None:
+        """Publish the due commands and schedule their next week."""
+        self._unsub_timer = None
+        now = dt_util.now()
+        while self._heap and self._heap[0][0] <= now:
+            _, index = self._heap[0]
+            rule = self._rules[index]
+            self._async_publish(rule)
+            heapq.heapreplace(self._heap, (rule.next_time(now), index))
+        self._async_schedule()
+
+    @callback
+    def _async_publish(self, rule: ScheduleRule) -> None:
+        """Publish the command of a rule."""
+        _LOGGER.debug(
+            "Scheduled %s %s on port %d", rule.command, rule.payload, rule.port
+        )
+        self._hass.async_create_task(
+            self._dispatcher.async_publish(
+                command_topic(rule.port, rule.command), rule.payload
+            )
+        )
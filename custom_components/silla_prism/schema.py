@@ -0,0 +1,118 @@
+"""Declarative schema of the Prism MQTT topics.
+
+Every topic published by the Prism, its decoder and the entities that expose
+it are described in topics.json. The schema is compiled once, when the
+integration is loaded, into the entity descriptions of every platform and
+into the index of the decoded topics fed to the telemetry bus.
+"""
+
+from collections.abc import Iterator, Mapping
+from dataclasses import dataclass, replace
+from enum import StrEnum
+from typing import Any, TypeVar
+
+from homeassistant.const import EntityCategory
+from homeassistant.helpers.entity import EntityDescription
+
+# The schema and its constants are shared with the headless client, the platforms
+# import them from here
+from .client import (
+    DECODER_ENUM,
+    GROUP_BASE as GROUP_BASE,
+    GROUP_PORT as GROUP_PORT,
+    GROUP_POWERWALL as GROUP_POWERWALL,
+    SCHEMA as SCHEMA,
+)
+
+# Schema fields that are not entity description fields
+_SCHEMA_FIELDS = ("group", "decoder", "transitions", "filter")
+
+_DescriptionT = TypeVar("_DescriptionT", bound=EntityDescription)
+
+
+@dataclass(slots=True, frozen=True)
+class TopicHandler:
+    """A decoded topic of the schema, with the key of its telemetry samples."""
+
+    topic: str
+    group: str
+    key: str
+    options: tuple[str, ...] | None
+    transitions: bool
+    sample_filter: Mapping[str, Any] | None
+
+    def topics(self, ports: int) -> Iterator[tuple[str, int]]:
+        """Return the topic and the port of every instance of the handler."""
+        if self.group == GROUP_PORT:
+            for port in range(1, ports + 1):
+                yield self.topic.format(port), port
+        else:
+            yield self.topic, 0
+
+
+def compile_descriptions(
+    platform: str,
+    description_class: type[_DescriptionT],
+    group: str,
+    **enums: type[StrEnum],
+) -> tuple[_DescriptionT, ...]:
+    """Compile the entity descriptions of a platform and topic group.
+
+    The string values of the fields listed in enums are converted to the
+    given enum, e.g. device_class=SensorDeviceClass.
+    """
+    enums.setdefault("entity_category", EntityCategory)
+    descriptions = []
+    for row in SCHEMA.get(platform, ()):
+        if row["group"] != group:
+            continue
+        fields = {
+            name: enums[name](value) if name in enums else value
+            for name, value in row.items()
+            if name not in _SCHEMA_FIELDS
+        }
+        fields.setdefault("has_entity_name", True)
+        descriptions.append(description_class(**fields))
+    return tuple(descriptions)
+
+
+def _compile_topic_index() -> dict[str, tuple[TopicHandler, ...]]:
+    """Compile the index of the decoded topics, by topic template."""
+    index: dict[str, list[TopicHandler]] = {}
+    for rows in SCHEMA.values():
+        for row in rows:
+            if (decoder := row.get("decoder")) is None:
+                continue
+            index.setdefault(row["topic"], []).append(
+                TopicHandler(
+                    row["topic"],
+                    row["group"],
+                    row["translation_key"],
+                    tuple(row["options"]) if decoder == DECODER_ENUM else None,
+                    row.get("transitions", False),
+                    row.get("filter"),
+                )
+            )
+    return {topic: tuple(handlers) for topic, handlers in index.items()}
+
+
+TOPIC_INDEX = _compile_topic_index()
+
+
+def format_description(
+    description: _DescriptionT, port: int, mulitport: bool
+) -> _DescriptionT:
+    """Return the description of an entity of a port.
+
+    The port is filled in the key and topic templates, the key loses its port
+    suffix on single port devices. Device descriptions (port 0) are unchanged.
+    """
+    if port == 0:
+        return description
+    changes: dict[str, Any] = {
+        "key": description.key.format(port) if mulitport else description.key[:-3]
+    }
+    for name in ("topic", "topic_out"):
+        if (template := getattr(description, name, None)) is not None:
+            changes[name] = template.format(port)
+    return replace(description, **changes)
@@ -1,19 +1,19 @@
 """Silla Prism select entity module."""
 
 import logging
-from typing import override
+from typing import Any, override
 
-from homeassistant.components import mqtt
 from homeassistant.components.select import SelectEntity, SelectEntityDescription
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import EntityCategory
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
+from .client import decode_mode, encode_option
 from .const import SELECT_DOMAIN
 from .domain_data import DomainData
 from .entity import PrismBaseEntity
 from .entry_data import RuntimeEntryData
+from .schema import GROUP_PORT, compile_descriptions, format_description
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -49,32 +49,6 @@ class PrismSelect(PrismBaseEntity, SelectEntity):
 
     entity_description: PrismSelectEntityDescription
 
-    def description(
-        self, port: int, mulitport: bool, description: PrismSelectEntityDescription
-    ) -> PrismSelectEntityDescription:
-        """Create a Select entity for Prism EVSE devices."""
-        if mulitport:
-            return PrismSelectEntityDescription(
-                key=description.key.format(port),
-                topic=description.topic.format(port),
-                entity_category=description.entity_category,
-                device_class=description.device_class,
-                options=description.options,
-                has_entity_name=description.has_entity_name,
-                translation_key=description.translation_key,
-                topic_out=description.topic_out.format(port),
-            )
-        return PrismSelectEntityDescription(
-            key=description.key[0:-3],
-            topic=description.topic.format(port),
-            entity_category=description.entity_category,
-            device_class=description.device_class,
-            options=description.options,
-            has_entity_name=description.has_entity_name,
-            translation_key=description.translation_key,
-            topic_out=description.topic_out.format(port),
-        )
-
     def __init__(
         self,
         entry_data: RuntimeEntryData,
@@ -88,21 +62,22 @@ class PrismSelect(PrismBaseEntity, SelectEntity):
         else:
             device = entry_data.devices[port]
 
-        _description = self.description(port, ismultiport, description)
+        _description = format_description(description, port, ismultiport)
         super().__init__(
             entry_data,
             SELECT_DOMAIN,
             _description,
             device,
+            port,
         )
 
         self._attr_current_option = None
-        self._topic_out = entry_data.topic + _description.topic_out
+        self._topic_out = _description.topic_out
 
     def _message_received(self, msg) -> None:
         """Update the sensor with the most recent event."""
         try:
-            _sel = int(msg.payload) - 1
+            option = decode_mode(msg.payload, self.options)
         except ValueError:
             _LOGGER.warning(
                 "Invalid topic payload: topic:%s payload:%s",
@@ -111,46 +86,36 @@ class PrismSelect(PrismBaseEntity, SelectEntity):
             )
             return
 
-        # FIXME: this is a hack to fix the autolimit mode. To be implemented in a better way
-        # If mode is autolimit, set to pause
-        if _sel == 6:
-            _sel = 2
         # Update state if value is valid and different from current option
-        if (
-            0 <= _sel < len(self.options)
-            and self.options[_sel] != self._attr_current_option
-        ):
-            self._attr_current_option = self.options[_sel]
-            self.schedule_update_ha_state()
+        if option is not None and option != self._attr_current_option:
+            self._attr_current_option = option
+            self.async_schedule_write()
+
+    @override
+    def _snapshot_value(self) -> Any:
+        """Return the value pushed to the device snapshot."""
+        return self._attr_current_option
 
     async def async_added_to_hass(self) -> None:
         """Subscribe to mqtt."""
         _LOGGER.debug("async_added_to_hass key:%s", self.entity_description.key)
+        self._register_snapshot_entity()
         await self._subscribe_topic()
 
     async def async_will_remove_from_hass(self) -> None:
         """Unsubscribe from mqtt."""
         _LOGGER.debug("async_will_remove_from_hass key:%s", self.entity_description.key)
         await super().async_will_remove_from_hass()
-        self.cleanup_expiration_trigger()
 
     async def async_select_option(self, option: str) -> None:
         """Change the selected option."""
         self._attr_current_option = option
-        self.schedule_update_ha_state()
-        await mqtt.async_publish(
-            self.hass, self._topic_out, self.options.index(option) + 1
+        self.async_schedule_write()
+        await self._entry_data.dispatcher.async_publish(
+            self._topic_out, encode_option(self.options, option)
         )
 
 
-SELECTS: tuple[PrismSelectEntityDescription, ...] = (
-    PrismSelectEntityDescription(
-        key="set_mode_{}",
-        topic="{}/mode",
-        topic_out="{}/command/set_mode",
-        entity_category=EntityCategory.CONFIG,
-        options=["solar", "normal", "paused", "hybrid"],
-        has_entity_name=True,
-        translation_key="set_port_mode",
-    ),
+SELECTS = compile_descriptions(
+    SELECT_DOMAIN, PrismSelectEntityDescription, GROUP_PORT
 )
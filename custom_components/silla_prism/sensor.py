@@ -1,8 +1,11 @@
 """Contains sensors exposed by the Prism wallbox integration."""
 
 from contextlib import suppress
+from datetime import datetime, timedelta
 from decimal import Decimal
 import logging
+import time
+from typing import Any
 
 from homeassistant.components.sensor import (
     SensorDeviceClass,
@@ -12,25 +15,38 @@ from homeassistant.components.sensor import (
 )
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import (
+    PERCENTAGE,
     STATE_UNAVAILABLE,
     STATE_UNKNOWN,
     UnitOfElectricCurrent,
-    UnitOfElectricPotential,
     UnitOfEnergy,
     UnitOfPower,
-    UnitOfTemperature,
-    UnitOfTime,
 )
-from homeassistant.core import Event, EventStateChangedData, HomeAssistant, callback
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.device_registry import DeviceInfo
 from homeassistant.helpers.entity import EntityDescription
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.event import async_track_state_change_event
+from homeassistant.helpers.event import async_track_time_interval
 from homeassistant.helpers.restore_state import RestoreEntity
 
-from .const import SENSOR_DOMAIN
+from .client import decode_payload
+from .const import DOMAIN, SENSOR_DOMAIN
+from .dispatcher import PrismDispatcher
 from .domain_data import DomainData
-from .entity import PrismBaseEntity, _get_unique_id
+from .entity import PrismBaseEntity, PrismDerivedEntity, _get_unique_id
 from .entry_data import RuntimeEntryData
+from .powerflow import PowerFlow, PowerFlowBuffer
+from .rolling import RollingWindow
+from .schema import (
+    GROUP_BASE,
+    GROUP_PORT,
+    GROUP_POWERWALL,
+    compile_descriptions,
+    format_description,
+)
+from .site import SiteAggregator
+from .tariff import ChargingCost
+from .telemetry import PrismSample
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -58,9 +74,153 @@ async def async_setup_entry(
                 for description in POWERWALL_SENSORS
             ]
         )
+        sensors.extend(_create_power_flow_sensors(hass, entry, entry_data))
     if entry_data.vsensors:
         sensors.append(PrismGridEnergy(entry_data, VSENSORS[0]))
+    if entry_data.rolling_stats:
+        sensors.extend(_create_rolling_sensors(hass, entry, entry_data))
+    if entry_data.tariffs is not None:
+        sensors.extend(_create_cost_sensors(entry, entry_data))
     async_add_entities(sensors)
+    if entry_data.site_aggregates:
+
+        @callback
+        def _add_site_sensors() -> None:
+            async_add_entities(_create_site_sensors(hass, entry, entry_data))
+
+        entry.async_on_unload(
+            DomainData.get(hass).async_add_site_sensor_host(
+                entry.entry_id, _add_site_sensors
+            )
+        )
+
+
+def _create_rolling_sensors(
+    hass: HomeAssistant, entry: ConfigEntry, entry_data: RuntimeEntryData
+) -> list["PrismRollingSensor"]:
+    """Create the rolling statistics sensors fed by the telemetry bus.
+
+    The windows are also pruned periodically, so the statistics of a stream
+    that stopped reporting do not stay frozen.
+    """
+    sources = [(0, d) for d in BASE_SENSORS if d.translation_key in ROLLING_SOURCES]
+    for port in range(1, entry_data.ports + 1):
+        sources.extend(
+            (port, d) for d in SENSORS if d.translation_key in ROLLING_SOURCES
+        )
+
+    sensors: list[PrismRollingSensor] = []
+    feeds: dict[
+        tuple[int, str], list[tuple[RollingWindow, list[PrismRollingSensor]]]
+    ] = {}
+    for port, source in sources:
+        for duration, window_name, capacity in ROLLING_WINDOWS:
+            window = RollingWindow(duration, capacity)
+            group = [
+                PrismRollingSensor(entry_data, source, port, window, window_name, stat)
+                for stat in ROLLING_STATS
+            ]
+            feeds.setdefault((port, source.translation_key), []).append(
+                (window, group)
+            )
+            sensors.extend(group)
+
+    dispatcher = entry_data.dispatcher
+
+    @callback
+    def _feed_windows(sample: PrismSample) -> None:
+        targets = feeds.get((sample.port, sample.key))
+        if targets is None or not isinstance(sample.value, float):
+            return
+        for window, group in targets:
+            window.add(sample.timestamp, sample.value)
+            for sensor in group:
+                dispatcher.async_mark_dirty(sensor)
+
+    @callback
+    def _prune_windows(_: datetime) -> None:
+        now = time.time()
+        for targets in feeds.values():
+            for window, group in targets:
+                if window.prune(now):
+                    for sensor in group:
+                        dispatcher.async_mark_dirty(sensor)
+
+    entry.async_on_unload(dispatcher.async_subscribe_telemetry(_feed_windows))
+    entry.async_on_unload(
+        async_track_time_interval(hass, _prune_windows, ROLLING_PRUNE_INTERVAL)
+    )
+    return sensors
+
+
+def _create_power_flow_sensors(
+    hass: HomeAssistant, entry: ConfigEntry, entry_data: RuntimeEntryData
+) -> list["PrismPowerFlowSensor"]:
+    """Create the power flow sensors computed from the aligned snapshots."""
+    sensors = [
+        PrismPowerFlowSensor(entry_data, description)
+        for description in POWER_FLOW_SENSORS
+    ]
+    dispatcher = entry_data.dispatcher
+
+    @callback
+    def _flow_received(flow: PowerFlow) -> None:
+        for sensor in sensors:
+            sensor.async_set_flow(flow)
+            dispatcher.async_mark_dirty(sensor)
+
+    buffer = PowerFlowBuffer(hass, dispatcher, entry_data.ports, _flow_received)
+    entry.async_on_unload(buffer.async_start())
+    return sensors
+
+
+def _create_cost_sensors(
+    entry: ConfigEntry, entry_data: RuntimeEntryData
+) -> list["PrismCostSensor"]:
+    """Create the charging cost sensors fed by the session energy samples."""
+    sensors: list[PrismCostSensor] = []
+    feeds: dict[int, tuple[ChargingCost, list[PrismCostSensor]]] = {}
+    for port in range(1, entry_data.ports + 1):
+        cost = ChargingCost()
+        group = [PrismCostSensor(entry_data, port, cost, stat) for stat in COST_STATS]
+        feeds[port] = (cost, group)
+        sensors.extend(group)
+
+    dispatcher = entry_data.dispatcher
+
+    @callback
+    def _feed_costs(sample: PrismSample) -> None:
+        if sample.key != COST_SOURCE or not isinstance(sample.value, float):
+            return
+        if (tariffs := entry_data.tariffs) is None or sample.port not in feeds:
+            return
+        cost, group = feeds[sample.port]
+        cost.add(sample.value, tariffs.price_at(sample.timestamp))
+        for sensor in group:
+            dispatcher.async_mark_dirty(sensor)
+
+    entry.async_on_unload(dispatcher.async_subscribe_telemetry(_feed_costs))
+    return sensors
+
+
+def _create_site_sensors(
+    hass: HomeAssistant, entry: ConfigEntry, entry_data: RuntimeEntryData
+) -> list["PrismSiteSensor"]:
+    """Create the site wide sensors with the sums of all the Prism ports."""
+    aggregator = DomainData.get(hass).get_site_aggregator()
+    sensors = {
+        description.key: PrismSiteSensor(aggregator, entry_data.dispatcher, description)
+        for description in SITE_SENSORS
+    }
+    dispatcher = entry_data.dispatcher
+
+    @callback
+    def _sum_changed(key: str) -> None:
+        if (sensor := sensors.get(key)) is not None:
+            dispatcher.async_mark_dirty(sensor)
+
+    entry.async_on_unload(aggregator.async_add_listener(_sum_changed))
+    return list(sensors.values())
 
 
 class PrismSensorEntityDescription(SensorEntityDescription, frozen_or_thawed=True):
@@ -70,7 +230,7 @@ class PrismSensorEntityDescription(SensorEntityDescription, frozen_or_thawed=Tru
     topic: str = None
 
 
-class PrismGridEnergy(SensorEntity, RestoreEntity):
+class PrismGridEnergy(PrismDerivedEntity, SensorEntity, RestoreEntity):
     """A Sensor that compute the integral of energy take from grid."""
 
     _attr_should_poll = False
@@ -83,12 +243,15 @@ class PrismGridEnergy(SensorEntity, RestoreEntity):
         self._attr_device_info = entry_data.devices[0]
         self.entity_description = description
         self._attr_unique_id = _get_unique_id(entry_data.serial, description.key)
+        self._dispatcher = entry_data.dispatcher
         self._integral: Decimal = Decimal(0)
+        self._last_sample: PrismSample | None = None
 
     async def async_added_to_hass(self) -> None:
         """Sensor is added to hass."""
         _LOGGER.debug("async_added_to_hass %s", self.entity_description.key)
         await super().async_internal_added_to_hass()
+        await super().async_added_to_hass()
 
         if state := await self.async_get_last_state():
             _LOGGER.debug("async_added_to_hass last state %s", state)
@@ -103,37 +266,31 @@ class PrismGridEnergy(SensorEntity, RestoreEntity):
                 )
 
         self.async_on_remove(
-            async_track_state_change_event(
-                self.hass, "sensor.silla_prism_input_grid_power", self._calc_integral
-            )
+            self._dispatcher.async_subscribe_telemetry(self._calc_integral)
         )
 
     @callback
-    def _calc_integral(self, event: Event[EventStateChangedData]) -> None:
-        """Handle the sensor state changes."""
-        old_state = event.data["old_state"]
-        new_state = event.data["new_state"]
+    def _calc_integral(self, sample: PrismSample) -> None:
+        """Integrate the grid power samples of the telemetry bus."""
+        if sample.key != "input_grid_power":
+            return
 
-        if old_state is None:
+        old_sample, self._last_sample = self._last_sample, sample
+        if old_sample is None:
             return
 
-        if old_state.state in (STATE_UNKNOWN, STATE_UNAVAILABLE) or new_state.state in (
-            STATE_UNKNOWN,
-            STATE_UNAVAILABLE,
-        ):
+        if old_sample.value is None or sample.value is None:
             if self._attr_available:
                 self._attr_available = False
-                self.async_write_ha_state()
+                self._dispatcher.async_mark_dirty(self)
             return
 
-        elapsed_time = Decimal(
-            ((new_state.last_updated - old_state.last_updated).total_seconds()) / 3600
-        )
+        elapsed_time = Decimal((sample.timestamp - old_sample.timestamp) / 3600)
 
         # Wh to kWh conversion is Wh/1000
-        average_value = (Decimal(new_state.state) + Decimal(old_state.state)) / Decimal(
-            2000
-        )
+        average_value = (
+            Decimal(sample.value) + Decimal(old_sample.value)
+        ) / Decimal(2000)
 
         self._integral += elapsed_time * average_value
 
@@ -148,7 +305,161 @@ class PrismGridEnergy(SensorEntity, RestoreEntity):
 
         if not self._attr_available:
             self._attr_available = True
-        self.async_write_ha_state()
+        self._dispatcher.async_mark_dirty(self)
+
+
+class PrismPowerFlowSensor(PrismDerivedEntity, SensorEntity):
+    """A Sensor derived from the aligned power flow snapshots."""
+
+    _attr_should_poll = False
+    _attr_available = False
+
+    def __init__(
+        self, entry_data: RuntimeEntryData, description: SensorEntityDescription
+    ) -> None:
+        """Init Prism power flow sensor."""
+        self._attr_device_info = entry_data.devices[0]
+        self.entity_description = description
+        self._attr_unique_id = _get_unique_id(entry_data.serial, description.key)
+        self._dispatcher = entry_data.dispatcher
+
+    @callback
+    def async_set_flow(self, flow: PowerFlow) -> None:
+        """Compute the value of a new snapshot."""
+        self._attr_native_value = getattr(flow, self.entity_description.key)
+        self._attr_available = True
+
+
+class PrismSiteSensor(PrismDerivedEntity, SensorEntity):
+    """A Sensor with the sum of a value over the ports of all the Prisms."""
+
+    _attr_should_poll = False
+
+    def __init__(
+        self,
+        aggregator: SiteAggregator,
+        dispatcher: PrismDispatcher,
+        description: SensorEntityDescription,
+    ) -> None:
+        """Init Prism site sensor, dispatcher is the one of the hosting entry."""
+        self._attr_device_info = SITE_DEVICE
+        self._dispatcher = dispatcher
+        self.entity_description = description
+        # Not prism_ prefixed, the site is not a Prism serial of the recorder
+        self._attr_unique_id = f"{DOMAIN}_site_{description.key}"
+        self._aggregator = aggregator
+
+    @property
+    def native_value(self) -> float:
+        """Return the sum over all the ports."""
+        return self._aggregator.totals[self.entity_description.key]
+
+
+class PrismCostSensor(PrismDerivedEntity, SensorEntity, RestoreEntity):
+    """A Sensor with the session or the total charging cost of a port."""
+
+    _attr_should_poll = False
+
+    def __init__(
+        self,
+        entry_data: RuntimeEntryData,
+        port: int,
+        cost: ChargingCost,
+        stat: str,
+    ) -> None:
+        """Init Prism cost sensor."""
+        key = f"{stat}_cost"
+        ismultiport = entry_data.ports > 1
+        self._attr_device_info = entry_data.devices[port if ismultiport else 0]
+        self.entity_description = SensorEntityDescription(
+            key=f"{key}_{port}" if ismultiport else key,
+            device_class=SensorDeviceClass.MONETARY,
+            state_class=SensorStateClass.TOTAL,
+            suggested_display_precision=2,
+            has_entity_name=True,
+            translation_key=key,
+        )
+        self._attr_unique_id = _get_unique_id(
+            entry_data.serial, self.entity_description.key
+        )
+        self._dispatcher = entry_data.dispatcher
+        self._cost = cost
+        self._stat = stat
+
+    @property
+    def native_unit_of_measurement(self) -> str:
+        """Return the currency of the Home Assistant configuration."""
+        return self.hass.config.currency
+
+    @property
+    def native_value(self) -> float:
+        """Return the accumulated cost."""
+        return getattr(self._cost, self._stat)
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any] | None:
+        """Return the last session energy, to resume after a restart."""
+        if self._stat != "session":
+            return None
+        return {"session_energy": self._cost.energy}
+
+    async def async_added_to_hass(self) -> None:
+        """Restore the accumulated cost."""
+        await super().async_added_to_hass()
+        if (state := await self.async_get_last_state()) is None:
+            return
+        with suppress(ValueError):
+            value = float(state.state)
+            if self._stat == "session":
+                self._cost.session = value
+                self._cost.energy = state.attributes.get("session_energy")
+            else:
+                self._cost.total = value
+
+
+class PrismRollingSensor(PrismDerivedEntity, SensorEntity):
+    """A Sensor with a rolling window statistic of a Prism sensor."""
+
+    _attr_should_poll = False
+
+    def __init__(
+        self,
+        entry_data: RuntimeEntryData,
+        source: PrismSensorEntityDescription,
+        port: int,
+        window: RollingWindow,
+        window_name: str,
+        stat: str,
+    ) -> None:
+        """Init Prism rolling sensor."""
+        key = f"{source.translation_key}_{stat}_{window_name}"
+        ismultiport = entry_data.ports > 1
+        self._attr_device_info = entry_data.devices[port if ismultiport else 0]
+        self.entity_description = SensorEntityDescription(
+            key=f"{key}_{port}" if ismultiport and port > 0 else key,
+            device_class=source.device_class,
+            state_class=SensorStateClass.MEASUREMENT,
+            native_unit_of_measurement=source.native_unit_of_measurement,
+            suggested_display_precision=source.suggested_display_precision,
+            has_entity_name=True,
+            translation_key=key,
+        )
+        self._attr_unique_id = _get_unique_id(
+            entry_data.serial, self.entity_description.key
+        )
+        self._dispatcher = entry_data.dispatcher
+        self._window = window
+        self._stat = stat
+
+    @property
+    def available(self) -> bool:
+        """Return True when the window holds at least one sample."""
+        return super().available and self._window.mean is not None
+
+    @property
+    def native_value(self) -> float | None:
+        """Return the statistic of the window."""
+        return getattr(self._window, self._stat)
 
 
 class PrismSensor(PrismBaseEntity, SensorEntity):
@@ -156,35 +467,6 @@ class PrismSensor(PrismBaseEntity, SensorEntity):
 
     entity_description: PrismSensorEntityDescription
 
-    def _get_description(
-        self, port: int, mulitport: bool, description: PrismSensorEntityDescription
-    ) -> PrismSensorEntityDescription:
-        if port == 0:
-            return description
-        if mulitport:
-            return PrismSensorEntityDescription(
-                key=description.key.format(port),
-                topic=description.topic.format(port),
-                device_class=description.device_class,
-                state_class=description.state_class,
-                native_unit_of_measurement=description.native_unit_of_measurement,
-                suggested_display_precision=description.suggested_display_precision,
-                options=description.options,
-                has_entity_name=description.has_entity_name,
-                translation_key=description.translation_key,
-            )
-        return PrismSensorEntityDescription(
-            key=description.key[:-3],
-            topic=description.topic.format(port),
-            device_class=description.device_class,
-            state_class=description.state_class,
-            native_unit_of_measurement=description.native_unit_of_measurement,
-            suggested_display_precision=description.suggested_display_precision,
-            options=description.options,
-            has_entity_name=description.has_entity_name,
-            translation_key=description.translation_key,
-        )
-
     def __init__(
         self, entry_data: RuntimeEntryData, description: EntityDescription, port: int
     ) -> None:
@@ -197,8 +479,9 @@ class PrismSensor(PrismBaseEntity, SensorEntity):
         super().__init__(
             entry_data,
             SENSOR_DOMAIN,
-            self._get_description(port, ismultiport, description),
+            format_description(description, port, ismultiport),
             device,
+            port,
         )
 
     def _message_received(self, msg) -> None:
@@ -206,194 +489,134 @@ class PrismSensor(PrismBaseEntity, SensorEntity):
         self.schedule_expiration_callback()
         # Update native value
         if self.options is not None:
-            try:
-                self._attr_native_value = self.options[int(msg.payload) - 1]
-            except IndexError:
-                self._attr_native_value = None
+            self._attr_native_value = decode_payload(msg.payload, self.options)
         else:
             self._attr_native_value = msg.payload
         # Schedule update ha state
-        self.schedule_update_ha_state()
+        self.async_schedule_write()
+
+    def _snapshot_value(self) -> Any:
+        """Return the value pushed to the device snapshot."""
+        return self._attr_native_value
 
     async def async_added_to_hass(self) -> None:
         """Subscribe to mqtt."""
         # _LOGGER.debug("async_added_to_hass")
         self._attr_available = False
+        self._register_snapshot_entity()
         await self._subscribe_topic()
 
     async def async_will_remove_from_hass(self) -> None:
         """Remove entity from hass."""
         _LOGGER.debug("called async_will_remove_from_hass fir %s", self.entity_id)
         await super().async_will_remove_from_hass()
-        # Clean up expire triggers
-        if self._expiration_trigger:
-            self._expiration_trigger()
-            self._expiration_trigger = None
-            self._attr_available = True
 
 
-SENSORS: tuple[PrismSensorEntityDescription, ...] = (
-    PrismSensorEntityDescription(
-        key="current_state_{}",
-        topic="{}/state",
-        device_class=SensorDeviceClass.ENUM,
-        options=["idle", "waiting", "charging", "pause"],
-        has_entity_name=True,
-        translation_key="current_state",
-    ),
-    PrismSensorEntityDescription(
-        key="power_grid_voltage_{}",
-        topic="{}/volt",
-        device_class=SensorDeviceClass.VOLTAGE,
-        state_class=SensorStateClass.MEASUREMENT,
-        native_unit_of_measurement=UnitOfElectricPotential.VOLT,
-        suggested_display_precision=0,
+SENSORS = compile_descriptions(
+    SENSOR_DOMAIN,
+    PrismSensorEntityDescription,
+    GROUP_PORT,
+    device_class=SensorDeviceClass,
+    state_class=SensorStateClass,
+)
+BASE_SENSORS = compile_descriptions(
+    SENSOR_DOMAIN,
+    PrismSensorEntityDescription,
+    GROUP_BASE,
+    device_class=SensorDeviceClass,
+    state_class=SensorStateClass,
+)
+POWERWALL_SENSORS = compile_descriptions(
+    SENSOR_DOMAIN,
+    PrismSensorEntityDescription,
+    GROUP_POWERWALL,
+    device_class=SensorDeviceClass,
+    state_class=SensorStateClass,
+)
+
+VSENSORS: list[SensorEntityDescription] = [
+    SensorEntityDescription(
+        key="input_grid_energy",
+        device_class=SensorDeviceClass.ENERGY,
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
         has_entity_name=True,
-        translation_key="power_grid_voltage",
-    ),
-    PrismSensorEntityDescription(
-        key="output_power_{}",
-        topic="{}/w",
+        translation_key="input_grid_energy",
+    )
+]
+
+COST_SOURCE = "session_output_energy"
+COST_STATS = ("session", "total")
+
+POWER_FLOW_SENSORS = (
+    SensorEntityDescription(
+        key="export_power",
         device_class=SensorDeviceClass.POWER,
         state_class=SensorStateClass.MEASUREMENT,
         native_unit_of_measurement=UnitOfPower.WATT,
         suggested_display_precision=0,
         has_entity_name=True,
-        translation_key="output_power",
-    ),
-    PrismSensorEntityDescription(
-        key="output_current_{}",
-        topic="{}/amp",
-        device_class=SensorDeviceClass.CURRENT,
-        state_class=SensorStateClass.MEASUREMENT,
-        native_unit_of_measurement=UnitOfElectricCurrent.MILLIAMPERE,
-        suggested_display_precision=0,
-        has_entity_name=True,
-        translation_key="output_current",
-    ),
-    PrismSensorEntityDescription(
-        key="output_car_current_{}",
-        topic="{}/pilot",
-        device_class=SensorDeviceClass.CURRENT,
-        state_class=SensorStateClass.MEASUREMENT,
-        native_unit_of_measurement=UnitOfElectricCurrent.AMPERE,
-        suggested_display_precision=0,
-        has_entity_name=True,
-        translation_key="output_car_current",
-    ),
-    PrismSensorEntityDescription(
-        key="current_set_by_user_{}",
-        topic="{}/user_amp",
-        device_class=SensorDeviceClass.CURRENT,
-        state_class=SensorStateClass.MEASUREMENT,
-        native_unit_of_measurement=UnitOfElectricCurrent.AMPERE,
-        suggested_display_precision=0,
-        has_entity_name=True,
-        translation_key="current_set_by_user",
-    ),
-    PrismSensorEntityDescription(
-        key="session_time_{}",
-        topic="{}/session_time",
-        device_class=SensorDeviceClass.DURATION,
-        state_class=SensorStateClass.MEASUREMENT,
-        native_unit_of_measurement=UnitOfTime.SECONDS,
-        suggested_display_precision=0,
-        has_entity_name=True,
-        translation_key="session_time",
+        translation_key="export_power",
     ),
-    PrismSensorEntityDescription(
-        key="session_output_energy_{}",
-        topic="{}/wh",
-        device_class=SensorDeviceClass.ENERGY,
-        state_class=SensorStateClass.TOTAL,
-        native_unit_of_measurement=UnitOfEnergy.WATT_HOUR,
-        suggested_display_precision=0,
-        has_entity_name=True,
-        translation_key="session_output_energy",
-    ),
-    PrismSensorEntityDescription(
-        key="total_output_energy_{}",
-        topic="{}/wh_total",
-        device_class=SensorDeviceClass.ENERGY,
-        state_class=SensorStateClass.TOTAL_INCREASING,
-        native_unit_of_measurement=UnitOfEnergy.WATT_HOUR,
-        suggested_display_precision=0,
-        has_entity_name=True,
-        translation_key="total_output_energy",
-    ),
-    PrismSensorEntityDescription(
-        key="current_port_mode_{}",
-        topic="{}/mode",
-        device_class=SensorDeviceClass.ENUM,
-        options=[
-            "solar",
-            "normal",
-            "paused",
-            "hybrid",
-            "suspended",
-            "unknown",
-            "unknown",
-            "autolimit",
-        ],
-        has_entity_name=True,
-        translation_key="current_port_mode",
-    ),
-)
-
-BASE_SENSORS: tuple[PrismSensorEntityDescription, ...] = (
-    PrismSensorEntityDescription(
-        key="input_grid_power",
-        topic="energy_data/power_grid",
+    SensorEntityDescription(
+        key="house_power_without_ev",
         device_class=SensorDeviceClass.POWER,
         state_class=SensorStateClass.MEASUREMENT,
         native_unit_of_measurement=UnitOfPower.WATT,
         suggested_display_precision=0,
         has_entity_name=True,
-        translation_key="input_grid_power",
+        translation_key="house_power_without_ev",
     ),
-    PrismSensorEntityDescription(
-        key="core_temperature",
-        topic="0/info/temperature/core",
-        expire_after=86400,
-        device_class=SensorDeviceClass.TEMPERATURE,
+    SensorEntityDescription(
+        key="self_consumption",
         state_class=SensorStateClass.MEASUREMENT,
-        native_unit_of_measurement=UnitOfTemperature.CELSIUS,
+        native_unit_of_measurement=PERCENTAGE,
         suggested_display_precision=0,
         has_entity_name=True,
-        translation_key="core_temperature",
+        translation_key="self_consumption",
     ),
 )
 
-POWERWALL_SENSORS: tuple[PrismSensorEntityDescription, ...] = (
-    PrismSensorEntityDescription(
-        key="powerwall_solar",
-        topic="energy_data/power_solar",
+SITE_DEVICE = DeviceInfo(
+    identifiers={(DOMAIN, "PrismSite")},
+    name="Prism Site",
+    manufacturer="Silla",
+    model="Site",
+)
+
+# Keyed by the aggregated telemetry key, see site.AGGREGATE_KEYS
+SITE_SENSORS = (
+    SensorEntityDescription(
+        key="output_power",
         device_class=SensorDeviceClass.POWER,
         state_class=SensorStateClass.MEASUREMENT,
         native_unit_of_measurement=UnitOfPower.WATT,
         suggested_display_precision=0,
         has_entity_name=True,
-        translation_key="powerwall_solar",
+        translation_key="site_output_power",
     ),
-    PrismSensorEntityDescription(
-        key="powerwall_house",
-        topic="energy_data/power_house",
-        device_class=SensorDeviceClass.POWER,
+    SensorEntityDescription(
+        key="output_current",
+        device_class=SensorDeviceClass.CURRENT,
         state_class=SensorStateClass.MEASUREMENT,
-        native_unit_of_measurement=UnitOfPower.WATT,
-        suggested_display_precision=0,
+        native_unit_of_measurement=UnitOfElectricCurrent.MILLIAMPERE,
+        suggested_unit_of_measurement=UnitOfElectricCurrent.AMPERE,
+        suggested_display_precision=1,
         has_entity_name=True,
-        translation_key="powerwall_house",
+        translation_key="site_output_current",
     ),
-)
-
-VSENSORS: list[SensorEntityDescription] = [
     SensorEntityDescription(
-        key="input_grid_energy",
+        key="session_output_energy",
         device_class=SensorDeviceClass.ENERGY,
-        state_class=SensorStateClass.TOTAL_INCREASING,
-        native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+        native_unit_of_measurement=UnitOfEnergy.WATT_HOUR,
+        suggested_display_precision=0,
         has_entity_name=True,
-        translation_key="input_grid_energy",
-    )
-]
+        translation_key="site_session_output_energy",
+    ),
+)
+
+ROLLING_SOURCES = ("input_grid_power", "output_power", "output_current")
+ROLLING_STATS = ("mean", "min", "max")
+# Window duration in seconds, name and buffer capacity (up to 4 samples/s)
+ROLLING_WINDOWS = ((60, "1m", 256), (900, "15m", 4096))
+ROLLING_PRUNE_INTERVAL = timedelta(seconds=10)
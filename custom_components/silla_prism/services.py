@@ -0,0 +1,364 @@
+"""Services of the Silla Prism integration."""
+
+import asyncio
+import cProfile
+from datetime import date, datetime, time as dt_time
+import json
+from pathlib import Path
+import pstats
+import time
+from typing import Any
+
+import voluptuous as vol
+
+from homeassistant.components import mqtt, persistent_notification
+from homeassistant.components.recorder import get_instance
+from homeassistant.config_entries import SOURCE_IMPORT
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+    callback,
+)
+from homeassistant.data_entry_flow import FlowResultType
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import config_validation as cv
+from homeassistant.util import dt as dt_util
+
+from .config_flow import SILLA_PRISM_SCHEMA, async_probe_devices
+from .const import CONF_TOPIC, DOMAIN
+
+SERVICE_PROFILE = "profile"
+ATTR_SECONDS = "seconds"
+DEFAULT_SECONDS = 60
+PROFILE_TOP = 15
+PROFILE_NOTIFICATION_ID = f"{DOMAIN}_profile"
+
+SERVICE_ANALYZE = "analyze"
+ATTR_SOURCE = "source"
+ATTR_START = "start"
+ATTR_END = "end"
+SOURCES = ("statistics", "states")
+ANALYSIS_NOTIFICATION_ID = f"{DOMAIN}_analysis"
+
+SERVICE_EXPORT = "export"
+ATTR_KIND = "kind"
+ATTR_FORMAT = "format"
+ATTR_INTERVAL = "interval"
+KINDS = ("sessions", "telemetry")
+FORMATS = ("csv", "parquet")
+DEFAULT_INTERVAL = 15
+EXPORT_NOTIFICATION_ID = f"{DOMAIN}_export"
+
+SERVICE_IMPORT_CHARGERS = "import_chargers"
+ATTR_CHARGERS = "chargers"
+IMPORT_NOTIFICATION_ID = f"{DOMAIN}_import"
+
+PROFILE_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_SECONDS, default=DEFAULT_SECONDS): vol.All(
+            vol.Coerce(float), vol.Range(min=1, max=3600)
+        ),
+    }
+)
+
+ANALYZE_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_SOURCE, default=SOURCES[0]): vol.In(SOURCES),
+        vol.Optional(ATTR_START): cv.date,
+        vol.Optional(ATTR_END): cv.date,
+    }
+)
+
+EXPORT_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_KIND, default=KINDS[0]): vol.In(KINDS),
+        vol.Optional(ATTR_FORMAT, default=FORMATS[0]): vol.In(FORMATS),
+        vol.Optional(ATTR_SOURCE, default=SOURCES[0]): vol.In(SOURCES),
+        vol.Optional(ATTR_INTERVAL, default=DEFAULT_INTERVAL): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=1440)
+        ),
+        vol.Optional(ATTR_START): cv.date,
+        vol.Optional(ATTR_END): cv.date,
+    }
+)
+
+IMPORT_CHARGERS_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_CHARGERS): vol.All(
+            cv.ensure_list,
+            [SILLA_PRISM_SCHEMA.extend({vol.Required(CONF_TOPIC): cv.string})],
+        ),
+    }
+)
+
+_PACKAGE_PATH = str(Path(__file__).parent)
+
+
+@callback
+def async_setup(hass: HomeAssistant) -> None:
+    """Register the Prism services."""
+    lock = asyncio.Lock()
+
+    async def _async_profile(call: ServiceCall) -> None:
+        """Profile the event loop and summarize the Prism functions."""
+        if lock.locked():
+            raise HomeAssistantError("A Prism profile is already running")
+        async with lock:
+            await _async_run_profile(hass, call.data[ATTR_SECONDS])
+
+    async def _async_analyze(call: ServiceCall) -> ServiceResponse:
+        """Summarize the recorded Prism telemetry per port and per month."""
+        return await _async_run_analysis(
+            hass,
+            call.data[ATTR_SOURCE],
+            call.data.get(ATTR_START),
+            call.data.get(ATTR_END),
+        )
+
+    async def _async_export(call: ServiceCall) -> ServiceResponse:
+        """Export the recorded Prism sessions or telemetry to a file."""
+        return await _async_run_export(hass, call.data)
+
+    async def _async_import_chargers(call: ServiceCall) -> ServiceResponse:
+        """Probe a list of chargers together and create their entries."""
+        return await _async_run_import(hass, call.data[ATTR_CHARGERS])
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_PROFILE, _async_profile, schema=PROFILE_SCHEMA
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_ANALYZE,
+        _async_analyze,
+        schema=ANALYZE_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_EXPORT,
+        _async_export,
+        schema=EXPORT_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_IMPORT_CHARGERS,
+        _async_import_chargers,
+        schema=IMPORT_CHARGERS_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+
+
+async def _async_run_profile(hass: HomeAssistant, seconds: float) -> None:
+    """Run the profiler on the event loop thread for the given seconds.
+
+    The profiler exists only while the service runs, so the message handlers
+    and the timers have no overhead at any other time.
+    """
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError as err:
+        raise HomeAssistantError(f"Unable to start the profiler: {err}") from err
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        profiler.disable()
+
+    path = hass.config.path(f"{DOMAIN}_profile.{int(time.time())}.cprof")
+    summary = await hass.async_add_executor_job(_dump_profile, profiler, path)
+    persistent_notification.async_create(
+        hass,
+        f"Profile of {seconds:g} seconds written to `{path}`.\n\n{summary}",
+        title="Silla Prism profile",
+        notification_id=PROFILE_NOTIFICATION_ID,
+    )
+
+
+def _dump_profile(profiler: cProfile.Profile, path: str) -> str:
+    """Write the stats file and return the top Prism functions as markdown."""
+    profiler.dump_stats(path)
+    stats = pstats.Stats(profiler).stats  # type: ignore[attr-defined]
+    functions = sorted(
+        (
+            (cumulative, own, calls, filename, line, name)
+            for (filename, line, name), (_, calls, own, cumulative, _) in stats.items()
+            if filename.startswith(_PACKAGE_PATH)
+        ),
+        reverse=True,
+    )[:PROFILE_TOP]
+    if not functions:
+        return "No Prism function was called."
+    lines = ["| Function | Calls | Own ms | Total ms |", "| --- | --- | --- | --- |"]
+    lines.extend(
+        f"| {name} ({Path(filename).name}:{line}) | {calls} "
+        f"| {own * 1000:.1f} | {cumulative * 1000:.1f} |"
+        for cumulative, own, calls, filename, line, name in functions
+    )
+    return "\n".join(lines)
+
+
+def _timestamp(day: date | None, default: float) -> float:
+    """Return the timestamp of the local midnight of a day."""
+    if day is None:
+        return default
+    return dt_util.as_timestamp(
+        datetime.combine(day, dt_time(), tzinfo=dt_util.get_default_time_zone())
+    )
+
+
+def _recorder_database(hass: HomeAssistant) -> Path:
+    """Return the path of the SQLite recorder database."""
+    if "recorder" not in hass.config.components:
+        raise HomeAssistantError("The recorder is not loaded")
+    url = get_instance(hass).db_url
+    if not url.startswith("sqlite:///"):
+        raise HomeAssistantError("Only the SQLite recorder database is supported")
+    return Path(url.removeprefix("sqlite:///"))
+
+
+async def _async_run_analysis(
+    hass: HomeAssistant, source: str, start: date | None, end: date | None
+) -> dict[str, Any]:
+    """Run the analysis of the recorder database in the executor."""
+    database = _recorder_database(hass)
+    path = hass.config.path(f"{DOMAIN}_analysis.{int(time.time())}.json")
+    try:
+        report = await hass.async_add_executor_job(
+            _write_analysis,
+            Path(hass.config.config_dir),
+            database,
+            source,
+            _timestamp(start, 0),
+            _timestamp(end, float("inf")),
+            path,
+        )
+    except ImportError as err:
+        raise HomeAssistantError(f"The analysis needs NumPy: {err}") from err
+    persistent_notification.async_create(
+        hass,
+        f"Analysis of {len(report['months'])} months written to `{path}`.",
+        title="Silla Prism analysis",
+        notification_id=ANALYSIS_NOTIFICATION_ID,
+    )
+    return report
+
+
+def _write_analysis(
+    config_dir: Path,
+    database: Path,
+    source: str,
+    start: float,
+    end: float,
+    path: str,
+) -> dict[str, Any]:
+    """Analyze the recorder database and write the JSON report."""
+    # NumPy is only imported when an analysis is requested
+    from . import analysis  # pylint: disable=import-outside-toplevel
+
+    report = analysis.analyze(config_dir, source, start, end, database)
+    Path(path).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    return report
+
+
+async def _async_run_export(
+    hass: HomeAssistant, data: dict[str, Any]
+) -> dict[str, Any]:
+    """Write the export of the recorder database in the executor."""
+    database = _recorder_database(hass)
+    kind, file_format = data[ATTR_KIND], data[ATTR_FORMAT]
+    path = Path(
+        hass.config.path(f"{DOMAIN}_{kind}.{int(time.time())}.{file_format}")
+    )
+    try:
+        rows = await hass.async_add_executor_job(
+            _write_export,
+            Path(hass.config.config_dir),
+            database,
+            path,
+            kind,
+            file_format,
+            data[ATTR_SOURCE],
+            _timestamp(data.get(ATTR_START), 0),
+            _timestamp(data.get(ATTR_END), float("inf")),
+            data[ATTR_INTERVAL] * 60,
+        )
+    except ImportError as err:
+        raise HomeAssistantError(f"The Parquet export needs pyarrow: {err}") from err
+    persistent_notification.async_create(
+        hass,
+        f"Export of {rows} {kind} rows written to `{path}`.",
+        title="Silla Prism export",
+        notification_id=EXPORT_NOTIFICATION_ID,
+    )
+    return {"path": str(path), "rows": rows}
+
+
+def _write_export(
+    config_dir: Path,
+    database: Path,
+    path: Path,
+    kind: str,
+    file_format: str,
+    source: str,
+    start: float,
+    end: float,
+    interval: float,
+) -> int:
+    """Write the export and return the number of rows."""
+    # pylint: disable-next=import-outside-toplevel
+    from .export import export
+
+    return export(
+        config_dir, path, kind, file_format, source, start, end, interval, database
+    )
+
+
+async def _async_run_import(
+    hass: HomeAssistant, chargers: list[dict[str, Any]]
+) -> dict[str, Any]:
+    """Probe the new chargers with one subscription and create their entries.
+
+    The chargers already configured, or listed twice, are skipped. The entries
+    of the chargers that answered are created together, the others are
+    reported as unreachable.
+    """
+    if not await mqtt.async_wait_for_mqtt_client(hass):
+        raise HomeAssistantError("MQTT integration is not available")
+    configured = {
+        entry.data[CONF_TOPIC] for entry in hass.config_entries.async_entries(DOMAIN)
+    }
+    new: dict[str, dict[str, Any]] = {}
+    skipped = []
+    for charger in chargers:
+        if charger[CONF_TOPIC] in configured or charger[CONF_TOPIC] in new:
+            skipped.append(charger[CONF_TOPIC])
+        else:
+            new[charger[CONF_TOPIC]] = charger
+    errors = await async_probe_devices(hass, new)
+    reachable = [charger for topic, charger in new.items() if errors[topic] is None]
+    results = await asyncio.gather(
+        *(
+            hass.config_entries.flow.async_init(
+                DOMAIN, context={"source": SOURCE_IMPORT}, data=charger
+            )
+            for charger in reachable
+        )
+    )
+    created = [
+        charger[CONF_TOPIC]
+        for charger, result in zip(reachable, results, strict=True)
+        if result["type"] == FlowResultType.CREATE_ENTRY
+    ]
+    unreachable = [topic for topic, error in errors.items() if error is not None]
+    persistent_notification.async_create(
+        hass,
+        f"{len(created)} chargers added, {len(skipped)} already configured, "
+        f"{len(unreachable)} unreachable"
+        + "".join(f"\n- `{topic}` unreachable" for topic in unreachable),
+        title="Silla Prism import",
+        notification_id=IMPORT_NOTIFICATION_ID,
+    )
+    return {"created": created, "skipped": skipped, "unreachable": unreachable}
@@ -0,0 +1,95 @@
+"""Site wide aggregates of the ports of all the Prism config entries."""
+
+from collections.abc import Callable
+import math
+
+from homeassistant.core import CALLBACK_TYPE, callback
+
+from .dispatcher import PrismDispatcher
+from .telemetry import PrismSample
+
+AGGREGATE_KEYS = ("output_power", "output_current", "session_output_energy")
+# Updates between two exact recomputations of the running sums
+RESUM_INTERVAL = 10000
+
+SiteListener = Callable[[str], None]
+
+
+class SiteAggregator:
+    """Running sums of the port values of all the config entries.
+
+    Every sample replaces the previous value of its port in the sums, so the
+    cost of a sample does not depend on the number of ports and chargers. The
+    sums are recomputed exactly from time to time, so the rounding errors do
+    not accumulate.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the aggregator."""
+        self._values: dict[str, dict[tuple[str, int], float]] = {
+            key: {} for key in AGGREGATE_KEYS
+        }
+        self.totals: dict[str, float] = dict.fromkeys(AGGREGATE_KEYS, 0.0)
+        self._listeners: list[SiteListener] = []
+        self._updates = 0
+
+    @callback
+    def async_add_entry(
+        self, entry_id: str, dispatcher: PrismDispatcher
+    ) -> CALLBACK_TYPE:
+        """Add the ports of a config entry, returns the remove callback."""
+
+        @callback
+        def _sample_received(sample: PrismSample) -> None:
+            if (values := self._values.get(sample.key)) is None or sample.port == 0:
+                return
+            port = (entry_id, sample.port)
+            old = values.pop(port, 0.0)
+            new = 0.0
+            if isinstance(sample.value, float):
+                new = values[port] = sample.value
+            if new == old:
+                return
+            self.totals[sample.key] += new - old
+            self._updates += 1
+            if self._updates >= RESUM_INTERVAL:
+                self._async_resum()
+            self._async_notify(sample.key)
+
+        unsubscribe = dispatcher.async_subscribe_telemetry(_sample_received)
+
+        @callback
+        def _remove() -> None:
+            unsubscribe()
+            for values in self._values.values():
+                for port in [port for port in values if port[0] == entry_id]:
+                    del values[port]
+            self._async_resum()
+            for key in AGGREGATE_KEYS:
+                self._async_notify(key)
+
+        return _remove
+
+    @callback
+    def async_add_listener(self, listener: SiteListener) -> CALLBACK_TYPE:
+        """Listen to the changed sums, returns the remove callback."""
+        self._listeners.append(listener)
+
+        @callback
+        def _remove() -> None:
+            self._listeners.remove(listener)
+
+        return _remove
+
+    @callback
+    def _async_resum(self) -> None:
+        """Recompute the sums exactly."""
+        self._updates = 0
+        for key, values in self._values.items():
+            self.totals[key] = math.fsum(values.values())
+
+    @callback
+    def _async_notify(self, key: str) -> None:
+        """Notify the listeners of a changed sum."""
+        for listener in self._listeners:
+            listener(key)
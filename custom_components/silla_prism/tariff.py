@@ -0,0 +1,107 @@
+"""Time of use tariffs and charging cost accumulators."""
+
+from dataclasses import dataclass
+import re
+
+from homeassistant.util import dt as dt_util
+
+DAY_MINUTES = 24 * 60
+WEEK_MINUTES = 7 * DAY_MINUTES
+DAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+_BAND = re.compile(
+    r"^(?:(?P<days>[a-z,\-]+)\s+)?(?P<hour>\d{1,2}):(?P<minute>\d{2})\s+"
+    r"(?P<price>\d+(?:\.\d+)?)$"
+)
+
+
+def parse_days(text: str | None) -> list[int]:
+    """Parse a list of days and day ranges, e.g. mon-fri,sun."""
+    if text is None:
+        return list(range(len(DAYS)))
+    days = []
+    for part in text.split(","):
+        first, _, last = part.partition("-")
+        if first not in DAYS or (last and last not in DAYS):
+            raise ValueError(f"Invalid days: {part}")
+        start, end = DAYS.index(first), DAYS.index(last or first)
+        if end < start:
+            end += len(DAYS)
+        days.extend(day % len(DAYS) for day in range(start, end + 1))
+    return days
+
+
+class TariffSchedule:
+    """Weekly time of use tariff with a price per kWh for every minute.
+
+    The schedule is a list of bands separated by semicolons or new lines,
+    e.g. "00:00 0.20; mon-fri 08:00 0.30; mon-fri 19:00 0.20". A band starts
+    at its local time, on every day or on the listed days, and lasts until the
+    next band. The bands are compiled once into an index of the minutes of the
+    week, so the price of a sample is a single lookup.
+    """
+
+    __slots__ = ("_prices",)
+
+    def __init__(self, text: str) -> None:
+        """Compile the schedule, raises ValueError when it is invalid."""
+        starts: dict[int, float] = {}
+        bands = [band.strip().lower() for band in re.split(r"[;\n]", text)]
+        # The bands of given days override the bands of every day
+        for band in sorted(filter(None, bands), key=lambda band: band[0].isalpha()):
+            if (match := _BAND.match(band)) is None:
+                raise ValueError(f"Invalid tariff band: {band}")
+            hour, minute = int(match["hour"]), int(match["minute"])
+            if hour > 23 or minute > 59:
+                raise ValueError(f"Invalid time: {band}")
+            for day in parse_days(match["days"]):
+                starts[day * DAY_MINUTES + hour * 60 + minute] = float(match["price"])
+        if not starts:
+            raise ValueError("The tariff has no bands")
+        # Before the first band of the week the last one still applies
+        price = starts[max(starts)]
+        self._prices: list[float] = []
+        for minute in range(WEEK_MINUTES):
+            price = starts.get(minute, price)
+            self._prices.append(price)
+
+    def price_at(self, timestamp: float) -> float:
+        """Return the price at a timestamp, in the local time zone."""
+        local = dt_util.as_local(dt_util.utc_from_timestamp(timestamp))
+        return self._prices[
+            local.weekday() * DAY_MINUTES + local.hour * 60 + local.minute
+        ]
+
+
+def parse_tariffs(text: str) -> TariffSchedule | None:
+    """Return the schedule of the tariff option, None when it is empty."""
+    return TariffSchedule(text) if text.strip() else None
+
+
+@dataclass(slots=True)
+class ChargingCost:
+    """Cost of the energy delivered by a port, fed with the session energy.
+
+    Every increase of the session energy is priced with the tariff of the
+    time it was reported, the session cost restarts when the session energy
+    counter is reset by a new session.
+    """
+
+    energy: float | None = None
+    session: float = 0.0
+    total: float = 0.0
+
+    def add(self, energy: float, price: float) -> None:
+        """Add the increase of the session energy (Wh) at the given price."""
+        if self.energy is None:
+            self.energy = energy
+            return
+        if energy < self.energy:
+            self.session = 0.0
+            delta = energy
+        else:
+            delta = energy - self.energy
+        cost = delta / 1000 * price
+        self.session += cost
+        self.total += cost
+        self.energy = energy
@@ -0,0 +1,63 @@
+"""Full rate telemetry bus of the Prism config entries.
+
+Every decoded sample of the Prism sensor topics is sent on a per-entry
+dispatcher signal, independently of the entity states. In-integration
+consumers (integrators, controllers) and other custom components can
+subscribe to it with async_subscribe_telemetry. The real changes of the
+state and mode of the ports are also sent on a transition signal.
+"""
+
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.util.signal_type import SignalTypeFormat
+
+from .const import DOMAIN
+
+
+@dataclass(slots=True, frozen=True)
+class PrismSample:
+    """A decoded sample of a Prism topic."""
+
+    port: int
+    key: str
+    value: float | str | None
+    timestamp: float
+
+
+@dataclass(slots=True, frozen=True)
+class PrismTransition:
+    """A change of the value of a Prism enum topic."""
+
+    port: int
+    key: str
+    previous: str
+    current: str
+    dwell_time: float
+    timestamp: float
+
+
+SIGNAL_TELEMETRY: SignalTypeFormat[PrismSample] = SignalTypeFormat(
+    f"{DOMAIN}_telemetry_{{}}"
+)
+SIGNAL_TRANSITION: SignalTypeFormat[PrismTransition] = SignalTypeFormat(
+    f"{DOMAIN}_transition_{{}}"
+)
+
+
+@callback
+def async_subscribe_telemetry(
+    hass: HomeAssistant, entry_id: str, target: Callable[[PrismSample], None]
+) -> CALLBACK_TYPE:
+    """Subscribe to the telemetry samples of a config entry."""
+    return async_dispatcher_connect(hass, SIGNAL_TELEMETRY.format(entry_id), target)
+
+
+@callback
+def async_subscribe_transitions(
+    hass: HomeAssistant, entry_id: str, target: Callable[[PrismTransition], None]
+) -> CALLBACK_TYPE:
+    """Subscribe to the state and mode transitions of a config entry."""
+    return async_dispatcher_connect(hass, SIGNAL_TRANSITION.format(entry_id), target)
@@ -0,0 +1,47 @@
+"""Always-on MQTT trace of a Prism config entry."""
+
+from collections import deque
+from datetime import UTC, datetime
+import time
+from typing import Any
+
+TRACE_SIZE = 1024
+DIRECTION_IN = "in"
+DIRECTION_OUT = "out"
+
+
+class PrismTrace:
+    """Ring buffer with the last received messages and published commands.
+
+    Recording a message costs a single append to a bounded deque, so the trace
+    can stay enabled without the overhead of the debug logging.
+    """
+
+    __slots__ = ("_messages",)
+
+    def __init__(self, size: int = TRACE_SIZE) -> None:
+        """Initialize the trace."""
+        self._messages: deque[tuple[float, str, str, Any]] = deque(maxlen=size)
+
+    def record(self, direction: str, topic: str, payload: Any) -> None:
+        """Record a message."""
+        self._messages.append((time.time(), direction, topic, payload))
+
+    def as_list(self) -> list[dict[str, Any]]:
+        """Return the recorded messages, oldest first."""
+        return [
+            {
+                "time": datetime.fromtimestamp(timestamp, UTC).isoformat(),
+                "direction": direction,
+                "topic": topic,
+                "payload": _format_payload(payload),
+            }
+            for timestamp, direction, topic, payload in self._messages
+        ]
+
+
+def _format_payload(payload: Any) -> str:
+    """Return a printable payload, binary payloads are hex encoded."""
+    if isinstance(payload, (bytes, bytearray)):
+        return payload.hex()
+    return str(payload)
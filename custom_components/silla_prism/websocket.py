@@ -0,0 +1,156 @@
+"""Websocket push API for Prism device snapshots."""
+
+import logging
+from typing import Any
+
+import voluptuous as vol
+
+from homeassistant.components import websocket_api
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.dispatcher import (
+    async_dispatcher_connect,
+    async_dispatcher_send,
+)
+from homeassistant.util.signal_type import SignalType
+
+from .const import DOMAIN
+from .domain_data import DomainData
+from .entry_data import RuntimeEntryData
+
+_LOGGER = logging.getLogger(__name__)
+
+# Sent when a config entry is set up or unloaded
+SIGNAL_ENTRIES_CHANGED: SignalType[()] = SignalType(f"{DOMAIN}_entries_changed")
+
+
+@callback
+def async_setup(hass: HomeAssistant) -> None:
+    """Register the Prism websocket commands."""
+    websocket_api.async_register_command(hass, websocket_subscribe)
+    websocket_api.async_register_command(hass, websocket_session_curves)
+
+
+@callback
+def async_entries_changed(hass: HomeAssistant) -> None:
+    """Move the subscriptions to the config entries now loaded."""
+    async_dispatcher_send(hass, SIGNAL_ENTRIES_CHANGED)
+
+
+def _entry_snapshot(entry_data: RuntimeEntryData) -> dict[str, Any]:
+    """Return the full snapshot of one config entry."""
+    return {
+        "serial": entry_data.serial,
+        "ports": entry_data.ports,
+        "values": entry_data.snapshot,
+        "entities": entry_data.entity_ids,
+    }
+
+
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): "silla_prism/subscribe",
+        vol.Optional("entry_id"): str,
+    }
+)
+@callback
+def websocket_subscribe(
+    hass: HomeAssistant,
+    connection: websocket_api.ActiveConnection,
+    msg: dict[str, Any],
+) -> None:
+    """Push a compact snapshot of the Prism devices followed by diffs on change.
+
+    When a config entry is set up, reloaded or unloaded the subscription moves
+    to the loaded entries and a new snapshot is pushed.
+    """
+    if "entry_id" in msg and msg["entry_id"] not in (
+        DomainData.get(hass).get_entry_datas()
+    ):
+        connection.send_error(
+            msg["id"], websocket_api.ERR_NOT_FOUND, "Config entry not found"
+        )
+        return
+
+    msg_id = msg["id"]
+    unsubs: list[CALLBACK_TYPE] = []
+
+    @callback
+    def _attach() -> None:
+        for unsub in unsubs:
+            unsub()
+        unsubs.clear()
+        entry_datas = {
+            entry_id: entry_data
+            for entry_id, entry_data in DomainData.get(hass).get_entry_datas().items()
+            if msg.get("entry_id", entry_id) == entry_id
+        }
+        for entry_id, entry_data in entry_datas.items():
+
+            @callback
+            def _forward(
+                changes: dict[int, dict[str, Any]], entry_id: str = entry_id
+            ) -> None:
+                connection.send_message(
+                    websocket_api.event_message(
+                        msg_id, {"entry_id": entry_id, "changes": changes}
+                    )
+                )
+
+            unsubs.append(entry_data.async_subscribe_snapshot(_forward))
+
+        connection.send_message(
+            websocket_api.event_message(
+                msg_id,
+                {
+                    "snapshot": {
+                        entry_id: _entry_snapshot(entry_data)
+                        for entry_id, entry_data in entry_datas.items()
+                    }
+                },
+            )
+        )
+
+    unsubscribe_entries = async_dispatcher_connect(
+        hass, SIGNAL_ENTRIES_CHANGED, _attach
+    )
+
+    @callback
+    def _unsubscribe() -> None:
+        unsubscribe_entries()
+        for unsub in unsubs:
+            unsub()
+
+    connection.subscriptions[msg_id] = _unsubscribe
+    connection.send_result(msg_id)
+    _attach()
+
+
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): "silla_prism/session_curves",
+        vol.Required("entry_id"): str,
+        vol.Optional("port"): vol.All(int, vol.Range(min=1)),
+    }
+)
+@callback
+def websocket_session_curves(
+    hass: HomeAssistant,
+    connection: websocket_api.ActiveConnection,
+    msg: dict[str, Any],
+) -> None:
+    """Return the power and current curves of the recent charging sessions."""
+    entry_data = DomainData.get(hass).get_entry_datas().get(msg["entry_id"])
+    if entry_data is None or entry_data.curves is None:
+        connection.send_error(
+            msg["id"], websocket_api.ERR_NOT_FOUND, "Config entry not found"
+        )
+        return
+    connection.send_result(
+        msg["id"],
+        {
+            "sessions": [
+                session.as_dict(decoded=True)
+                for session in entry_data.curves.async_get_sessions(msg.get("port"))
+            ]
+        },
+    )
@@ -0,0 +1,51 @@
+"""Common helpers of the Prism tests."""
+
+from collections.abc import Callable
+import time
+from types import SimpleNamespace
+from typing import Any
+
+from custom_components.silla_prism.telemetry import PrismSample
+
+
+class FakeDispatcher:
+    """The part of the dispatcher used by the controllers."""
+
+    def __init__(self) -> None:
+        """Initialize the dispatcher."""
+        self.handlers: dict[str, Callable[[Any], None]] = {}
+        self.listeners: list[Callable[[PrismSample], None]] = []
+        self.published: list[tuple[str, Any]] = []
+        self.last_receipt = 0.0
+
+    def async_subscribe_telemetry(
+        self, listener: Callable[[PrismSample], None]
+    ) -> Callable[[], None]:
+        """Subscribe to the telemetry bus."""
+        self.listeners.append(listener)
+        return lambda: self.listeners.remove(listener)
+
+    async def async_subscribe(
+        self, topic: str, handler: Callable[[Any], None], raw: bool = False
+    ) -> Callable[[], None]:
+        """Subscribe to a topic of the device."""
+        self.handlers[topic] = handler
+        return lambda: self.handlers.pop(topic)
+
+    async def async_publish(
+        self, topic: str, payload: Any, sent: Callable[[], None] | None = None
+    ) -> None:
+        """Publish a command of the device."""
+        self.published.append((topic, payload))
+        if sent is not None:
+            sent()
+
+    def send_sample(self, port: int, key: str, value: Any) -> None:
+        """Send a sample on the telemetry bus."""
+        for listener in list(self.listeners):
+            listener(PrismSample(port, key, value, time.monotonic()))
+
+    def receive(self, topic: str, payload: str) -> None:
+        """Deliver a message of the device."""
+        self.last_receipt = time.perf_counter()
+        self.handlers[topic](SimpleNamespace(topic=topic, payload=payload))
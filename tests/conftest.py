@@ -0,0 +1,24 @@
+"""Fixtures of the Silla Prism tests.
+
+The Home Assistant tests need pytest-homeassistant-custom-component (see
+requirements.txt), only the tests of the headless client are collected when
+it is not installed: they need the standard library only.
+"""
+
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+if importlib.util.find_spec("pytest_homeassistant_custom_component") is None:
+    collect_ignore = [
+        path.name
+        for path in Path(__file__).parent.glob("test_*.py")
+        if path.name != "test_client.py"
+    ]
+else:
+
+    @pytest.fixture(autouse=True)
+    def auto_enable_custom_integrations(enable_custom_integrations):
+        """Enable the custom integrations in every test."""
+        return
@@ -0,0 +1,65 @@
+"""Tests of the publish cadence learned from a Prism topic."""
+
+import pytest
+
+from custom_components.silla_prism.cadence import (
+    JITTER_FACTOR,
+    MIN_SAMPLES,
+    TopicCadence,
+)
+
+
+def _learn(cadence: TopicCadence, intervals: list[float], start: float = 0) -> float:
+    """Receive a message after each interval, returns the last arrival."""
+    now = start
+    cadence.update(now)
+    for interval in intervals:
+        now += interval
+        cadence.update(now)
+    return now
+
+
+def test_steady_topic_learns_its_timeout() -> None:
+    """A topic published every 30 s is stale after a few missed messages."""
+    cadence = TopicCadence()
+    _learn(cadence, [30] * MIN_SAMPLES)
+    assert cadence.regular
+    assert cadence.interval == pytest.approx(30)
+    # The first jitter is half the interval and decays without deviation
+    jitter = 15 * (3 / 4) ** (MIN_SAMPLES - 1)
+    assert cadence.timeout(3, 600) == pytest.approx(90 + JITTER_FACTOR * jitter)
+
+
+def test_static_timeout_until_learned() -> None:
+    """Until enough intervals are seen the static expire_after is used."""
+    cadence = TopicCadence()
+    _learn(cadence, [30] * (MIN_SAMPLES - 1))
+    assert not cadence.regular
+    assert cadence.timeout(3, 600) == 600
+
+
+def test_learned_timeout_never_exceeds_expire_after() -> None:
+    """A slow topic keeps the static expire_after as an upper bound."""
+    cadence = TopicCadence()
+    _learn(cadence, [300] * MIN_SAMPLES)
+    assert cadence.timeout(3, 600) == 600
+
+
+def test_topic_published_on_change_keeps_the_static_timeout() -> None:
+    """An irregular topic is not given a learned timeout."""
+    cadence = TopicCadence()
+    _learn(cadence, [1, 100] * MIN_SAMPLES)
+    assert not cadence.regular
+    assert cadence.timeout(3, 600) == 600
+
+
+def test_outage_gap_is_not_learned() -> None:
+    """The gap of a broker outage does not stretch the learned interval."""
+    cadence = TopicCadence()
+    last = _learn(cadence, [30] * MIN_SAMPLES)
+    interval, samples = cadence.interval, cadence.samples
+    cadence.restart(last + 3600)
+    cadence.update(last + 3610)
+    assert cadence.interval == interval
+    assert cadence.samples == samples
+    assert cadence.last == last + 3610
@@ -0,0 +1,111 @@
+"""Tests and benchmark of the headless Prism client.
+
+The client only uses the standard library, it is imported on its own so the
+tests run without Home Assistant.
+"""
+
+import asyncio
+from pathlib import Path
+import sys
+import time
+
+import pytest
+
+sys.path.append(str(Path(__file__).parents[1] / "custom_components" / "silla_prism"))
+
+from client import FakeBroker, PrismClient, decode_mode, decode_payload
+
+# Maximum mean seconds to decode a message of the device, the benchmark is
+# skipped by default since it depends on the machine
+DECODE_BUDGET = 50e-6
+
+
+def _start_client(ports: int = 2) -> tuple[FakeBroker, PrismClient]:
+    """Return a started client of a device on a fake broker."""
+    broker = FakeBroker()
+    client = PrismClient(broker, "prism/", ports=ports)
+    asyncio.run(client.start())
+    return broker, client
+
+
+def test_decode_payload() -> None:
+    """The enum payloads are 1-based indexes, invalid payloads are None."""
+    options = ("idle", "waiting", "charging")
+    assert decode_payload("3", options) == "charging"
+    assert decode_payload("0", options) is None
+    assert decode_payload("4", options) is None
+    assert decode_payload("on", options) is None
+    assert decode_payload("230.5", None) == 230.5
+    assert decode_payload("", None) is None
+
+
+def test_decode_mode() -> None:
+    """The auto limit mode is shown as paused."""
+    options = ("solar", "normal", "paused", "hybrid")
+    assert decode_mode("1", options) == "solar"
+    assert decode_mode("7", options) == "paused"
+    assert decode_mode("5", options) is None
+
+
+def test_state_follows_the_messages() -> None:
+    """The messages of the device are decoded into the state."""
+    broker, client = _start_client()
+    decoded = []
+    client.add_listener(lambda port, key, value: decoded.append((port, key, value)))
+    broker.deliver("prism/2/state", "3")
+    broker.deliver("prism/1/mode", "7")
+    broker.deliver("prism/energy_data/power_grid", "1500")
+    broker.deliver("prism/1/state", "garbage")
+    assert client.state.get(2, "current_state") == "charging"
+    assert client.state.get(1, "set_port_mode") == "paused"
+    assert client.state.get(0, "input_grid_power") == 1500.0
+    assert client.state.get(1, "current_state") is None
+    assert (2, "current_state", "charging") in decoded
+
+
+def test_commands_are_published() -> None:
+    """The commands are published under the device topic."""
+    broker, client = _start_client()
+    asyncio.run(client.set_mode(1, "solar"))
+    asyncio.run(client.command(2, "set_current_limit", 16.0))
+    asyncio.run(client.command(1, "set_mode_traps_noauth"))
+    assert broker.published[:2] == [
+        ("prism/1/command/set_mode", "1"),
+        ("prism/2/command/set_current_limit", "16"),
+    ]
+    assert broker.published[2][0] == "prism/1/command/set_mode_traps"
+
+
+def test_stop_unsubscribes() -> None:
+    """A stopped client ignores the messages."""
+    broker, client = _start_client()
+    asyncio.run(client.stop())
+    broker.deliver("prism/1/state", "3")
+    assert client.state.get(1, "current_state") is None
+
+
+@pytest.mark.benchmark
+def test_decode_benchmark() -> None:
+    """A burst of the device is decoded well under the budget per message."""
+    broker, _ = _start_client(ports=2)
+    burst = [
+        (f"prism/{port}/{topic}", payload)
+        for port in (1, 2)
+        for topic, payload in (
+            ("state", "3"),
+            ("mode", "2"),
+            ("volt", "231"),
+            ("w", "7360"),
+            ("amp", "32000"),
+            ("pilot", "32"),
+            ("wh", "12500"),
+        )
+    ]
+    burst.append(("prism/energy_data/power_grid", "4200"))
+    rounds = 1000
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for topic, payload in burst:
+            broker.deliver(topic, payload)
+    per_message = (time.perf_counter() - start) / (rounds * len(burst))
+    assert per_message < DECODE_BUDGET
@@ -0,0 +1,108 @@
+"""Tests of the MQTT dispatcher of a config entry."""
+
+from unittest.mock import MagicMock, patch
+
+from homeassistant.core import HomeAssistant
+from pytest_homeassistant_custom_component.common import async_fire_mqtt_message
+
+from custom_components.silla_prism.cadence import MIN_SAMPLES
+from custom_components.silla_prism.dispatcher import PrismDispatcher
+from custom_components.silla_prism.entity import PrismDerivedEntity
+
+
+async def test_expiry_of_a_topic_never_published(
+    hass: HomeAssistant, mqtt_mock
+) -> None:
+    """A topic without messages expires after expire_after from the tracking."""
+    dispatcher = PrismDispatcher(hass, "entry", "prism/", 0, 3)
+    await dispatcher.async_subscribe("0/info/temperature/core", MagicMock())
+    quiet = MagicMock()
+    dispatcher.async_track_expiry(quiet, "0/info/temperature/core", 600)
+    now = hass.loop.time()
+
+    with patch.object(hass.loop, "time", return_value=now + 10):
+        dispatcher._async_sweep()
+    quiet.value_is_expired.assert_not_called()
+
+    with patch.object(hass.loop, "time", return_value=now + 601):
+        dispatcher._async_sweep()
+    quiet.value_is_expired.assert_called_once()
+    dispatcher.async_shutdown()
+
+
+async def test_sweep_goes_on_after_a_topic_never_published(
+    hass: HomeAssistant, mqtt_mock
+) -> None:
+    """The values of the other topics still expire in the same sweep."""
+    dispatcher = PrismDispatcher(hass, "entry", "prism/", 0, 3)
+    await dispatcher.async_subscribe("1/error", MagicMock())
+    await dispatcher.async_subscribe("1/w", MagicMock())
+    quiet, published = MagicMock(), MagicMock()
+    dispatcher.async_track_expiry(quiet, "1/error", 86400)
+    dispatcher.async_track_expiry(published, "1/w", 60)
+    dispatcher._cadences["1/w"].update(hass.loop.time())
+    now = hass.loop.time()
+
+    with patch.object(hass.loop, "time", return_value=now + 61):
+        dispatcher._async_sweep()
+    quiet.value_is_expired.assert_not_called()
+    published.value_is_expired.assert_called_once()
+    dispatcher.async_shutdown()
+
+
+async def test_regular_topic_expires_after_its_learned_cadence(
+    hass: HomeAssistant, mqtt_mock
+) -> None:
+    """A topic published every 30 s is stale long before its expire_after."""
+    dispatcher = PrismDispatcher(hass, "entry", "prism/", 0, 3)
+    await dispatcher.async_subscribe("1/w", MagicMock())
+    quiet = MagicMock()
+    dispatcher.async_track_expiry(quiet, "1/w", 600)
+    cadence = dispatcher._cadences["1/w"]
+    now = hass.loop.time()
+    for arrival in range(MIN_SAMPLES + 1):
+        cadence.update(now + 30 * arrival)
+    last = now + 30 * MIN_SAMPLES
+    timeout = cadence.timeout(3, 600)
+    assert timeout < 600
+
+    with patch.object(hass.loop, "time", return_value=last + timeout - 1):
+        dispatcher._async_sweep()
+    quiet.value_is_expired.assert_not_called()
+
+    with patch.object(hass.loop, "time", return_value=last + timeout + 1):
+        dispatcher._async_sweep()
+    quiet.value_is_expired.assert_called_once()
+    dispatcher.async_shutdown()
+
+
+async def test_failing_handler_does_not_skip_the_others(
+    hass: HomeAssistant, mqtt_mock
+) -> None:
+    """The handlers after a failing one still get the message."""
+    dispatcher = PrismDispatcher(hass, "entry", "prism/", 0, 3)
+    failing = MagicMock(side_effect=ValueError("invalid literal"))
+    following = MagicMock()
+    await dispatcher.async_subscribe("1/mode", failing)
+    await dispatcher.async_subscribe("1/mode", following)
+    async_fire_mqtt_message(hass, "prism/1/mode", "auto")
+    await hass.async_block_till_done()
+    failing.assert_called_once()
+    following.assert_called_once()
+    dispatcher.async_shutdown()
+
+
+async def test_derived_entities_follow_the_broker(
+    hass: HomeAssistant, mqtt_mock
+) -> None:
+    """The entities computed from the telemetry are offline with the broker."""
+    dispatcher = PrismDispatcher(hass, "entry", "prism/", 0, 3)
+    derived = PrismDerivedEntity()
+    derived._dispatcher = dispatcher
+    dispatcher.async_track_entity(derived)
+
+    dispatcher._async_disconnected()
+    assert not derived.available
+    dispatcher._async_resync()
+    assert derived.available
+    dispatcher.async_shutdown()
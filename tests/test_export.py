@@ -0,0 +1,41 @@
+"""Tests of the downsampling of the telemetry export."""
+
+from custom_components.silla_prism.export import _downsample
+
+
+def test_measurement_is_time_weighted() -> None:
+    """The mean weights every value by the time it was held."""
+    states = [(0.0, "0"), (90.0, "1000"), (100.0, "0")]
+    assert list(_downsample(states, 100, False)) == [(0.0, 100.0), (100.0, 0.0)]
+
+
+def test_steady_intervals_hold_the_value() -> None:
+    """The intervals without samples get the held value."""
+    states = [(0.0, "7"), (350.0, "3"), (400.0, "3")]
+    assert list(_downsample(states, 100, False)) == [
+        (0.0, 7.0),
+        (100.0, 7.0),
+        (200.0, 7.0),
+        (300.0, 5.0),
+        (400.0, 3.0),
+    ]
+
+
+def test_unavailable_intervals_are_skipped() -> None:
+    """The gaps do not count in the mean, intervals in a gap are skipped."""
+    states = [(0.0, "4"), (50.0, None), (250.0, "2"), (300.0, "2")]
+    assert list(_downsample(states, 100, False)) == [
+        (0.0, 4.0),
+        (200.0, 2.0),
+        (300.0, 2.0),
+    ]
+
+
+def test_counter_increase() -> None:
+    """The first sample is the base of the counter, a reset starts again."""
+    states = [(0.0, "100"), (50.0, "150"), (150.0, "150"), (250.0, "20")]
+    assert list(_downsample(states, 100, True)) == [
+        (0.0, 50.0),
+        (100.0, 0.0),
+        (200.0, 20.0),
+    ]
@@ -0,0 +1,86 @@
+"""Tests of the site current load balancer."""
+
+import random
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.silla_prism.load_balancer import (
+    MIN_CURRENT,
+    PAUSED_CURRENT,
+    PortLoad,
+    PrismLoadBalancer,
+    allocate_currents,
+)
+
+from .common import FakeDispatcher
+
+
+def test_ports_that_do_not_fit_are_paused() -> None:
+    """With 3 charging ports and 16 A only two ports get the minimum."""
+    ports = {
+        port: PortLoad(priority=0, max_current=16, state="charging")
+        for port in range(3)
+    }
+    allocations = allocate_currents(16, ports)
+    assert sum(allocations.values()) <= 16
+    assert sorted(allocations.values()) == [PAUSED_CURRENT, 8, 8]
+
+
+def test_lower_priority_ports_are_paused_first() -> None:
+    """The ports that do not fit are the ones with the lowest priority."""
+    ports = {
+        "low": PortLoad(priority=0, max_current=16, state="charging"),
+        "high": PortLoad(priority=1, max_current=16, state="waiting"),
+    }
+    assert allocate_currents(10, ports) == {"high": 10, "low": PAUSED_CURRENT}
+
+
+def test_allocation_never_exceeds_the_limit() -> None:
+    """The sum of the allocations is under the limit for any load."""
+    generator = random.Random(0)
+    for _ in range(1000):
+        ports = {
+            port: PortLoad(
+                priority=generator.randint(0, 2),
+                max_current=generator.randint(MIN_CURRENT, 32),
+                state=generator.choice(("idle", "waiting", "charging")),
+                current=generator.uniform(0, 32),
+            )
+            for port in range(generator.randint(1, 12))
+        }
+        limit = generator.randint(0, 80)
+        allocations = allocate_currents(limit, ports)
+        assert sum(allocations.values()) <= limit
+        assert all(
+            current == PAUSED_CURRENT or MIN_CURRENT <= current <= ports[key].demand
+            for key, current in allocations.items()
+        )
+
+
+async def test_port_that_does_not_fit_is_paused_with_its_mode(
+    hass: HomeAssistant,
+) -> None:
+    """A port without room is paused with its mode and resumed in its own mode."""
+    dispatcher = FakeDispatcher()
+    balancer = PrismLoadBalancer(hass)
+    balancer.async_add_entry("entry", dispatcher, 2, 16, 10, 0)
+    dispatcher.send_sample(2, "current_port_mode", "solar")
+    dispatcher.send_sample(1, "current_state", "charging")
+    dispatcher.send_sample(2, "current_state", "charging")
+    await hass.async_block_till_done()
+    assert dispatcher.published == [
+        ("1/command/set_current_limit", 10),
+        ("2/command/set_mode", 3),
+    ]
+
+    dispatcher.send_sample(2, "current_port_mode", "paused")
+    dispatcher.send_sample(2, "current_state", "pause")
+    await hass.async_block_till_done()
+    assert len(dispatcher.published) == 2
+
+    dispatcher.send_sample(1, "current_state", "idle")
+    await hass.async_block_till_done()
+    assert dispatcher.published[2:] == [
+        ("2/command/set_current_limit", 10),
+        ("2/command/set_mode", 1),
+    ]
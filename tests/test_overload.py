@@ -0,0 +1,178 @@
+"""Tests of the grid overload protection."""
+
+import asyncio
+from collections.abc import Callable
+from functools import partial
+import time
+from unittest.mock import patch
+
+from homeassistant.core import HomeAssistant
+from pytest_homeassistant_custom_component.common import async_fire_mqtt_message
+
+from custom_components.silla_prism.dispatcher import PrismDispatcher
+from custom_components.silla_prism.filters import create_filter
+from custom_components.silla_prism.load_balancer import PrismLoadBalancer
+from custom_components.silla_prism.overload import (
+    GRID_POWER_TOPIC,
+    LATENCY_BUDGET,
+    RAMP_INTERVAL,
+    PrismOverloadProtection,
+)
+
+from .common import FakeDispatcher
+
+
+async def _start_charging(
+    hass: HomeAssistant,
+    import_limit: float,
+    ceiling: Callable[[int, int | None], bool] | None = None,
+    dispatcher: FakeDispatcher | None = None,
+) -> tuple[FakeDispatcher, PrismOverloadProtection, Callable[[], None]]:
+    """Start the protection of a port charging at 16 A."""
+    dispatcher = dispatcher or FakeDispatcher()
+    protection = PrismOverloadProtection(
+        hass, dispatcher, 1, import_limit, ceiling
+    )
+    stop = await protection.async_start()
+    dispatcher.send_sample(1, "current_state", "charging")
+    dispatcher.send_sample(1, "output_car_current", 16.0)
+    dispatcher.send_sample(1, "output_current", 16000.0)
+    return dispatcher, protection, stop
+
+
+def _ramp(dispatcher: FakeDispatcher, steps: int) -> None:
+    """Receive a grid power under the limit for the given ramp steps."""
+    for step in range(1, steps + 1):
+        with patch(
+            "custom_components.silla_prism.overload.time.monotonic",
+            return_value=time.monotonic() + step * RAMP_INTERVAL,
+        ):
+            dispatcher.receive(GRID_POWER_TOPIC, "1000")
+
+
+async def test_import_limit_change_keeps_the_reduced_ports(
+    hass: HomeAssistant,
+) -> None:
+    """A new import limit does not forget the ports reduced by the old one."""
+    dispatcher, protection, stop = await _start_charging(hass, 5000)
+    dispatcher.receive(GRID_POWER_TOPIC, "6000")
+    await hass.async_block_till_done()
+    assert dispatcher.published == [("1/command/set_current_limit", 11)]
+
+    protection.async_set_import_limit(7000)
+    await hass.async_block_till_done()
+    assert len(dispatcher.published) == 1
+
+    stop()
+    await hass.async_block_till_done()
+    assert dispatcher.published[-1] == ("1/command/set_current_limit", 16)
+
+
+async def _start_on_the_broker(
+    hass: HomeAssistant,
+) -> tuple[PrismDispatcher, PrismOverloadProtection]:
+    """Start the protection on a dispatcher of the MQTT messages, port 1 at 16 A."""
+    dispatcher = PrismDispatcher(hass, "entry", "prism/", 0, 3)
+    await dispatcher.async_register_telemetry(
+        "1/state", 1, "current_state", ("idle", "waiting", "charging", "pause")
+    )
+    await dispatcher.async_register_telemetry("1/pilot", 1, "output_car_current")
+    await dispatcher.async_register_telemetry(
+        GRID_POWER_TOPIC,
+        0,
+        "input_grid_power",
+        sample_filter=create_filter({"type": "rate", "max_rate": 20000}),
+    )
+    protection = PrismOverloadProtection(hass, dispatcher, 1, 5000)
+    await protection.async_start()
+    async_fire_mqtt_message(hass, "prism/1/state", "3")
+    async_fire_mqtt_message(hass, "prism/1/pilot", "16")
+    async_fire_mqtt_message(hass, f"prism/{GRID_POWER_TOPIC}", "0")
+    await hass.async_block_till_done()
+    return dispatcher, protection
+
+
+async def test_latency_from_receipt_to_publish(
+    hass: HomeAssistant, mqtt_mock
+) -> None:
+    """A step of the import is shed on the broker within the latency budget.
+
+    The step is rejected by the outlier filter of the grid power, the
+    protection sees it anyway.
+    """
+    dispatcher, protection = await _start_on_the_broker(hass)
+    async_fire_mqtt_message(hass, f"prism/{GRID_POWER_TOPIC}", "6000")
+    await hass.async_block_till_done()
+    mqtt_mock.async_publish.assert_called_once_with(
+        "prism/1/command/set_current_limit", "11", 1, False
+    )
+    assert protection.last_latency is not None
+    assert 0 < protection.last_latency < LATENCY_BUDGET
+    dispatcher.async_shutdown()
+
+
+async def test_latency_includes_the_queue_wait(
+    hass: HomeAssistant, mqtt_mock
+) -> None:
+    """A command waiting in the queue during an outage is not published yet."""
+    dispatcher, protection = await _start_on_the_broker(hass)
+    dispatcher.async_connection_changed(False)
+    async_fire_mqtt_message(hass, f"prism/{GRID_POWER_TOPIC}", "6000")
+    await hass.async_block_till_done()
+    mqtt_mock.async_publish.assert_not_called()
+    assert protection.last_latency is None
+
+    await asyncio.sleep(2 * LATENCY_BUDGET)
+    dispatcher.async_connection_changed(True)
+    await hass.async_block_till_done()
+    mqtt_mock.async_publish.assert_called_once_with(
+        "prism/1/command/set_current_limit", "11", 1, False
+    )
+    assert protection.last_latency is not None
+    assert protection.last_latency >= 2 * LATENCY_BUDGET
+    dispatcher.async_shutdown()
+
+
+async def test_shed_holds_with_the_balancer(hass: HomeAssistant) -> None:
+    """The balancer does not raise a shed port back when its car backs off."""
+    dispatcher = FakeDispatcher()
+    balancer = PrismLoadBalancer(hass)
+    balancer.async_add_entry("entry", dispatcher, 1, 16, 32, 0)
+    await _start_charging(
+        hass, 5000, partial(balancer.async_set_ceiling, "entry"), dispatcher
+    )
+    await hass.async_block_till_done()
+    assert [payload for _, payload in dispatcher.published] == [16]
+
+    dispatcher.receive(GRID_POWER_TOPIC, "6000")
+    await hass.async_block_till_done()
+    dispatcher.send_sample(1, "output_car_current", 11.0)
+    dispatcher.send_sample(1, "output_current", 11000.0)
+    await hass.async_block_till_done()
+    assert [payload for _, payload in dispatcher.published] == [16, 11]
+
+    # The balancer publishes the ramp, within the demand of the car
+    _ramp(dispatcher, 1)
+    await hass.async_block_till_done()
+    assert [payload for _, payload in dispatcher.published] == [16, 11, 12]
+
+
+async def test_restored_port_goes_back_to_the_balancer(
+    hass: HomeAssistant,
+) -> None:
+    """Once the ramp ends the balancer gives the port its own allocation."""
+    dispatcher = FakeDispatcher()
+    balancer = PrismLoadBalancer(hass)
+    balancer.async_add_entry("entry", dispatcher, 1, 16, 32, 0)
+    _, _, stop = await _start_charging(
+        hass, 5000, partial(balancer.async_set_ceiling, "entry"), dispatcher
+    )
+    await hass.async_block_till_done()
+    dispatcher.receive(GRID_POWER_TOPIC, "6000")
+    await hass.async_block_till_done()
+
+    _ramp(dispatcher, 5)
+    await hass.async_block_till_done()
+    stop()
+    await hass.async_block_till_done()
+    assert [payload for _, payload in dispatcher.published] == [16, 11, 16]
@@ -0,0 +1,62 @@
+"""Tests of the power flow snapshots."""
+
+from collections.abc import Callable
+from unittest.mock import MagicMock
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.silla_prism.powerflow import (
+    GRID_KEY,
+    HOUSE_KEY,
+    MAX_HOLD,
+    PORT_KEY,
+    SOLAR_KEY,
+    PowerFlowBuffer,
+)
+from custom_components.silla_prism.telemetry import PrismSample
+
+
+def _start_buffer(
+    hass: HomeAssistant,
+) -> tuple[Callable[[PrismSample], None], MagicMock, Callable[[], None]]:
+    """Start the buffer of a single port Prism, returns its sample input."""
+    dispatcher = MagicMock()
+    listener = MagicMock()
+    buffer = PowerFlowBuffer(hass, dispatcher, 1, listener)
+    stop = buffer.async_start()
+    return dispatcher.async_subscribe_telemetry.call_args[0][0], listener, stop
+
+
+def _burst(send: Callable[[PrismSample], None], timestamp: float) -> None:
+    """Send a complete burst of the streams."""
+    send(PrismSample(0, GRID_KEY, -500.0, timestamp))
+    send(PrismSample(0, SOLAR_KEY, 3000.0, timestamp))
+    send(PrismSample(0, HOUSE_KEY, 2500.0, timestamp))
+    send(PrismSample(1, PORT_KEY, 1500.0, timestamp))
+
+
+async def test_complete_burst_makes_a_snapshot(hass: HomeAssistant) -> None:
+    """A burst with every stream is sent at once."""
+    send, listener, stop = _start_buffer(hass)
+    _burst(send, 100.0)
+    flow = listener.call_args[0][0]
+    assert flow.timestamp == 100.0
+    assert flow.export_power == 500.0
+    assert flow.house_power_without_ev == 1000.0
+    stop()
+
+
+async def test_stale_stream_is_not_mixed(hass: HomeAssistant) -> None:
+    """A stream older than MAX_HOLD drops the snapshot, a recent one is held."""
+    send, listener, stop = _start_buffer(hass)
+    _burst(send, 100.0)
+    send(PrismSample(0, GRID_KEY, 200.0, 110.0))
+    send(PrismSample(0, GRID_KEY, 300.0, 111.0))
+    assert listener.call_count == 2
+    assert listener.call_args[0][0].grid == 200.0
+
+    # Closes the snapshot of 111, then opens one with a stale solar value
+    send(PrismSample(0, GRID_KEY, 400.0, 100.0 + MAX_HOLD + 1))
+    send(PrismSample(0, GRID_KEY, 500.0, 100.0 + MAX_HOLD + 2))
+    assert listener.call_count == 3
+    stop()
@@ -0,0 +1,18 @@
+"""Tests of the rolling window statistics."""
+
+from custom_components.silla_prism.rolling import RollingWindow
+
+
+def test_prune_empties_a_quiet_window() -> None:
+    """The samples leave the window on prune, without new samples."""
+    window = RollingWindow(60, 16)
+    window.add(0.0, 5.0)
+    window.add(30.0, 1.0)
+    assert not window.prune(50.0)
+    assert (window.mean, window.min, window.max) == (3.0, 1.0, 5.0)
+
+    assert window.prune(70.0)
+    assert (window.mean, window.min, window.max) == (1.0, 1.0, 1.0)
+    assert window.prune(100.0)
+    assert window.mean is None
+    assert window.max is None
@@ -0,0 +1,20 @@
+"""Tests of the site sensors shared by the config entries."""
+
+from unittest.mock import MagicMock
+
+from custom_components.silla_prism.domain_data import DomainData
+
+
+def test_site_sensors_are_added_once() -> None:
+    """Only the first entry adds the site sensors, the next one takes over."""
+    domain_data = DomainData()
+    first, second = MagicMock(), MagicMock()
+    remove_first = domain_data.async_add_site_sensor_host("first", first)
+    remove_second = domain_data.async_add_site_sensor_host("second", second)
+    first.assert_called_once()
+    second.assert_not_called()
+
+    remove_first()
+    second.assert_called_once()
+    remove_second()
+    first.assert_called_once()